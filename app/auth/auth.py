@@ -1,9 +1,12 @@
 # auth.py
-import jwt
+import hashlib
+import time
 from datetime import datetime, timedelta
+from app.auth import jwks
+from app.cache.ttl_cache import TTLCache
 from app.configs import config
-from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status, Header
+from jose import ExpiredSignatureError, JWTError, jwt
+from fastapi import Depends, HTTPException, status, Header, Query
 
 # from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
@@ -12,6 +15,13 @@ from typing import Optional, List, Annotated
 SECRET_KEY = config.SECRET_KEY
 ALGORITHM = "HS256"
 
+# (sha256(token), JWKS generation) -> AuthUser of a verified token, expiring no later
+# than the token's exp. Repeat requests with the same token skip signature verification
+# and model building; a JWKS rotation changes the key, so rotated-out keys stop verifying.
+_verified_tokens = TTLCache(
+    "verified_tokens", ttl=config.AUTH_TOKEN_CACHE_TTL, maxsize=config.AUTH_TOKEN_CACHE_MAXSIZE
+)
+
 
 class AuthUser(BaseModel):
     user_id: str
@@ -32,13 +42,59 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 
+def _verify_signature(token: str) -> dict:
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm not in config.AUTH_ALGORITHMS:
+        raise JWTError(f"Algorithm not allowed: {algorithm}")
+    if algorithm == ALGORITHM:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    kid = header.get("kid")
+    entry = jwks.get_key(kid)
+    if entry is None:
+        # maybe a freshly rotated key: reload in the background, reject this one
+        jwks.request_reload()
+        raise JWTError(f"Unknown signing key: {kid}")
+    key_algorithm, public_key = entry
+    # the key decides the algorithm, never the token (no RS/HS confusion)
+    if key_algorithm != algorithm:
+        raise JWTError(f"Key {kid} is not a {algorithm} key")
+    return jwt.decode(token, public_key, algorithms=[key_algorithm])
+
+
+def decode_token(token: str) -> AuthUser:
+    """
+    Verify a token and build its AuthUser, once per token until it expires.
+
+    Raises:
+        ExpiredSignatureError, JWTError: invalid token (never cached)
+        ValueError: valid token without a usable user
+    """
+    key = (hashlib.sha256(token.encode()).digest(), jwks.generation)
+    user = _verified_tokens.get(key)
+    if user is not None:
+        return user
+
+    payload = _verify_signature(token)
+    if payload.get("user_id") is None:
+        raise ValueError("Token has no user_id")
+    user = AuthUser(**payload)
+
+    ttl = None
+    if "exp" in payload:
+        ttl = min(config.AUTH_TOKEN_CACHE_TTL, payload["exp"] - time.time())
+    if ttl is None or ttl > 0:
+        _verified_tokens.set(key, user, ttl)
+    return user
+
+
 def verify_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload["user_id"]
-    except jwt.ExpiredSignatureError:
+        return decode_token(token).user_id
+    except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
@@ -55,21 +111,10 @@ async def get_current_user(token: Annotated[str, Depends(get_token_from_header)]
         detail="Could not validate credentials",
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-
-        user_id: str = payload.get("user_id")
-
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        return decode_token(token)
+    except (JWTError, ValueError):
         raise credentials_exception
 
-    user = AuthUser(**payload)
-
-    if user is None:
-        raise credentials_exception
-    return user
-
 
 class RoleChecker:
     def __init__(self, allowed_roles: List[str] | None = None):
@@ -84,3 +129,31 @@ class RoleChecker:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="You don't have enough permissions",
         )
+
+
+async def get_stream_user(
+    authorization: str | None = Header(None),
+    access_token: str | None = Query(None),
+) -> AuthUser:
+    """
+    get_current_user for Server-Sent Events routes. A browser EventSource cannot set
+    the Authorization header, so the token may come as the access_token query
+    parameter instead. Query strings end up in access logs, so such a token must
+    expire within AUTH_QUERY_TOKEN_MAX_TTL seconds.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+    )
+    token = authorization or access_token
+    if token is None:
+        raise HTTPException(status_code=401, detail="Authorization header or access_token missing")
+    try:
+        user = decode_token(token)
+    except (JWTError, ValueError):
+        raise credentials_exception
+    if authorization is None:
+        exp = jwt.get_unverified_claims(token).get("exp")
+        if exp is None or exp - time.time() > config.AUTH_QUERY_TOKEN_MAX_TTL:
+            raise HTTPException(status_code=401, detail="access_token must be short-lived")
+    return user
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+from app.clients import http_client
+from app.configs import config
+from app.logger.logger import logger
+
+# Default algorithm per key type, for JWKs without an "alg"
+KEY_TYPE_ALGORITHMS = {"RSA": "RS256", "EC": "ES256"}
+
+# kid -> (algorithm, constructed public key). Keys are parsed once per reload,
+# never per request.
+_keys: dict[str, tuple[str, Key]] = {}
+# Bumped whenever the key set changes, so caches of verified tokens keyed on it
+# stop serving tokens of a rotated-out key.
+generation = 0
+_refresh_task: asyncio.Task | None = None
+_reload_task: asyncio.Task | None = None
+_last_reload = 0.0
+
+
+def get_key(kid: str | None) -> tuple[str, Key] | None:
+    return _keys.get(kid)
+
+
+def set_keys(document: dict):
+    """
+    Replace the key set with the usable keys of a JWKS document ({"keys": [...]}).
+    """
+    global _keys, generation
+    keys = {}
+    for entry in document.get("keys", []):
+        algorithm = entry.get("alg") or KEY_TYPE_ALGORITHMS.get(entry.get("kty"))
+        if entry.get("use", "sig") != "sig" or algorithm not in config.AUTH_ALGORITHMS:
+            continue
+        try:
+            keys[entry["kid"]] = (algorithm, jwk.construct(entry, algorithm))
+        except (KeyError, JWKError) as e:
+            logger.error(f"Skipping JWKS key {entry.get('kid')}: {str(e)}")
+
+    fingerprint = {kid: key.to_dict() for kid, (_, key) in keys.items()}
+    if fingerprint != {kid: key.to_dict() for kid, (_, key) in _keys.items()}:
+        _keys = keys
+        generation += 1
+        logger.info(f"JWKS loaded: {list(keys)} (generation {generation})")
+
+
+async def _fetch_document() -> dict | None:
+    if config.AUTH_JWKS_FILE:
+        def read() -> dict:
+            with open(config.AUTH_JWKS_FILE, encoding="utf-8") as f:
+                return json.load(f)
+
+        return await asyncio.to_thread(read)
+    if config.AUTH_JWKS_URL:
+        client = http_client.get_client(http_client.JWKS)
+        response = await client.get(config.AUTH_JWKS_URL)
+        response.raise_for_status()
+        return response.json()
+    return None
+
+
+async def reload_keys():
+    global _last_reload
+    _last_reload = time.monotonic()
+    try:
+        document = await _fetch_document()
+    except Exception as e:
+        # keep serving the last good key set
+        logger.error(f"JWKS reload failed: {str(e)}")
+        return
+    if document is not None:
+        set_keys(document)
+
+
+def request_reload():
+    """
+    Reload soon in the background, e.g. for a token signed with an unknown kid.
+    Never blocks the caller and runs at most every AUTH_JWKS_MIN_REFRESH_INTERVAL.
+    """
+    global _reload_task
+    if _refresh_task is None or (_reload_task is not None and not _reload_task.done()):
+        return
+    if time.monotonic() - _last_reload < config.AUTH_JWKS_MIN_REFRESH_INTERVAL:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # called from a worker thread: the periodic refresh will pick the key up
+        return
+    _reload_task = loop.create_task(reload_keys())
+
+
+async def _refresh_periodically():
+    while True:
+        await asyncio.sleep(config.AUTH_JWKS_REFRESH_INTERVAL)
+        await reload_keys()
+
+
+async def start_jwks_refresh():
+    """
+    Load the key set and keep reloading it in the background. Called from the app lifespan.
+    """
+    global _refresh_task
+    if not (config.AUTH_JWKS_FILE or config.AUTH_JWKS_URL):
+        return
+    await reload_keys()
+    _refresh_task = asyncio.create_task(_refresh_periodically())
+
+
+async def stop_jwks_refresh():
+    global _refresh_task, _reload_task
+    for task in (_refresh_task, _reload_task):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _refresh_task = _reload_task = None
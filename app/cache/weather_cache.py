@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Optional
+from app.cache.ttl_cache import TTLCache
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+
+
+WEATHER_CACHE_TTLS = {
+    WEATHER_PROVIDERS.GOOGLE: config.GOOGLE_WEATHER_CACHE_TTL,
+    WEATHER_PROVIDERS.WEATHERAPI: config.WEATHER_API_CACHE_TTL,
+    WEATHER_PROVIDERS.OPENWEATHER: config.OPENWEATHER_CACHE_TTL,
+    WEATHER_PROVIDERS.VISUAL_CROSSING: config.VISUAL_CROSSING_CACHE_TTL,
+}
+
+# Results of the hedged multi-provider race, kept as long as the freshest provider
+BEST = "best"
+WEATHER_CACHE_TTLS[BEST] = min(WEATHER_CACHE_TTLS.values())
+
+_caches: dict[str, TTLCache] = {
+    provider: TTLCache(
+        name=f"weather:{provider}", ttl=ttl, maxsize=config.WEATHER_CACHE_MAXSIZE
+    )
+    for provider, ttl in WEATHER_CACHE_TTLS.items()
+}
+
+# group_ids of known locations with a recent weather request, to prefetch busy stores first
+_requested = TTLCache(
+    name="weather:requested",
+    ttl=config.WEATHER_PREFETCH_ACTIVE_WINDOW,
+    maxsize=config.WEATHER_PREFETCH_MAX_LOCATIONS,
+)
+
+
+class WeatherKind:
+    CURRENT = "current"
+    HOURLY = "hourly"
+
+
+def cache_key(kind: str, group_id: str, date: Optional[str] = None) -> tuple:
+    return (kind, group_id, date)
+
+
+def get_cache(provider: str) -> TTLCache:
+    return _caches[provider]
+
+
+async def get_or_load(
+    provider: str,
+    kind: str,
+    group_id: str,
+    loader: Callable[[], Awaitable[Any]],
+    date: Optional[str] = None,
+) -> Any:
+    """
+    Return cached weather for (provider, kind, group_id, date), calling `loader`
+    at most once for concurrent misses on the same key.
+    """
+    return await _caches[provider].get_or_load(cache_key(kind, group_id, date), loader)
+
+
+def mark_requested(group_id: str):
+    """
+    Record a served weather request. Only call it once the location is known to exist.
+    """
+    _requested.set(group_id, True)
+
+
+def recently_requested() -> list[str]:
+    """group_ids requested within WEATHER_PREFETCH_ACTIVE_WINDOW, most recent first"""
+    return _requested.keys()[::-1]
+
+
+def get_stats() -> dict:
+    return {provider: cache.stats() for provider, cache in _caches.items()}
@@ -0,0 +1,126 @@
+import httpx
+from pydantic import BaseModel
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.logger.logger import logger
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Google Maps Platform (geocoding), shares the pool settings with the weather providers
+GOOGLE_MAPS = "google_maps"
+# JWKS key set for asymmetric JWT verification (AUTH_JWKS_URL)
+JWKS = "jwks"
+
+
+class HttpClientSettings(BaseModel):
+    """Connection settings for one upstream provider"""
+    timeout: float
+    http2: bool = False
+
+
+# HTTP/2 is negotiated through ALPN, so it only applies to https endpoints.
+# WeatherAPI.com is called over plain http and stays on HTTP/1.1 keep-alive.
+CLIENT_SETTINGS: dict[str, HttpClientSettings] = {
+    WEATHER_PROVIDERS.GOOGLE: HttpClientSettings(
+        timeout=config.GOOGLE_WEATHER_TIMEOUT, http2=True
+    ),
+    WEATHER_PROVIDERS.WEATHERAPI: HttpClientSettings(
+        timeout=config.WEATHER_API_TIMEOUT, http2=False
+    ),
+    WEATHER_PROVIDERS.OPENWEATHER: HttpClientSettings(
+        timeout=config.OPENWEATHER_TIMEOUT, http2=True
+    ),
+    WEATHER_PROVIDERS.VISUAL_CROSSING: HttpClientSettings(
+        timeout=config.VISUAL_CROSSING_TIMEOUT, http2=True
+    ),
+    GOOGLE_MAPS: HttpClientSettings(timeout=config.GEOCODE_TIMEOUT, http2=True),
+    JWKS: HttpClientSettings(timeout=config.AUTH_JWKS_TIMEOUT),
+}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+_request_counts: dict[str, int] = {}
+
+
+def _create_client(name: str) -> httpx.AsyncClient:
+    settings = CLIENT_SETTINGS[name]
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(settings.timeout, connect=config.HTTP_CONNECT_TIMEOUT)
+    http2 = settings.http2 and config.HTTP2_ENABLED and HTTP2_AVAILABLE
+
+    async def count_request(_: httpx.Request):
+        _request_counts[name] = _request_counts.get(name, 0) + 1
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=http2,
+        event_hooks={"request": [count_request]},
+    )
+
+
+async def init_clients():
+    """
+    Create one long-lived client per provider. Called from the app lifespan.
+    """
+    for name in CLIENT_SETTINGS:
+        if name not in _clients:
+            _clients[name] = _create_client(name)
+    logger.info(f"HTTP clients initialized: {list(_clients.keys())}")
+
+
+async def close_clients():
+    """
+    Close all provider clients and release their pooled connections.
+    """
+    for name, client in list(_clients.items()):
+        await client.aclose()
+        _clients.pop(name, None)
+    logger.info("HTTP clients closed")
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    Get the shared client for a provider.
+
+    Falls back to creating it lazily so code running outside the app lifespan
+    (scripts, tests) still reuses a single pooled client.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _create_client(name)
+        _clients[name] = client
+    return client
+
+
+def get_pool_stats() -> dict:
+    """
+    Connection pool statistics per provider, used to size HTTP_MAX_* settings.
+    """
+    stats = {}
+    for name, client in _clients.items():
+        # httpx does not expose pool state publicly, read it from the httpcore pool
+        pool = getattr(client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        requests = list(getattr(pool, "_requests", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        stats[name] = {
+            "http2": getattr(pool, "_http2", False),
+            "max_connections": config.HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "queued_requests": sum(1 for req in requests if req.is_queued()),
+            "total_requests": _request_counts.get(name, 0),
+        }
+    return stats
@@ -1,6 +1,7 @@
 import os
 
 from dotenv import load_dotenv
+from app.constants.enum import check_weather_providers
 
 load_dotenv()
 
@@ -9,24 +10,184 @@ PORT = os.getenv("PORT", default="8000")
 
 # SECRET KEY
 SECRET_KEY = os.getenv("SECRET_KEY")
+# Verified JWTs kept in memory (never past their exp)
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", default="300"))
+AUTH_TOKEN_CACHE_MAXSIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAXSIZE", default="10000"))
+# Longest lifetime (seconds) of a token passed as ?access_token= (SSE from a browser)
+AUTH_QUERY_TOKEN_MAX_TTL = float(os.getenv("AUTH_QUERY_TOKEN_MAX_TTL", default="300"))
+# Accepted JWT algorithms. HS256 uses SECRET_KEY; RS256/ES256 use the JWKS key set
+AUTH_ALGORITHMS = [a.strip() for a in os.getenv("AUTH_ALGORITHMS", default="HS256,RS256,ES256").split(",") if a.strip()]
+# JWKS document for RS256/ES256, from a file or a URL (file wins when both are set)
+AUTH_JWKS_FILE = os.getenv("AUTH_JWKS_FILE")
+AUTH_JWKS_URL = os.getenv("AUTH_JWKS_URL")
+AUTH_JWKS_TIMEOUT = float(os.getenv("AUTH_JWKS_TIMEOUT", default="5"))
+# Background reload interval (seconds); an unknown kid triggers an early reload at most this often
+AUTH_JWKS_REFRESH_INTERVAL = float(os.getenv("AUTH_JWKS_REFRESH_INTERVAL", default="300"))
+AUTH_JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("AUTH_JWKS_MIN_REFRESH_INTERVAL", default="30"))
 
 # MONGODB
 MONGO_URI = os.getenv("MONGO_URI")
 MONGODB_NAME = os.getenv("MONGODB_NAME")
+# Create the indexes declared in the repositories on startup (in the background)
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", default="true").lower() == "true"
 
 
 # Mongo collections
 LOCATION_COLLECTION = os.getenv("LOCATION_COLLECTION")
 NOTIFICATION_COLLECTION = os.getenv("NOTIFICATION_COLLECTION")
+GEOCODE_COLLECTION = os.getenv("GEOCODE_COLLECTION", default="geocode")
+NOTIFICATION_USER_STATE_COLLECTION = os.getenv(
+    "NOTIFICATION_USER_STATE_COLLECTION", default="notification_user_state"
+)
 
 # Google Maps API
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", default="10"))
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", default="10"))
+# Google Geocoding allows 50 requests per second per project
+GEOCODE_RATE_LIMIT = float(os.getenv("GEOCODE_RATE_LIMIT", default="40"))
+# In-memory LRU in front of the geocode collection
+GEOCODE_CACHE_MAXSIZE = int(os.getenv("GEOCODE_CACHE_MAXSIZE", default="10000"))
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", default="86400"))
 
 # WeatherAPI.com
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
+# Bulk queries (q=bulk) are only available on paid WeatherAPI.com plans
+WEATHER_API_BULK_ENABLED = os.getenv("WEATHER_API_BULK_ENABLED", default="false").lower() == "true"
 
 # OpenWeather API
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
 # Visual Crossing API
-VISUAL_CROSSING_API_KEY = os.getenv("VISUAL_CROSSING_API_KEY")
\ No newline at end of file
+VISUAL_CROSSING_API_KEY = os.getenv("VISUAL_CROSSING_API_KEY")
+
+# Shared HTTP client pool (one long-lived httpx.AsyncClient per provider)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", default="100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", default="20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", default="30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", default="5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", default="true").lower() == "true"
+
+# Per-provider request timeouts (seconds)
+GOOGLE_WEATHER_TIMEOUT = float(os.getenv("GOOGLE_WEATHER_TIMEOUT", default="10"))
+WEATHER_API_TIMEOUT = float(os.getenv("WEATHER_API_TIMEOUT", default="10"))
+OPENWEATHER_TIMEOUT = float(os.getenv("OPENWEATHER_TIMEOUT", default="10"))
+VISUAL_CROSSING_TIMEOUT = float(os.getenv("VISUAL_CROSSING_TIMEOUT", default="15"))
+
+# Weather cache (seconds), per provider
+WEATHER_CACHE_MAXSIZE = int(os.getenv("WEATHER_CACHE_MAXSIZE", default="5000"))
+GOOGLE_WEATHER_CACHE_TTL = float(os.getenv("GOOGLE_WEATHER_CACHE_TTL", default="600"))
+WEATHER_API_CACHE_TTL = float(os.getenv("WEATHER_API_CACHE_TTL", default="600"))
+OPENWEATHER_CACHE_TTL = float(os.getenv("OPENWEATHER_CACHE_TTL", default="600"))
+VISUAL_CROSSING_CACHE_TTL = float(os.getenv("VISUAL_CROSSING_CACHE_TTL", default="1800"))
+
+# Weather provider retries on transient upstream errors
+WEATHER_MAX_RETRIES = int(os.getenv("WEATHER_MAX_RETRIES", default="2"))
+WEATHER_RETRY_BACKOFF = float(os.getenv("WEATHER_RETRY_BACKOFF", default="0.2"))
+
+
+def _weather_providers(variable: str, default: str) -> list[str]:
+    """Comma separated provider names; an unknown one stops the app at startup"""
+    names = [p.strip() for p in os.getenv(variable, default=default).split(",") if p.strip()]
+    try:
+        return check_weather_providers(names)
+    except ValueError as e:
+        raise ValueError(f"{variable}: {e}") from None
+
+
+# Hedged multi-provider weather (/weather/by-group-best)
+WEATHER_HEDGE_PROVIDERS = _weather_providers(
+    "WEATHER_HEDGE_PROVIDERS", default="weatherapi,openweather,visualcrossing,google"
+)
+WEATHER_HEDGE_DELAY = float(os.getenv("WEATHER_HEDGE_DELAY", default="0.3"))
+WEATHER_HEDGE_MIN_DELAY = float(os.getenv("WEATHER_HEDGE_MIN_DELAY", default="0.05"))
+WEATHER_HEDGE_MAX_DELAY = float(os.getenv("WEATHER_HEDGE_MAX_DELAY", default="2"))
+
+# Batch weather endpoint (/weather/batch)
+WEATHER_BATCH_MAX_SIZE = int(os.getenv("WEATHER_BATCH_MAX_SIZE", default="1000"))
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", default="20"))
+
+# Location cache resync interval (seconds) when no change stream is available
+LOCATION_RESYNC_INTERVAL = float(os.getenv("LOCATION_RESYNC_INTERVAL", default="300"))
+
+# Bulk location import (/locations/bulk): rows written per bulk_write
+LOCATION_IMPORT_BATCH_SIZE = int(os.getenv("LOCATION_IMPORT_BATCH_SIZE", default="500"))
+
+# Notification list totals: cached per (tenant, user, keyword) for this many seconds
+NOTIFICATION_TOTAL_CACHE_TTL = float(os.getenv("NOTIFICATION_TOTAL_CACHE_TTL", default="30"))
+NOTIFICATION_TOTAL_CACHE_MAXSIZE = int(os.getenv("NOTIFICATION_TOTAL_CACHE_MAXSIZE", default="10000"))
+
+# Seconds between backfills of title_tokens on notifications written by other producers; 0 disables
+NOTIFICATION_TITLE_TOKEN_BACKFILL_INTERVAL = float(
+    os.getenv("NOTIFICATION_TITLE_TOKEN_BACKFILL_INTERVAL", default="60")
+)
+
+# Max notification ids per mark-read / delete request
+NOTIFICATION_BULK_MAX_SIZE = int(os.getenv("NOTIFICATION_BULK_MAX_SIZE", default="500"))
+
+# Notification push (/notifications/stream)
+# Poll interval (seconds) when no change stream is available
+NOTIFICATION_POLL_INTERVAL = float(os.getenv("NOTIFICATION_POLL_INTERVAL", default="2"))
+# Seconds the poll looks back for notifications inserted after newer ones; at least
+# NOTIFICATION_INGEST_FLUSH_INTERVAL plus the ingest retry backoff
+NOTIFICATION_POLL_LOOKBACK = float(os.getenv("NOTIFICATION_POLL_LOOKBACK", default="10"))
+NOTIFICATION_SSE_HEARTBEAT = float(os.getenv("NOTIFICATION_SSE_HEARTBEAT", default="15"))
+# Events buffered per connected client; the oldest are dropped for slow clients
+NOTIFICATION_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("NOTIFICATION_SUBSCRIBER_QUEUE_SIZE", default="100"))
+
+# Unread counters (/notifications/unread-count): recounted from the database this often (seconds)
+NOTIFICATION_UNREAD_RECONCILE_INTERVAL = float(os.getenv("NOTIFICATION_UNREAD_RECONCILE_INTERVAL", default="300"))
+NOTIFICATION_UNREAD_CACHE_MAXSIZE = int(os.getenv("NOTIFICATION_UNREAD_CACHE_MAXSIZE", default="10000"))
+
+# Notification ingestion (/notifications/ingest)
+# Token roles allowed to ingest: producers (camera pipelines) authenticate as a service
+NOTIFICATION_INGEST_ROLES = [
+    r.strip() for r in os.getenv("NOTIFICATION_INGEST_ROLES", default="service").split(",") if r.strip()
+]
+# Queued notifications before ingest requests wait for the writer (backpressure)
+NOTIFICATION_INGEST_BUFFER_SIZE = int(os.getenv("NOTIFICATION_INGEST_BUFFER_SIZE", default="10000"))
+# Flush when this many are queued, or NOTIFICATION_INGEST_FLUSH_INTERVAL seconds after the first
+NOTIFICATION_INGEST_BATCH_SIZE = int(os.getenv("NOTIFICATION_INGEST_BATCH_SIZE", default="500"))
+NOTIFICATION_INGEST_FLUSH_INTERVAL = float(os.getenv("NOTIFICATION_INGEST_FLUSH_INTERVAL", default="0.2"))
+# Retries of a failed batch write before it is dropped, and how long shutdown waits for the queue to drain
+NOTIFICATION_INGEST_FLUSH_RETRIES = int(os.getenv("NOTIFICATION_INGEST_FLUSH_RETRIES", default="3"))
+NOTIFICATION_INGEST_DRAIN_TIMEOUT = float(os.getenv("NOTIFICATION_INGEST_DRAIN_TIMEOUT", default="30"))
+# Repeats of an alert with the same (tenant, type, cam_id, zone_id) within this many seconds
+# of the previous one are folded into it (repeat_count, updated_at); 0 disables
+NOTIFICATION_DEDUP_WINDOW = float(os.getenv("NOTIFICATION_DEDUP_WINDOW", default="60"))
+NOTIFICATION_DEDUP_MAXSIZE = int(os.getenv("NOTIFICATION_DEDUP_MAXSIZE", default="50000"))
+
+# HTTP caching of GET responses (ETag / Cache-Control), max-age in seconds per route group
+HTTP_CACHE_WEATHER_MAX_AGE = int(os.getenv("HTTP_CACHE_WEATHER_MAX_AGE", default="60"))
+HTTP_CACHE_HOURLY_MAX_AGE = int(os.getenv("HTTP_CACHE_HOURLY_MAX_AGE", default="3600"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", default="60"))
+# ETags remembered to answer 304 without running the route, within max-age
+HTTP_CACHE_ETAG_MAXSIZE = int(os.getenv("HTTP_CACHE_ETAG_MAXSIZE", default="10000"))
+
+# Response compression: gzip, plus br / zstd when brotli / zstandard are installed
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", default="1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", default="6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", default="4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", default="3"))
+# Bodies (or stream chunks) of at least this many bytes are compressed in a worker thread
+COMPRESSION_THREAD_THRESHOLD = int(os.getenv("COMPRESSION_THREAD_THRESHOLD", default="65536"))
+
+# Weather prefetch: keep current weather and today's hourly forecast of every location cached
+# Providers to prefetch from (comma separated, empty disables); providers without an API key are skipped
+WEATHER_PREFETCH_PROVIDERS = _weather_providers("WEATHER_PREFETCH_PROVIDERS", default="weatherapi")
+# Seconds between walks; below the provider cache TTLs, so entries are refreshed before they expire
+WEATHER_PREFETCH_INTERVAL = float(os.getenv("WEATHER_PREFETCH_INTERVAL", default="300"))
+# Only stores with a weather request in the last this many seconds are prefetched
+WEATHER_PREFETCH_ACTIVE_WINDOW = float(os.getenv("WEATHER_PREFETCH_ACTIVE_WINDOW", default="3600"))
+WEATHER_PREFETCH_MAX_LOCATIONS = int(os.getenv("WEATHER_PREFETCH_MAX_LOCATIONS", default="5000"))
+# Provider quotas, calls per minute and per day (UTC), and the share of them prefetch may use;
+# the rest is left to cache misses. Daily budgets are counted per process.
+GOOGLE_WEATHER_RATE_LIMIT = float(os.getenv("GOOGLE_WEATHER_RATE_LIMIT", default="60"))
+WEATHER_API_RATE_LIMIT = float(os.getenv("WEATHER_API_RATE_LIMIT", default="20"))
+OPENWEATHER_RATE_LIMIT = float(os.getenv("OPENWEATHER_RATE_LIMIT", default="60"))
+VISUAL_CROSSING_RATE_LIMIT = float(os.getenv("VISUAL_CROSSING_RATE_LIMIT", default="0.5"))
+GOOGLE_WEATHER_DAILY_LIMIT = int(os.getenv("GOOGLE_WEATHER_DAILY_LIMIT", default="300"))
+WEATHER_API_DAILY_LIMIT = int(os.getenv("WEATHER_API_DAILY_LIMIT", default="30000"))
+OPENWEATHER_DAILY_LIMIT = int(os.getenv("OPENWEATHER_DAILY_LIMIT", default="1000"))
+VISUAL_CROSSING_DAILY_LIMIT = int(os.getenv("VISUAL_CROSSING_DAILY_LIMIT", default="1000"))
+WEATHER_PREFETCH_QUOTA_SHARE = float(os.getenv("WEATHER_PREFETCH_QUOTA_SHARE", default="0.5"))
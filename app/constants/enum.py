@@ -1,3 +1,21 @@
 class LANGUAGE_CODES:
     VI = "vn"
     EN = "en"
+
+
+class WEATHER_PROVIDERS:
+    GOOGLE = "google"
+    WEATHERAPI = "weatherapi"
+    OPENWEATHER = "openweather"
+    VISUAL_CROSSING = "visualcrossing"
+
+
+def check_weather_providers(names: list[str]) -> list[str]:
+    """Return names unchanged; a name not in WEATHER_PROVIDERS raises ValueError"""
+    known = {value for key, value in vars(WEATHER_PROVIDERS).items() if not key.startswith("_")}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValueError(
+            f"unknown weather provider {', '.join(unknown)}, expected one of {', '.join(sorted(known))}"
+        )
+    return names
@@ -1,8 +1,62 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
 from app.configs import config
+from app.logger.logger import logger
 
 client = AsyncIOMotorClient(config.MONGO_URI)
 
 database = client[config.MONGODB_NAME]  # Database name
 location_collection = database.get_collection(config.LOCATION_COLLECTION)
 notification_collection = database.get_collection(config.NOTIFICATION_COLLECTION)
+geocode_collection = database.get_collection(config.GEOCODE_COLLECTION)
+notification_user_state_collection = database.get_collection(
+    config.NOTIFICATION_USER_STATE_COLLECTION
+)
+
+
+async def ensure_indexes(collection: AsyncIOMotorCollection, indexes: list[IndexModel]):
+    """
+    Create the declared indexes of a collection. Existing indexes with the same
+    spec are left alone, so this is cheap to run on every startup.
+    """
+    if not indexes:
+        return
+    try:
+        names = await collection.create_indexes(indexes)
+        logger.info(f"Indexes ready on {collection.name}: {', '.join(names)}")
+    except PyMongoError as e:
+        # queries still work without them, only slower
+        logger.error(f"Index creation on {collection.name} failed: {str(e)}")
+
+
+_ensure_indexes_task: asyncio.Task | None = None
+
+
+async def _ensure_all_indexes(specs: list[tuple[AsyncIOMotorCollection, list[IndexModel]]]):
+    for collection, indexes in specs:
+        try:
+            await ensure_indexes(collection, indexes)
+        except Exception as e:
+            logger.error(f"Index creation on {collection.name} failed: {str(e)}")
+
+
+async def start_ensure_indexes(specs: list[tuple[AsyncIOMotorCollection, list[IndexModel]]]):
+    """
+    Create the declared indexes in the background, so startup does not wait on
+    (or fail with) an unreachable Mongo. Failures are logged. Called from the app lifespan.
+    """
+    global _ensure_indexes_task
+    _ensure_indexes_task = asyncio.create_task(_ensure_all_indexes(specs))
+
+
+async def stop_ensure_indexes():
+    global _ensure_indexes_task
+    if _ensure_indexes_task is not None:
+        _ensure_indexes_task.cancel()
+        try:
+            await _ensure_indexes_task
+        except asyncio.CancelledError:
+            pass
+        _ensure_indexes_task = None
@@ -6,10 +6,17 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from contextlib import asynccontextmanager
+from app.auth import jwks
 from app.db import database
+from app.clients import http_client
+from app.cache import weather_cache
+from app.providers import metrics as provider_metrics
+from app.repositories import geocode_repo, location_repo, notification_repo, notification_state_repo
+from app.services import notification_hub, notification_ingest, unread_counter, weather_prefetch
 from app.routes import location_router, notification_router, weather_router
 from app.logger.logger import logger
-from app.schemas.base import AppBaseResponseError
+from app.middleware import compression, http_cache
+from app.schemas.base import AppBaseResponseError, FastJSONResponse
 import uvicorn
 
 
@@ -17,7 +24,29 @@ import uvicorn
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("App startup")
+    await http_client.init_clients()
+    await jwks.start_jwks_refresh()
+    if config.MONGO_ENSURE_INDEXES:
+        await database.start_ensure_indexes([
+            (database.location_collection, location_repo.INDEXES),
+            (database.notification_collection, notification_repo.INDEXES),
+            (database.geocode_collection, geocode_repo.INDEXES),
+            (database.notification_user_state_collection, notification_state_repo.INDEXES),
+        ])
+    await location_repo.start_location_cache()
+    await weather_prefetch.start_weather_prefetch()
+    await notification_repo.start_title_token_backfill()
+    await notification_hub.start_notification_hub()
+    await notification_ingest.start_notification_ingest()
     yield
+    await notification_ingest.stop_notification_ingest()
+    await notification_hub.stop_notification_hub()
+    await notification_repo.stop_title_token_backfill()
+    await weather_prefetch.stop_weather_prefetch()
+    await location_repo.stop_location_cache()
+    await jwks.stop_jwks_refresh()
+    await database.stop_ensure_indexes()
+    await http_client.close_clients()
     logger.info("App shutdown")
 
 
@@ -39,9 +68,15 @@ app = FastAPI(
     swagger_ui_parameters={"syntaxHighlight": False},
     lifespan=lifespan,
     redirect_slashes=False,
+    default_response_class=FastJSONResponse,
 )
 
+# Prefix of all API routes (see init_routes)
+BASE_URL = "/api/v1"
+
 # Middleware
+# added first so it runs inside CORS: 304s carry the CORS headers too
+app.add_middleware(http_cache.HttpCacheMiddleware, base_url=BASE_URL)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -49,6 +84,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# added last: outermost, it compresses the final response
+app.add_middleware(compression.CompressionMiddleware)
 
 
 # Routes
@@ -71,6 +108,49 @@ async def get_welcome_message():
         raise HTTPException(status_code=503, detail="Database connection failed") from e
 
 
+@app.get("/healthcheck/http-pool")
+async def get_http_pool_stats():
+    return {
+        "timestamp": str(datetime.now()),
+        "providers": http_client.get_pool_stats(),
+    }
+
+
+@app.get("/healthcheck/weather-cache")
+async def get_weather_cache_stats():
+    return {
+        "timestamp": str(datetime.now()),
+        "providers": weather_cache.get_stats(),
+        "prefetch": weather_prefetch.stats(),
+    }
+
+
+@app.get("/healthcheck/weather-providers")
+async def get_weather_provider_stats():
+    return {
+        "timestamp": str(datetime.now()),
+        "providers": provider_metrics.get_stats(),
+    }
+
+
+@app.get("/healthcheck/notification-hub")
+async def get_notification_hub_stats():
+    return {
+        "timestamp": str(datetime.now()),
+        "hub": notification_hub.hub.stats(),
+        "unread_counters": unread_counter.stats(),
+        "ingest": notification_ingest.buffer.stats(),
+    }
+
+
+@app.get("/healthcheck/http-cache")
+async def get_http_cache_stats():
+    return {
+        "timestamp": str(datetime.now()),
+        "http_cache": http_cache.stats(),
+    }
+
+
 # Exception Handlers
 @app.exception_handler(StarletteHTTPException)
 async def custom_http_exception_handler(_: Request, exc: StarletteHTTPException):
@@ -99,9 +179,6 @@ async def global_exception_handler(_: Request, exc: Exception):
 
 
 # Init all routes
-BASE_URL = "/api/v1"
-
-
 def init_routes(app: FastAPI):
     app.include_router(
         notification_router.router, prefix=BASE_URL, tags=["Notification API"]
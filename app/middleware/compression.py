@@ -0,0 +1,198 @@
+import asyncio
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.configs import config
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Media types worth compressing. Server-sent events are left alone: each event
+# must reach the client immediately and most are a few bytes.
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html", "text/csv")
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Everything compressed so far, decodable by the client without the rest"""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=config.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=config.COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Server preference, best ratio per CPU first; only installed libraries are offered
+ENCODERS = {
+    encoder.name: encoder
+    for encoder, available in (
+        (ZstdEncoder, ZSTD_AVAILABLE),
+        (BrotliEncoder, BROTLI_AVAILABLE),
+        (GzipEncoder, True),
+    )
+    if available
+}
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """
+    The preferred encoding of ENCODERS the client accepts (q > 0), or None.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    for name in ENCODERS:
+        if accepted.get(name, accepted.get("*", 0)) > 0:
+            return name
+    return None
+
+
+async def _run(function, data: bytes) -> bytes:
+    # large bodies are compressed in a worker thread so other requests keep being served
+    if len(data) >= config.COMPRESSION_THREAD_THRESHOLD:
+        return await asyncio.to_thread(function, data)
+    return function(data)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated zstd / br / gzip response compression.
+
+    Complete responses smaller than `minimum_size` are sent as they are; larger
+    ones are compressed in one go. Streamed responses (NDJSON) are compressed
+    chunk by chunk and flushed after every chunk, so nothing is buffered and
+    each line still reaches the client as soon as it is produced.
+
+    A strong ETag is made weak on compressed responses: the bytes differ per
+    encoding, the data does not.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = config.COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # too small to be worth it, but caches must still know it varies
+                    headers = MutableHeaders(raw=start["headers"])
+                    headers.add_vary_header("Accept-Encoding")
+                    passthrough = True
+                    await send({**start, "headers": headers.raw})
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding]()
+                headers = MutableHeaders(raw=start["headers"])
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["etag"] = f"W/{etag}"
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    compressed = await _run(lambda data: encoder.compress(data) + encoder.finish(), body)
+                    headers["content-length"] = str(len(compressed))
+                    await send({**start, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start, "headers": headers.raw})
+
+            if more_body:
+                chunk = await _run(lambda data: encoder.compress(data) + encoder.flush(), body)
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            else:
+                chunk = await _run(lambda data: encoder.compress(data) + encoder.finish(), body)
+                await send({"type": "http.response.body", "body": chunk})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,174 @@
+import hashlib
+from urllib.parse import parse_qs
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.cache import weather_cache
+from app.cache.ttl_cache import TTLCache
+from app.configs import config
+from app.schemas.base import compute_etag
+
+
+class CachePolicy(BaseModel):
+    """Cache-Control of one group of GET routes"""
+    max_age: int = 0
+    stale_while_revalidate: int = 0
+    # per-user data: only the user's browser may store it
+    private: bool = False
+
+    def header(self) -> str:
+        directives = ["private" if self.private else "public"]
+        if self.max_age:
+            directives.append(f"max-age={self.max_age}")
+        else:
+            # may be stored, but is revalidated (304 when unchanged) before every use
+            directives.append("no-cache")
+        if self.stale_while_revalidate:
+            directives.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(directives)
+
+
+# Route path prefix (below the API base URL) -> policy; the longest matching prefix wins.
+# Only complete 200 JSON responses are cached: streams (/notifications/stream) and
+# errors pass through untouched.
+CACHE_POLICIES: dict[str, CachePolicy] = {
+    "/weather/": CachePolicy(
+        max_age=config.HTTP_CACHE_WEATHER_MAX_AGE,
+        stale_while_revalidate=config.HTTP_CACHE_STALE_WHILE_REVALIDATE,
+    ),
+    "/weather/hourly-": CachePolicy(
+        max_age=config.HTTP_CACHE_HOURLY_MAX_AGE,
+        stale_while_revalidate=config.HTTP_CACHE_STALE_WHILE_REVALIDATE,
+    ),
+    "/notifications": CachePolicy(private=True),
+}
+
+# (path, query string, credential digest) -> ETag of the last 200, for the policy's max-age
+_etags = TTLCache("http_etag", ttl=0, maxsize=config.HTTP_CACHE_ETAG_MAXSIZE)
+_counters = {"responses": 0, "not_modified": 0, "not_modified_without_route": 0}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def _cache_headers(etag: str, policy: CachePolicy) -> list[tuple[bytes, bytes]]:
+    headers = [(b"etag", etag.encode()), (b"cache-control", policy.header().encode())]
+    if policy.private:
+        headers.append((b"vary", b"Authorization"))
+    return headers
+
+
+async def _send_not_modified(send: Send, etag: str, policy: CachePolicy):
+    _counters["not_modified"] += 1
+    await send({"type": "http.response.start", "status": 304, "headers": _cache_headers(etag, policy)})
+    await send({"type": "http.response.body", "body": b""})
+
+
+class HttpCacheMiddleware:
+    """
+    ETags and conditional GET for the routes of CACHE_POLICIES.
+
+    A 200 JSON response gets an ETag, its own (FastJSONResponse envelopes) or a
+    strong one hashed from the body, and its route's Cache-Control; when the request's If-None-Match still matches, a 304 without
+    body is sent instead. For routes with a max-age the ETag is also remembered
+    for max-age seconds, per credential, and a matching revalidation is answered
+    304 without running the route at all; weather polls are still recorded for
+    prefetch (weather_cache.mark_requested).
+    """
+
+    def __init__(self, app: ASGIApp, base_url: str = "", policies: dict[str, CachePolicy] = CACHE_POLICIES):
+        self.app = app
+        self.base_url = base_url
+        self.policies = sorted(
+            ((base_url + prefix, policy) for prefix, policy in policies.items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    def _policy(self, path: str) -> CachePolicy | None:
+        for prefix, policy in self.policies:
+            if path.startswith(prefix):
+                return policy
+        return None
+
+    def _mark_weather_requested(self, scope: Scope):
+        # the skipped weather route would have recorded the poll for prefetch; the
+        # remembered ETag comes from a 200, so the location is known to exist
+        if not scope["path"].startswith(self.base_url + "/weather/"):
+            return
+        group_id = parse_qs(scope["query_string"].decode("latin-1")).get("group_id")
+        if group_id:
+            weather_cache.mark_requested(group_id[0])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        policy = self._policy(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        key = None
+        if policy.max_age:
+            credential = hashlib.sha256(request_headers.get("authorization", "").encode()).digest()
+            key = (scope["path"], scope["query_string"], credential)
+            etag = _etags.get(key)
+            if etag is not None and if_none_match and etag_matches(if_none_match, etag):
+                _counters["not_modified_without_route"] += 1
+                self._mark_weather_requested(scope)
+                await _send_not_modified(send, etag, policy)
+                return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def send_cached(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] != 200
+                    or "content-length" not in headers
+                    or not headers.get("content-type", "").startswith("application/json")
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            etag = Headers(raw=start["headers"]).get("etag") or compute_etag(body)
+            if key is not None:
+                _etags.set(key, etag, ttl=policy.max_age)
+            _counters["responses"] += 1
+            if if_none_match and etag_matches(if_none_match, etag):
+                await _send_not_modified(send, etag, policy)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            for name, value in _cache_headers(etag, policy):
+                headers[name.decode()] = value.decode()
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_cached)
+
+
+def stats() -> dict:
+    etags = _etags.stats()
+    return {**_counters, "etags": etags["size"], "maxsize": etags["maxsize"], "evictions": etags["evictions"]}
@@ -0,0 +1,19 @@
+"""
+Add title_tokens to existing notifications so keyword search finds them.
+
+    python -m app.migrations.backfill_title_tokens
+
+Safe to re-run: only documents without title_tokens are touched.
+"""
+import asyncio
+from app.logger.logger import logger
+from app.repositories import notification_repo
+
+
+async def main():
+    updated = await notification_repo.backfill_title_tokens()
+    logger.info(f"title_tokens backfilled on {updated} notifications")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+"""
+Move users_read / users_delete arrays of existing notifications into the
+notification_user_state collection.
+
+    python -m app.migrations.notification_user_state
+
+Safe to re-run: only notifications that still carry the arrays are touched.
+Until it has run, list reads keep honouring the arrays.
+"""
+import asyncio
+from app.logger.logger import logger
+from app.repositories import notification_state_repo
+
+
+async def main():
+    migrated = await notification_state_repo.migrate_from_arrays()
+    logger.info(f"Read/delete state migrated for {migrated} notifications")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 from datetime import datetime
 from bson import Binary, UUID_SUBTYPE
+from app.configs import config
 
 
 class NotificationStatus(str, Enum):
@@ -44,6 +45,9 @@ class Notification(BaseModel):
     user_id: Optional[str] = Field(default=None)
     store_ids: List[str] = Field(default_factory=list)
 
+    # later occurrences of the same camera alert folded into this one
+    repeat_count: int = 0
+
     created_at: datetime
     updated_at: datetime
 
@@ -76,6 +80,37 @@ class NotificationData(BaseModel):
         populate_by_name = True
 
 
+class NotificationCreateReq(BaseModel):
+    """One notification of a POST /notifications/ingest batch"""
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+    data: NotificationData
+
+    status: NotificationStatus = NotificationStatus.info
+    type: NotificationType
+
+    has_for_all: bool = False
+
+    tenant_id: Optional[str] = None
+    user_id: Optional[str] = None
+    store_ids: List[str] = Field(default_factory=list)
+
+
+class NotificationIdsReq(BaseModel):
+    """Request model for bulk mark-read / delete"""
+    ids: List[str] = Field(..., min_length=1, max_length=config.NOTIFICATION_BULK_MAX_SIZE)
+
+    @field_validator("ids")
+    def validate_ids(cls, v):
+        for id_str in v:
+            try:
+                uuid.UUID(id_str)
+            except ValueError:
+                raise ValueError(f"invalid notification id: {id_str}")
+        return v
+
+
 class NotificationRes(BaseModel):
     id: str = Field(..., alias="_id")
     title: Optional[str] = None
@@ -85,6 +120,7 @@ class NotificationRes(BaseModel):
     type: NotificationType
     created_at: datetime
     is_read: bool
+    repeat_count: int = 0
 
     @field_validator("id", mode="before")
     def convert_bson_uuid(cls, v):
@@ -103,7 +139,11 @@ class NotificationRes(BaseModel):
 
 
 def to_notification_res(data: dict, user_id: str) -> dict:
-    is_read = user_id in data.get("users_read")
+    # list reads project is_read server-side instead of fetching users_read
+    if "is_read" in data:
+        is_read = data["is_read"]
+    else:
+        is_read = user_id in data.get("users_read", [])
 
     record = NotificationRes(
         id=data.get("_id"),
@@ -113,6 +153,7 @@ def to_notification_res(data: dict, user_id: str) -> dict:
         status=data.get("status"),
         type=data.get("type"),
         is_read=is_read,
+        repeat_count=data.get("repeat_count") or 0,
         created_at=data.get("created_at"),
     )
 
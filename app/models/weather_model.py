@@ -1,6 +1,8 @@
 from enum import Enum
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS, check_weather_providers
 
 
 class SimplifiedWeatherType(str, Enum):
@@ -253,3 +255,14 @@ class WeatherHistoricalReq(BaseModel):
     """Request model for getting historical weather by group_id and date"""
     group_id: str
     date: Optional[str] = None  # Format: YYYY-MM-DD (e.g., "2025-12-24"). If None, uses current date
+
+
+class WeatherBatchReq(BaseModel):
+    """Request model for getting current weather for many group_ids at once"""
+    group_ids: list[str] = Field(..., min_length=1, max_length=config.WEATHER_BATCH_MAX_SIZE)
+    provider: str = WEATHER_PROVIDERS.WEATHERAPI
+
+    @field_validator("provider")
+    def validate_provider(cls, v):
+        check_weather_providers([v])
+        return v
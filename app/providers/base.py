@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import httpx
+from app.models.location_model import Location
+from app.models.weather_model import HourlyWeather, SimplifiedWeatherType
+
+
+class WeatherProvider(ABC):
+    """
+    A weather data source. Providers only know how to fetch their raw payload
+    and parse it into simplified weather types; location lookup, caching,
+    retries, metrics and response building live in weather_repo.
+    """
+
+    # Registry key, one of WEATHER_PROVIDERS
+    name: str
+    # Human readable name used in logs and error messages
+    label: str
+    supports_hourly: bool = True
+    # Max locations per bulk request, 0 when the provider has no bulk API
+    bulk_size: int = 0
+
+    @property
+    @abstractmethod
+    def api_key(self) -> Optional[str]:
+        ...
+
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    @abstractmethod
+    async def fetch_current(self, client: httpx.AsyncClient, location: Location) -> dict:
+        """Call the provider and return the raw current-conditions payload"""
+
+    @abstractmethod
+    def parse_current(self, data: dict) -> SimplifiedWeatherType:
+        """Map a current-conditions payload to a simplified weather type"""
+
+    async def fetch_current_bulk(
+        self, client: httpx.AsyncClient, locations: list[Location]
+    ) -> dict:
+        """Call the provider bulk API for many locations at once"""
+        raise NotImplementedError(f"{self.label} does not support bulk queries")
+
+    def parse_current_bulk(self, data: dict) -> dict[str, SimplifiedWeatherType]:
+        """Map a bulk payload to {group_id: simplified weather type}"""
+        raise NotImplementedError(f"{self.label} does not support bulk queries")
+
+    async def fetch_hourly(
+        self, client: httpx.AsyncClient, location: Location, date: Optional[str] = None
+    ) -> dict:
+        """Call the provider and return the raw hourly forecast payload"""
+        raise NotImplementedError(f"{self.label} does not support hourly forecast")
+
+    def parse_hourly(self, data: dict) -> tuple[str, list[HourlyWeather]]:
+        """Map an hourly payload to (forecast_date, hourly list)"""
+        raise NotImplementedError(f"{self.label} does not support hourly forecast")
+
+
+async def get_json(client: httpx.AsyncClient, url: str, params: dict) -> dict:
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,31 @@
+import httpx
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.models.weather_model import WEATHER_TYPE_MAPPING, SimplifiedWeatherType
+from app.providers.base import WeatherProvider, get_json
+
+
+# Google Weather API - limited coverage, does not support Vietnam
+class GoogleWeatherProvider(WeatherProvider):
+    name = WEATHER_PROVIDERS.GOOGLE
+    label = "Weather API"
+    supports_hourly = False
+
+    @property
+    def api_key(self):
+        return config.GOOGLE_MAPS_API_KEY
+
+    async def fetch_current(self, client: httpx.AsyncClient, location: Location) -> dict:
+        url = "https://weather.googleapis.com/v1/currentConditions:lookup"
+        params = {
+            "key": self.api_key,
+            "location.latitude": location.lat,
+            "location.longitude": location.long,
+        }
+        return await get_json(client, url, params)
+
+    def parse_current(self, data: dict) -> SimplifiedWeatherType:
+        weather_cond = data.get("weatherCondition", {})
+        google_weather_type = weather_cond.get("type", "TYPE_UNSPECIFIED")
+        return WEATHER_TYPE_MAPPING.get(google_weather_type, SimplifiedWeatherType.CLOUDY)
@@ -0,0 +1,51 @@
+from collections import deque
+
+# Number of recent upstream calls kept per provider for latency percentiles
+LATENCY_WINDOW = 500
+
+
+class ProviderMetrics:
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # seconds, successful calls only
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.successes += 1
+
+    def record_failure(self):
+        self.failures += 1
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def to_dict(self) -> dict:
+        p50 = self.percentile(0.5)
+        p99 = self.percentile(0.99)
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+        }
+
+
+_metrics: dict[str, ProviderMetrics] = {}
+
+
+def get_metrics(provider: str) -> ProviderMetrics:
+    metrics = _metrics.get(provider)
+    if metrics is None:
+        metrics = _metrics[provider] = ProviderMetrics()
+    return metrics
+
+
+def get_stats() -> dict:
+    return {provider: metrics.to_dict() for provider, metrics in _metrics.items()}
@@ -0,0 +1,87 @@
+from typing import Optional
+import httpx
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.models.weather_model import (
+    OPENWEATHER_CONDITION_MAPPING,
+    OPENWEATHER_ID_MAPPING,
+    HourlyWeather,
+    SimplifiedWeatherType,
+)
+from app.providers.base import WeatherProvider, get_json
+
+
+def _map_condition(weather: dict) -> SimplifiedWeatherType:
+    # Try specific ID mapping first, then fallback to main condition mapping
+    simplified_type = OPENWEATHER_ID_MAPPING.get(weather.get("id", 803))
+    if not simplified_type:
+        simplified_type = OPENWEATHER_CONDITION_MAPPING.get(
+            weather.get("main", "Clouds"), SimplifiedWeatherType.CLOUDY
+        )
+    return simplified_type
+
+
+# OpenWeather API - Free tier: 1,000 calls/day, 60 calls/minute, only have 3h interval forecast for free tier
+class OpenWeatherProvider(WeatherProvider):
+    name = WEATHER_PROVIDERS.OPENWEATHER
+    label = "OpenWeather API"
+
+    @property
+    def api_key(self):
+        return config.OPENWEATHER_API_KEY
+
+    async def fetch_current(self, client: httpx.AsyncClient, location: Location) -> dict:
+        url = "https://api.openweathermap.org/data/2.5/weather"
+        params = {
+            "lat": location.lat,
+            "lon": location.long,
+            "appid": self.api_key,
+            "units": "metric",
+        }
+        return await get_json(client, url, params)
+
+    def parse_current(self, data: dict) -> SimplifiedWeatherType:
+        weather_list = data.get("weather", [])
+        if not weather_list:
+            raise Exception("No weather data in response")
+        return _map_condition(weather_list[0])
+
+    async def fetch_hourly(
+        self, client: httpx.AsyncClient, location: Location, date: Optional[str] = None
+    ) -> dict:
+        url = "https://api.openweathermap.org/data/2.5/forecast"
+        params = {
+            "lat": location.lat,
+            "lon": location.long,
+            "appid": self.api_key,
+            "units": "metric",
+            "cnt": 8,  # Get 8 x 3-hour intervals = 24 hours
+        }
+        return await get_json(client, url, params)
+
+    def parse_hourly(self, data: dict) -> tuple[str, list[HourlyWeather]]:
+        forecast_list = data.get("list", [])
+        if not forecast_list:
+            raise Exception("No forecast data available")
+
+        hourly_weather = []
+        forecast_date = None
+        for item in forecast_list:
+            dt_txt = item.get("dt_txt")  # Format: "2025-12-24 15:00:00"
+            if not forecast_date:
+                forecast_date = dt_txt.split(" ")[0]
+
+            weather_list = item.get("weather", [])
+            simplified_type = (
+                _map_condition(weather_list[0]) if weather_list else SimplifiedWeatherType.CLOUDY
+            )
+
+            hourly_weather.append(HourlyWeather(
+                time=dt_txt[:-3],  # Remove seconds: "2025-12-24 15:00"
+                weather_type=simplified_type.value,
+                temp_c=item.get("main", {}).get("temp", 0.0),
+                # pop = probability of precipitation, 0.0-1.0
+                chance_of_rain=item.get("pop", 0) * 100,
+            ))
+        return forecast_date, hourly_weather
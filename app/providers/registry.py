@@ -0,0 +1,28 @@
+from app.providers.base import WeatherProvider
+from app.providers.google_provider import GoogleWeatherProvider
+from app.providers.openweather_provider import OpenWeatherProvider
+from app.providers.visualcrossing_provider import VisualCrossingProvider
+from app.providers.weatherapi_provider import WeatherApiProvider
+
+_providers: dict[str, WeatherProvider] = {}
+
+
+def register(provider: WeatherProvider):
+    _providers[provider.name] = provider
+
+
+def get_provider(name: str) -> WeatherProvider:
+    provider = _providers.get(name)
+    if provider is None:
+        raise Exception(f"Unknown weather provider: {name}")
+    return provider
+
+
+def get_providers() -> list[WeatherProvider]:
+    return list(_providers.values())
+
+
+register(GoogleWeatherProvider())
+register(WeatherApiProvider())
+register(OpenWeatherProvider())
+register(VisualCrossingProvider())
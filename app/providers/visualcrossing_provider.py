@@ -0,0 +1,75 @@
+from typing import Optional
+import httpx
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.models.weather_model import (
+    VISUAL_CROSSING_ICON_MAPPING,
+    HourlyWeather,
+    SimplifiedWeatherType,
+)
+from app.providers.base import WeatherProvider, get_json
+
+BASE_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+
+
+# Visual Crossing API - Free tier: 1,000 records/day, works best
+class VisualCrossingProvider(WeatherProvider):
+    name = WEATHER_PROVIDERS.VISUAL_CROSSING
+    label = "Visual Crossing API"
+
+    @property
+    def api_key(self):
+        return config.VISUAL_CROSSING_API_KEY
+
+    async def fetch_current(self, client: httpx.AsyncClient, location: Location) -> dict:
+        # Visual Crossing uses location format: "lat,long"
+        url = f"{BASE_URL}/{location.lat},{location.long}"
+        params = {
+            "key": self.api_key,
+            "unitGroup": "metric",
+            "include": "current",
+            "contentType": "json",
+        }
+        return await get_json(client, url, params)
+
+    def parse_current(self, data: dict) -> SimplifiedWeatherType:
+        current_conditions = data.get("currentConditions", {})
+        if not current_conditions:
+            raise Exception("No current conditions in response")
+        icon = current_conditions.get("icon", "cloudy")
+        return VISUAL_CROSSING_ICON_MAPPING.get(icon, SimplifiedWeatherType.CLOUDY)
+
+    async def fetch_hourly(
+        self, client: httpx.AsyncClient, location: Location, date: Optional[str] = None
+    ) -> dict:
+        # date defaults to today if not specified
+        url = f"{BASE_URL}/{location.lat},{location.long}/{date or 'today'}"
+        params = {
+            "key": self.api_key,
+            "unitGroup": "metric",
+            "include": "hours",
+            "contentType": "json",
+        }
+        return await get_json(client, url, params)
+
+    def parse_hourly(self, data: dict) -> tuple[str, list[HourlyWeather]]:
+        days = data.get("days", [])
+        if not days:
+            raise Exception("No forecast data available")
+
+        today = days[0]
+        forecast_date = today.get("datetime")  # Format: "2025-12-24"
+        hourly_weather = []
+        for hour in today.get("hours", []):
+            hour_time = hour.get("datetime")[:5]  # "15:00:00" -> "15:00"
+            icon = hour.get("icon", "cloudy")
+            hourly_weather.append(HourlyWeather(
+                time=f"{forecast_date} {hour_time}",
+                weather_type=VISUAL_CROSSING_ICON_MAPPING.get(
+                    icon, SimplifiedWeatherType.CLOUDY
+                ).value,
+                temp_c=hour.get("temp", 0.0),
+                chance_of_rain=hour.get("precipprob", 0),  # 0-100
+            ))
+        return forecast_date, hourly_weather
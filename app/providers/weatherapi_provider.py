@@ -0,0 +1,91 @@
+from typing import Optional
+import httpx
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.models.weather_model import (
+    WEATHERAPI_CODE_MAPPING,
+    HourlyWeather,
+    SimplifiedWeatherType,
+)
+from app.providers.base import WeatherProvider, get_json
+
+
+# coverage area: 1-11km, 1 million free calls per month, the statistics are not quite correct
+class WeatherApiProvider(WeatherProvider):
+    name = WEATHER_PROVIDERS.WEATHERAPI
+    label = "WeatherAPI.com"
+    # Bulk requests need a paid plan, see WEATHER_API_BULK_ENABLED
+    bulk_size = 50 if config.WEATHER_API_BULK_ENABLED else 0
+
+    @property
+    def api_key(self):
+        return config.WEATHER_API_KEY
+
+    async def fetch_current(self, client: httpx.AsyncClient, location: Location) -> dict:
+        url = "http://api.weatherapi.com/v1/current.json"
+        params = {
+            "key": self.api_key,
+            "q": f"{location.lat},{location.long}",
+            "aqi": "no",  # Disable air quality data
+        }
+        return await get_json(client, url, params)
+
+    def parse_current(self, data: dict) -> SimplifiedWeatherType:
+        condition = data.get("current", {}).get("condition", {})
+        weather_code = condition.get("code", 1006)  # Default to cloudy
+        return WEATHERAPI_CODE_MAPPING.get(weather_code, SimplifiedWeatherType.CLOUDY)
+
+    async def fetch_current_bulk(
+        self, client: httpx.AsyncClient, locations: list[Location]
+    ) -> dict:
+        url = "http://api.weatherapi.com/v1/current.json"
+        params = {"key": self.api_key, "q": "bulk", "aqi": "no"}
+        body = {
+            "locations": [
+                {"q": f"{location.lat},{location.long}", "custom_id": location.group_id}
+                for location in locations
+            ]
+        }
+        response = await client.post(url, params=params, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    def parse_current_bulk(self, data: dict) -> dict[str, SimplifiedWeatherType]:
+        results = {}
+        for item in data.get("bulk", []):
+            query = item.get("query", {})
+            if "current" in query:
+                results[query.get("custom_id")] = self.parse_current(query)
+        return results
+
+    async def fetch_hourly(
+        self, client: httpx.AsyncClient, location: Location, date: Optional[str] = None
+    ) -> dict:
+        url = "http://api.weatherapi.com/v1/forecast.json"
+        params = {
+            "key": self.api_key,
+            "q": f"{location.lat},{location.long}",
+            "days": 1,  # Get today's forecast with hourly data
+            "aqi": "no",
+        }
+        return await get_json(client, url, params)
+
+    def parse_hourly(self, data: dict) -> tuple[str, list[HourlyWeather]]:
+        forecastday = data.get("forecast", {}).get("forecastday", [])
+        if not forecastday:
+            raise Exception("No forecast data available")
+
+        today = forecastday[0]
+        hourly_weather = []
+        for hour in today.get("hour", []):
+            weather_code = hour.get("condition", {}).get("code", 1006)
+            hourly_weather.append(HourlyWeather(
+                time=hour.get("time"),
+                weather_type=WEATHERAPI_CODE_MAPPING.get(
+                    weather_code, SimplifiedWeatherType.CLOUDY
+                ).value,
+                temp_c=hour.get("temp_c", 0.0),
+                chance_of_rain=hour.get("chance_of_rain", 0),
+            ))
+        return today.get("date"), hourly_weather
@@ -0,0 +1,30 @@
+from datetime import datetime
+from pymongo import IndexModel
+from app.db.database import geocode_collection
+
+# Every lookup is by _id (normalized address), which Mongo always indexes
+INDEXES: list[IndexModel] = []
+
+
+async def get_by_address(normalized_address: str) -> tuple[float, float] | None:
+    """
+    Get cached coordinates for a normalized address (which is the _id)
+    """
+    doc = await geocode_collection.find_one({"_id": normalized_address})
+    if doc:
+        return doc["lat"], doc["long"]
+    return None
+
+
+async def save(normalized_address: str, address: str, lat: float, long: float):
+    """
+    Store geocoding result keyed by normalized address, keeping the raw address for reference
+    """
+    await geocode_collection.update_one(
+        {"_id": normalized_address},
+        {
+            "$set": {"address": address, "lat": lat, "long": long},
+            "$setOnInsert": {"created_at": datetime.now()},
+        },
+        upsert=True,
+    )
@@ -1,29 +1,181 @@
+import asyncio
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from app.configs import config
 from app.db.database import location_collection
+from app.logger.logger import logger
 from app.models.location_model import Location
 
+# Every lookup is by _id (group_id), which Mongo always indexes
+INDEXES: list[IndexModel] = []
+
+# Read-through copy of location_collection. Store coordinates almost never change,
+# so every weather request can skip the find_one round-trip.
+_location_cache: dict[str, Location] = {}
+_sync_task: asyncio.Task | None = None
+
+# OperationFailure codes meaning "no change streams here" (standalone mongod):
+# 40573 ($changeStream needs a replica set), 20 (IllegalOperation)
+_NO_CHANGE_STREAM_CODES = (40573, 20)
+
 
 async def create_location(group_id: str, address: str, lat: float, long: float) -> dict:
     """
     Create a new location record using group_id as primary key
     """
-    
+
     location_data = {
         "_id": group_id,
         "address": address,
         "lat": lat,
         "long": long,
     }
-    
+
     await location_collection.insert_one(location_data)
-    
-    return Location.model_validate(location_data)
+
+    location = Location.model_validate(location_data)
+    _location_cache[group_id] = location
+    return location
+
+
+async def upsert_locations(locations: list[Location]) -> dict[int, str]:
+    """
+    Create or update many locations with one unordered bulk_write.
+
+    Returns:
+        {index in `locations`: error message} for the rows that failed
+    """
+    operations = [
+        UpdateOne(
+            {"_id": location.group_id},
+            {"$set": {"address": location.address, "lat": location.lat, "long": location.long}},
+            upsert=True,
+        )
+        for location in locations
+    ]
+    errors = {}
+    try:
+        await location_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        errors = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+
+    for index, location in enumerate(locations):
+        if index not in errors:
+            _location_cache[location.group_id] = location
+    return errors
 
 
 async def get_by_group_id(group_id: str) -> dict | None:
     """
     Get location by group_id (which is the _id)
     """
+    location = _location_cache.get(group_id)
+    if location:
+        return location
+
     doc = await location_collection.find_one({"_id": group_id})
     if doc:
-        return Location.model_validate(doc)
+        location = Location.model_validate(doc)
+        _location_cache[group_id] = location
+        return location
     return None
+
+
+async def get_by_group_ids(group_ids: list[str]) -> dict[str, Location]:
+    """
+    Get many locations in one round-trip, keyed by group_id.
+    Unknown group_ids are simply absent from the result.
+    """
+    locations = {
+        group_id: _location_cache[group_id]
+        for group_id in group_ids
+        if group_id in _location_cache
+    }
+    misses = [group_id for group_id in group_ids if group_id not in locations]
+    if misses:
+        docs = await location_collection.find({"_id": {"$in": misses}}).to_list(None)
+        for doc in docs:
+            location = Location.model_validate(doc)
+            _location_cache[location.group_id] = location
+            locations[location.group_id] = location
+    return locations
+
+
+async def preload_locations():
+    """
+    Replace the cache with every document of location_collection
+    """
+    global _location_cache
+    docs = await location_collection.find({}).to_list(None)
+    _location_cache = {doc["_id"]: Location.model_validate(doc) for doc in docs}
+    logger.info(f"Location cache loaded: {len(_location_cache)} locations")
+
+
+def _apply_change(change: dict):
+    group_id = change.get("documentKey", {}).get("_id")
+    if change.get("operationType") in ("insert", "replace", "update") and change.get("fullDocument"):
+        _location_cache[group_id] = Location.model_validate(change["fullDocument"])
+    else:
+        # delete, drop, or an update whose document is already gone
+        _location_cache.pop(group_id, None)
+
+
+async def _watch_changes():
+    async with location_collection.watch(full_document="updateLookup") as stream:
+        logger.info("Location cache following change stream")
+        async for change in stream:
+            _apply_change(change)
+
+
+async def _periodic_resync():
+    while True:
+        await asyncio.sleep(config.LOCATION_RESYNC_INTERVAL)
+        try:
+            await preload_locations()
+        except PyMongoError as e:
+            logger.error(f"Location cache resync failed: {str(e)}")
+
+
+async def _sync_locations():
+    while True:
+        try:
+            await _watch_changes()
+        except OperationFailure as e:
+            if e.code not in _NO_CHANGE_STREAM_CODES:
+                logger.error(f"Location change stream error: {str(e)}")
+            else:
+                # Change streams need a replica set; standalone mongod falls back to polling
+                logger.info(f"Change stream unavailable ({e.code}), resync every {config.LOCATION_RESYNC_INTERVAL}s")
+                await _periodic_resync()
+        except PyMongoError as e:
+            logger.error(f"Location change stream error: {str(e)}")
+        # stream dropped: reload so nothing missed meanwhile stays stale, then watch again
+        await asyncio.sleep(config.LOCATION_RESYNC_INTERVAL)
+        try:
+            await preload_locations()
+        except PyMongoError as e:
+            logger.error(f"Location cache reload failed: {str(e)}")
+
+
+async def start_location_cache():
+    """
+    Preload the cache and keep it in sync in the background. Called from the app lifespan.
+    """
+    global _sync_task
+    try:
+        await preload_locations()
+    except PyMongoError as e:
+        # the cache still fills lazily through get_by_group_id
+        logger.error(f"Location cache preload failed: {str(e)}")
+    _sync_task = asyncio.create_task(_sync_locations())
+
+
+async def stop_location_cache():
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
@@ -1,15 +1,31 @@
+import asyncio
+import base64
+import json
 import re
 import uuid
+from datetime import datetime
+from fastapi import HTTPException, status
+from typing import AsyncIterator
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.cache.ttl_cache import TTLCache
+from app.configs import config
 from app.db.database import notification_collection
+from app.logger.logger import logger
+from app.repositories import notification_state_repo
 from app.models.base import ObjectStatus
 from app.models.notification_model import Notification, to_notification_res
 from app.schemas.base import AppBasePagingRes, BasePagingReq
+from app.utils.utils import SEARCH_TOKEN_MAX_PREFIX, search_tokens, search_words
 from bson import Binary, UUID_SUBTYPE
 
 
+def to_bson_id(id_str: str) -> Binary:
+    return Binary(uuid.UUID(id_str).bytes, UUID_SUBTYPE)
+
+
 async def get_by_id(id_str: str) -> dict | None:
-    uid = uuid.UUID(id_str)
-    bson_id = Binary(uid.bytes, UUID_SUBTYPE)
+    bson_id = to_bson_id(id_str)
 
     doc = await notification_collection.find_one({"_id": bson_id})
     if doc:
@@ -17,17 +33,67 @@ async def get_by_id(id_str: str) -> dict | None:
     return None
 
 
-async def get_by_filter(params: BasePagingReq, tenant_id: str, user_id: str):
-    # nếu None thì return giá trị này
-    empty_items = AppBasePagingRes(
-        items=[],
-        page_size=params.page_size,
-        page=params.page,
-        total=0,
-        is_full=True,
-    ).to_dict()
+# (tenant_id, user_id, keyword) -> total; exact counts are only refreshed every few seconds.
+# A delete invalidates the user's totals in this process; other workers catch up within the TTL.
+_total_cache = TTLCache(
+    "notification_total",
+    ttl=config.NOTIFICATION_TOTAL_CACHE_TTL,
+    maxsize=config.NOTIFICATION_TOTAL_CACHE_MAXSIZE,
+)
+
+# newest first; _id breaks ties between notifications created in the same millisecond
+SORT_ORDER = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+# One index per branch of the get_by_filter $or, each ending in SORT_ORDER so the
+# branches are merge-sorted from the indexes instead of an in-memory sort
+INDEXES: list[IndexModel] = [
+    IndexModel(
+        [("has_for_all", ASCENDING), *SORT_ORDER],
+        name="has_for_all_created_at",
+    ),
+    IndexModel(
+        [("tenant_id", ASCENDING), ("has_for_all", ASCENDING), ("user_id", ASCENDING), *SORT_ORDER],
+        name="tenant_user_created_at",
+    ),
+    # polling for new notifications when no change stream is available
+    IndexModel(SORT_ORDER, name="created_at"),
+    # keyword search: exact match on the prefix tokens of the title
+    IndexModel(
+        [("title_tokens", ASCENDING), *SORT_ORDER],
+        name="title_tokens_created_at",
+    ),
+]
+
+
+def encode_cursor(doc: dict) -> str:
+    """
+    Opaque keyset cursor pointing after `doc` in SORT_ORDER
+    """
+    payload = {
+        "created_at": doc["created_at"].isoformat(),
+        "id": str(uuid.UUID(bytes=doc["_id"])),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, Binary]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(payload["created_at"])
+        bson_id = Binary(uuid.UUID(payload["id"]).bytes, UUID_SUBTYPE)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return created_at, bson_id
+
+
+def build_filter_query(params: BasePagingReq, tenant_id: str, user_id: str) -> dict:
+    """
+    Mongo filter for the notifications visible to a user (before keyset seeking)
+    """
     query = {
         # bỏ qua các thông báo mà user đã xoá theo users_delete
+        # (chỉ còn ở document chưa migrate, xem notification_state_repo)
         "users_delete": {"$ne": user_id},
         "$or": [
             # 1. Notification dành cho tất cả
@@ -52,35 +118,310 @@ async def get_by_filter(params: BasePagingReq, tenant_id: str, user_id: str):
     # if store_ids:
     #     query["$or"].append({"store_ids": {"$in": params.store_ids}})
 
-    # tìm theo title
+    # tìm theo title: mỗi từ của keyword phải là tiền tố của một từ trong title
     if params.keyword:
-        keyword_regex = re.compile(f".*{params.keyword}.*", re.IGNORECASE)
-        query.update(
-            {
-                {"title": {"$regex": keyword_regex}},
-            }
+        words = [word[:SEARCH_TOKEN_MAX_PREFIX] for word in search_words(params.keyword, fold=False)]
+        if words:
+            query["$and"] = [
+                {
+                    "$or": [
+                        {"title_tokens": {"$all": words}},
+                        # written without with_search_tokens (e.g. by another service) and
+                        # not backfilled yet: match the title itself, without diacritic folding
+                        {"title_tokens": {"$exists": False}, "$and": [{"title": _title_word(w)} for w in words]},
+                    ]
+                }
+            ]
+
+    return query
+
+
+def _title_word(word: str) -> re.Pattern:
+    # `word` at the start of a word of the title, case-insensitive
+    return re.compile(r"(?:^|\s)" + re.escape(word), re.IGNORECASE)
+
+
+def with_search_tokens(doc: dict) -> dict:
+    """
+    Add the title_tokens keyword search runs on. Every write of a title must go through here.
+    """
+    doc["title_tokens"] = search_tokens(doc.get("title"))
+    return doc
+
+
+async def insert_many(docs: list[dict]) -> int:
+    """
+    Insert prepared notification documents with one unordered insert_many.
+    Returns the number inserted; a failed document does not stop the others.
+    """
+    try:
+        result = await notification_collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        logger.error(f"Notification insert: {len(errors)} of {len(docs)} failed, first: {errors[0].get('errmsg') if errors else ''}")
+        return e.details.get("nInserted", len(docs) - len(errors))
+
+
+async def add_repeats(repeats: dict[Binary, tuple[int, datetime]]):
+    """
+    Fold coalesced repeats into their notifications: {_id: (repeats, last seen at)}
+    """
+    operations = [
+        UpdateOne(
+            {"_id": bson_id},
+            {"$inc": {"repeat_count": count}, "$max": {"updated_at": updated_at}},
         )
+        for bson_id, (count, updated_at) in repeats.items()
+    ]
+    await notification_collection.bulk_write(operations, ordered=False)
 
-    skip = (params.page - 1) * params.page_size
 
-    # lấy total
-    total = await notification_collection.count_documents(query)
+async def backfill_title_tokens(batch_size: int = 1000) -> int:
+    """
+    Add title_tokens to notifications written before keyword search used them.
+    Returns the number of documents updated.
+    """
+    updated = 0
+    cursor = notification_collection.find(
+        {"title_tokens": {"$exists": False}}, {"title": 1}
+    ).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"title_tokens": search_tokens(doc.get("title"))}}))
+        if len(batch) >= batch_size:
+            await notification_collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await notification_collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+
+_backfill_task: asyncio.Task | None = None
+
+
+async def _periodic_backfill():
+    while True:
+        await asyncio.sleep(config.NOTIFICATION_TITLE_TOKEN_BACKFILL_INTERVAL)
+        try:
+            updated = await backfill_title_tokens()
+        except PyMongoError as e:
+            logger.error(f"title_tokens backfill failed: {str(e)}")
+            continue
+        if updated:
+            logger.info(f"title_tokens backfilled on {updated} notifications")
+
+
+async def start_title_token_backfill():
+    """
+    Keep title_tokens current for notifications written without with_search_tokens.
+    Called from the app lifespan.
+    """
+    global _backfill_task
+    if config.NOTIFICATION_TITLE_TOKEN_BACKFILL_INTERVAL > 0:
+        _backfill_task = asyncio.create_task(_periodic_backfill())
+
+
+async def stop_title_token_backfill():
+    global _backfill_task
+    if _backfill_task is not None:
+        _backfill_task.cancel()
+        try:
+            await _backfill_task
+        except asyncio.CancelledError:
+            pass
+        _backfill_task = None
 
-    records = (
-        await notification_collection.find(query)
-        .skip(skip)
-        .limit(params.page_size)
-        .to_list()
-    )
 
-    if not records or len(records) == 0:
-        return empty_items
+async def get_by_filter(params: BasePagingReq, tenant_id: str, user_id: str):
+    query = build_filter_query(params, tenant_id, user_id)
+
+    if params.cursor:
+        # keyset: seek straight past the last (created_at, _id) seen instead of skipping
+        created_at, bson_id = decode_cursor(params.cursor)
+        seek = {
+            "$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": bson_id}},
+            ]
+        }
+        skip = 0
+    else:
+        seek = None
+        skip = (params.page - 1) * params.page_size
+
+    total_key = (tenant_id, user_id, params.keyword) if params.include_total else None
+    # one extra record tells whether another page exists
+    records, total = await _find_page(
+        query, seek, skip, params.page_size + 1, total_key, list_projection(user_id), user_id
+    )
+    has_more = len(records) > params.page_size
+    records = records[: params.page_size]
 
     res_data = list(map(lambda x: to_notification_res(x, user_id), records))
     return AppBasePagingRes(
         items=res_data,
         page_size=params.page_size,
-        page=params.page,
+        page=None if params.cursor else params.page,
         total=total,
-        is_full=params.page_size * params.page >= total,
+        is_full=not has_more,
+        # page-mode clients can switch to keyset paging from any page
+        next_cursor=encode_cursor(records[-1]) if has_more else None,
     ).to_dict()
+
+
+def _unread_query(tenant_id: str, user_id: str, read_all_before: datetime | None) -> dict:
+    query = build_filter_query(BasePagingReq(), tenant_id, user_id)
+    # legacy array, on documents not migrated yet
+    query["users_read"] = {"$ne": user_id}
+    if read_all_before is not None:
+        query["created_at"] = {"$gt": read_all_before}
+    return query
+
+
+async def count_unread(tenant_id: str, user_id: str) -> int:
+    """
+    Exact number of visible notifications the user has neither read nor deleted
+    """
+    query = _unread_query(tenant_id, user_id, await notification_state_repo.get_read_all_before(user_id))
+    # read or deleted ones are counted from the user's states and subtracted,
+    # rather than excluded with an _id $nin of all of them
+    visible, flagged = await asyncio.gather(
+        notification_collection.count_documents(query),
+        notification_state_repo.count_flagged(user_id, ["read", "deleted"], query),
+    )
+    return visible - flagged
+
+
+async def get_unread_ids(tenant_id: str, user_id: str, notification_ids: list[Binary]) -> list[Binary]:
+    """
+    Which of `notification_ids` are visible to the user and neither read nor deleted.
+    Ids that do not exist, are hidden from the user or are below the mark-all-read
+    watermark are left out.
+    """
+    flagged, read_all_before = await notification_state_repo.get_read_state(
+        user_id, notification_ids, ("read", "deleted")
+    )
+    candidates = [bson_id for bson_id in notification_ids if bson_id not in flagged]
+    if not candidates:
+        return []
+    query = _unread_query(tenant_id, user_id, read_all_before)
+    # bounded by NOTIFICATION_BULK_MAX_SIZE
+    query["_id"] = {"$in": candidates}
+    docs = await notification_collection.find(query, {"_id": 1}).to_list(None)
+    return [doc["_id"] for doc in docs]
+
+
+def invalidate_totals(user_id: str):
+    """Drop the user's cached totals, after the user deleted notifications"""
+    for key in _total_cache.keys():
+        if key[1] == user_id:
+            _total_cache.invalidate(key)
+
+
+def list_projection(user_id: str) -> dict:
+    """
+    Only the fields NotificationRes needs. is_read is computed by the server from
+    the legacy users_read array and the user's states (see page_pipeline), so
+    neither the data dict nor the users_read array leaves Mongo.
+    """
+    return {
+        "_id": 1,
+        "title": 1,
+        "description": 1,
+        "status": 1,
+        "type": 1,
+        "created_at": 1,
+        "repeat_count": 1,
+        "is_read": {"$or": [{"$in": [user_id, {"$ifNull": ["$users_read", []]}]}, "$_read_state"]},
+    }
+
+
+def page_pipeline(
+    query: dict, seek: dict | None, skip: int, limit: int, projection: dict, user_id: str
+) -> list[dict]:
+    """
+    Aggregation of one page of the notifications the user has not deleted.
+
+    $match and $sort come first, so the planner reads the SORT_ORDER indexes in
+    order and stops after the page. Deleted notifications are then dropped by an
+    anti-join on the user's states, so the query stays the same size however
+    many the user deleted, and the read state of the page is joined last, so
+    is_read comes back with the page.
+    """
+    stages = [{"$match": {"$and": [query, seek]} if seek else query}, {"$sort": dict(SORT_ORDER)}]
+    stages += notification_state_repo.exclude_flagged(user_id, ["deleted"])
+    if skip:
+        stages.append({"$skip": skip})
+    stages.append({"$limit": limit})
+    stages += notification_state_repo.with_read_state(user_id)
+    stages.append({"$project": projection})
+    return stages
+
+
+async def _count_visible(query: dict, user_id: str) -> int:
+    # the count includes what the user deleted; those are counted from the user's states
+    total, deleted = await asyncio.gather(
+        notification_collection.count_documents(query),
+        notification_state_repo.count_flagged(user_id, ["deleted"], query),
+    )
+    return total - deleted
+
+
+async def _find_page(
+    query: dict,
+    seek: dict | None,
+    skip: int,
+    limit: int,
+    total_key: tuple | None,
+    projection: dict,
+    user_id: str,
+) -> tuple[list[dict], int | None]:
+    """
+    Fetch one page, and the total when `total_key` is given, in one round-trip.
+
+    A cached total only needs the page itself; otherwise the page and the count
+    are sent concurrently. They are not combined in a $facet: a $sort inside
+    $facet cannot use an index, so every matching document would be sorted in
+    memory to return one page.
+    """
+    pipeline = page_pipeline(query, seek, skip, limit, projection, user_id)
+    total = _total_cache.get(total_key) if total_key is not None else None
+    if total_key is None or total is not None:
+        return await notification_collection.aggregate(pipeline).to_list(None), total
+
+    records, total = await asyncio.gather(
+        notification_collection.aggregate(pipeline).to_list(None), _count_visible(query, user_id)
+    )
+    _total_cache.set(total_key, total)
+    return records, total
+
+
+async def watch_inserts(resume_after: dict | None = None) -> AsyncIterator[dict]:
+    """
+    Change events for newly inserted notifications, with the full document.
+    Raises OperationFailure on a standalone mongod (no change streams).
+    """
+    async with notification_collection.watch(
+        [{"$match": {"operationType": "insert"}}], resume_after=resume_after
+    ) as stream:
+        async for change in stream:
+            yield change
+
+
+async def find_created_after(created_at: datetime, bson_id: Binary | None, limit: int) -> list[dict]:
+    """
+    Notifications after (created_at, _id) in ascending order: the polling
+    counterpart of watch_inserts.
+    """
+    after = [{"created_at": {"$gt": created_at}}]
+    if bson_id is not None:
+        after.append({"created_at": created_at, "_id": {"$gt": bson_id}})
+    return (
+        await notification_collection.find({"$or": after})
+        .sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+        .limit(limit)
+        .to_list()
+    )
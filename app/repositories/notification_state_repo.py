@@ -0,0 +1,223 @@
+from datetime import datetime
+from bson import Binary
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from app.db.database import notification_collection, notification_user_state_collection
+
+# One document per (user_id, notification_id) the user has read or deleted:
+#     {user_id, notification_id, read, deleted, updated_at}
+# plus one mark-all-read watermark per user, stored with notification_id None:
+#     {user_id, notification_id: None, read_all_before}
+# Broadcast notifications stay the same size however many users a tenant has.
+INDEXES: list[IndexModel] = [
+    IndexModel(
+        [("user_id", ASCENDING), ("notification_id", ASCENDING)],
+        name="user_notification",
+        unique=True,
+    ),
+    IndexModel(
+        [("user_id", ASCENDING), ("deleted", ASCENDING)],
+        name="user_deleted",
+    ),
+]
+
+
+async def _set_flag(user_id: str, notification_ids: list[Binary], flag: str) -> int:
+    now = datetime.now()
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "notification_id": notification_id},
+            {"$set": {flag: True, "updated_at": now}},
+            upsert=True,
+        )
+        for notification_id in notification_ids
+    ]
+    result = await notification_user_state_collection.bulk_write(operations, ordered=False)
+    return result.upserted_count + result.modified_count
+
+
+async def mark_read(user_id: str, notification_ids: list[Binary]) -> int:
+    """
+    Mark notifications read for a user. Returns the number of states changed.
+    """
+    return await _set_flag(user_id, notification_ids, "read")
+
+
+async def mark_deleted(user_id: str, notification_ids: list[Binary]) -> int:
+    """
+    Hide notifications from a user's list. Returns the number of states changed.
+    """
+    return await _set_flag(user_id, notification_ids, "deleted")
+
+
+async def mark_all_read(user_id: str, before: datetime):
+    """
+    Everything created up to `before` counts as read for the user.
+    """
+    await notification_user_state_collection.update_one(
+        {"user_id": user_id, "notification_id": None},
+        {"$max": {"read_all_before": before}},
+        upsert=True,
+    )
+
+
+def exclude_flagged(user_id: str, flags: list[str]) -> list[dict]:
+    """
+    Aggregation stages dropping the notifications the user has any of `flags` on.
+    An anti-join through the user_notification index, one lookup per notification
+    reaching the stage, instead of an _id $nin listing every flagged id.
+    """
+    return [
+        {
+            "$lookup": {
+                "from": notification_user_state_collection.name,
+                "localField": "_id",
+                "foreignField": "notification_id",
+                "pipeline": [
+                    {"$match": {"user_id": user_id, "$or": [{flag: True} for flag in flags]}},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "_flagged",
+            }
+        },
+        {"$match": {"_flagged.0": {"$exists": False}}},
+    ]
+
+
+def with_read_state(user_id: str) -> list[dict]:
+    """
+    Aggregation stages adding `_read_state`: whether the user's states mark the
+    notification read, by its own state (user_notification index) or by the
+    mark-all-read watermark. The watermark lookup does not depend on the
+    notification, so the server runs it once per query.
+    """
+    return [
+        {
+            "$lookup": {
+                "from": notification_user_state_collection.name,
+                "localField": "_id",
+                "foreignField": "notification_id",
+                "pipeline": [{"$match": {"user_id": user_id, "read": True}}, {"$project": {"_id": 1}}],
+                "as": "_read",
+            }
+        },
+        {
+            "$lookup": {
+                "from": notification_user_state_collection.name,
+                "pipeline": [
+                    {"$match": {"user_id": user_id, "notification_id": None}},
+                    {"$project": {"_id": 0, "read_all_before": 1}},
+                ],
+                "as": "_watermark",
+            }
+        },
+        {
+            "$addFields": {
+                "_read_state": {
+                    "$or": [
+                        {"$gt": [{"$size": "$_read"}, 0]},
+                        {"$lte": ["$created_at", {"$arrayElemAt": ["$_watermark.read_all_before", 0]}]},
+                    ]
+                }
+            }
+        },
+    ]
+
+
+async def count_flagged(user_id: str, flags: list[str], notification_query: dict) -> int:
+    """
+    How many notifications matching `notification_query` the user has any of `flags` on.
+    Walks the user's own states, so the cost follows what the user did, not the
+    size of the notification collection.
+    """
+    result = await notification_user_state_collection.aggregate(
+        [
+            {"$match": {"user_id": user_id, "$or": [{flag: True} for flag in flags]}},
+            {
+                "$lookup": {
+                    "from": notification_collection.name,
+                    "localField": "notification_id",
+                    "foreignField": "_id",
+                    "pipeline": [{"$match": notification_query}, {"$project": {"_id": 1}}],
+                    "as": "notification",
+                }
+            },
+            {"$match": {"notification.0": {"$exists": True}}},
+            {"$count": "count"},
+        ]
+    ).to_list(1)
+    return result[0]["count"] if result else 0
+
+
+async def get_read_state(
+    user_id: str, notification_ids: list[Binary], flags: tuple[str, ...] = ("read",)
+) -> tuple[set[Binary], datetime | None]:
+    """
+    Which of `notification_ids` the user has read (or has any of `flags` on),
+    and their mark-all-read watermark, in one round-trip.
+    """
+    docs = await notification_user_state_collection.find(
+        {
+            "user_id": user_id,
+            "$or": [
+                {"notification_id": {"$in": notification_ids}, "$or": [{flag: True} for flag in flags]},
+                {"notification_id": None},
+            ],
+        }
+    ).to_list(None)
+    read_ids = {doc["notification_id"] for doc in docs if doc["notification_id"] is not None}
+    read_all_before = next(
+        (doc.get("read_all_before") for doc in docs if doc["notification_id"] is None), None
+    )
+    return read_ids, read_all_before
+
+
+async def get_read_all_before(user_id: str) -> datetime | None:
+    doc = await notification_user_state_collection.find_one({"user_id": user_id, "notification_id": None})
+    return doc.get("read_all_before") if doc else None
+
+
+async def migrate_from_arrays(batch_size: int = 500) -> int:
+    """
+    Move users_read / users_delete arrays into notification_user_state and drop them
+    from the notification documents. Returns the number of notifications migrated.
+    """
+    migrated = 0
+    cursor = notification_collection.find(
+        {"$or": [{"users_read.0": {"$exists": True}}, {"users_delete.0": {"$exists": True}}]},
+        {"users_read": 1, "users_delete": 1},
+    ).batch_size(batch_size)
+
+    async def flush(docs: list[dict]):
+        now = datetime.now()
+        states = [
+            UpdateOne(
+                {"user_id": user_id, "notification_id": doc["_id"]},
+                {"$set": {flag: True, "updated_at": now}},
+                upsert=True,
+            )
+            for doc in docs
+            for field, flag in (("users_read", "read"), ("users_delete", "deleted"))
+            for user_id in doc.get(field) or []
+        ]
+        if states:
+            await notification_user_state_collection.bulk_write(states, ordered=False)
+        # only once the states are stored, so a re-run picks up an interrupted batch
+        await notification_collection.bulk_write(
+            [
+                UpdateOne({"_id": doc["_id"]}, {"$unset": {"users_read": "", "users_delete": ""}})
+                for doc in docs
+            ],
+            ordered=False,
+        )
+
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+        migrated += len(batch)
+    return migrated
@@ -1,609 +1,427 @@
+import asyncio
+import time
 import httpx
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from app.cache import weather_cache
+from app.cache.weather_cache import WeatherKind
+from app.clients import http_client
 from app.configs import config
-from app.models.weather_model import (
-    WeatherResponse,
-    WEATHER_TYPE_MAPPING,
-    SimplifiedWeatherType,
-)
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.models.weather_model import WeatherHourlyResponse, WeatherResponse
+from app.providers import metrics, registry
+from app.providers.base import WeatherProvider
 from app.repositories import location_repo
 from app.logger.logger import logger
 
-#open weather api, limit free tier
-#gg do not support vietnam 
-async def get_weather_by_group_id(group_id: str) -> Optional[WeatherResponse]:
-    """
-    Get current weather conditions from Google Weather API and return simplified weather type
-    
-    Args:
-        group_id: Group/store ID to fetch location and weather data
-        
-    Returns:
-        WeatherResponse with simplified weather type (sunny, partly cloudy, cloudy, light rain, heavy rain)
-        
-    Raises:
-        Exception: If location not found or API call fails
-    """
-    # Get location from database
+# Upstream responses worth retrying: rate limited or server side errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+async def _get_location(group_id: str) -> Location:
     location = await location_repo.get_by_group_id(group_id)
-    
     if not location:
         raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    url = "https://weather.googleapis.com/v1/currentConditions:lookup"
-    
-    params = {
-        "key": config.GOOGLE_MAPS_API_KEY,
-        "location.latitude": lat,
-        "location.longitude": long,
-    }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"Weather API response for group_id={group_id}")
-            
-            # Get weather type from API
-            weather_cond = data.get("weatherCondition", {})
-            google_weather_type = weather_cond.get("type", "TYPE_UNSPECIFIED")
-            
-            # Map to simplified weather type
-            simplified_type = WEATHER_TYPE_MAPPING.get(
-                google_weather_type, SimplifiedWeatherType.CLOUDY
-            )
-            
-            logger.info(
-                f"Mapped weather type: {google_weather_type} -> {simplified_type.value}"
-            )
-            
-            # Create simplified response
-            weather_response = WeatherResponse(
-                weather_type=simplified_type.value,
-                group_id=group_id,
+    return location
+
+
+async def _call_provider(
+    provider: WeatherProvider, fetch: Callable[[httpx.AsyncClient], Awaitable[dict]]
+) -> dict:
+    """
+    Run one provider fetch with retries on transient errors and record its latency
+    """
+    client = http_client.get_client(provider.name)
+    provider_metrics = metrics.get_metrics(provider.name)
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            data = await fetch(client)
+            provider_metrics.record_success(time.perf_counter() - started)
+            return data
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            retryable = (
+                isinstance(e, httpx.TransportError)
+                or e.response.status_code in RETRYABLE_STATUS_CODES
             )
-            
-            return weather_response
-            
+            if not retryable or attempt >= config.WEATHER_MAX_RETRIES:
+                provider_metrics.record_failure()
+                raise
+            attempt += 1
+            provider_metrics.retries += 1
+            logger.warning(f"{provider.label} retry {attempt} after error: {e!r}")
+            await asyncio.sleep(config.WEATHER_RETRY_BACKOFF * 2 ** (attempt - 1))
+        except Exception:
+            provider_metrics.record_failure()
+            raise
+
+
+async def _load_current(
+    provider: WeatherProvider, group_id: str, location: Optional[Location] = None
+) -> WeatherResponse:
+    if location is None:
+        location = await _get_location(group_id)
+    try:
+        data = await _call_provider(
+            provider, lambda client: provider.fetch_current(client, location)
+        )
+        simplified_type = provider.parse_current(data)
     except httpx.HTTPStatusError as e:
-        logger.error(f"Weather API HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"Weather API error: {e.response.status_code}")
+        logger.error(f"{provider.label} HTTP error: {e.response.status_code} - {e.response.text}")
+        raise Exception(f"{provider.label} error: {e.response.status_code}")
     except Exception as e:
-        logger.error(f"Weather API error: {str(e)}")
-        raise Exception(f"Failed to fetch weather data: {str(e)}")
+        logger.error(f"{provider.label} error: {str(e)}")
+        raise Exception(f"Failed to fetch weather data from {provider.label}: {str(e)}")
 
+    logger.info(f"{provider.label} group_id={group_id} -> {simplified_type.value}")
+    return WeatherResponse(weather_type=simplified_type.value, group_id=group_id)
 
-# coverage area: 1-11km, 1 million free calls per month, the statistics are not quite correct
-async def get_weather_by_group_id_weatherapi(group_id: str) -> Optional[WeatherResponse]:
-    """
-    Get current weather conditions from WeatherAPI.com and return simplified weather type
-    
-    Args:
-        group_id: Group/store ID to fetch location and weather data
-        
-    Returns:
-        WeatherResponse with simplified weather type (sunny, partly cloudy, cloudy, light rain, heavy rain)
-        
-    Raises:
-        Exception: If location not found or API call fails
-    """
-    # Get location from database
-    location = await location_repo.get_by_group_id(group_id)
-    
-    if not location:
-        raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    url = "http://api.weatherapi.com/v1/current.json"
-    
-    params = {
-        "key": config.WEATHER_API_KEY,
-        "q": f"{lat},{long}",
-        "aqi": "no",  # Disable air quality data
-    }
-    
+
+async def _load_hourly(
+    provider: WeatherProvider, group_id: str, date: Optional[str]
+) -> WeatherHourlyResponse:
+    if not provider.supports_hourly:
+        raise Exception(f"{provider.label} does not support hourly forecast")
+
+    location = await _get_location(group_id)
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"WeatherAPI.com response for group_id={group_id}")
-            
-            # Get weather condition code from API
-            current = data.get("current", {})
-            condition = current.get("condition", {})
-            weather_code = condition.get("code", 1006)  # Default to cloudy
-            
-            # Import the mapping
-            from app.models.weather_model import WEATHERAPI_CODE_MAPPING
-            
-            # Map to simplified weather type
-            simplified_type = WEATHERAPI_CODE_MAPPING.get(
-                weather_code, SimplifiedWeatherType.CLOUDY
-            )
-            
-            logger.info(
-                f"Mapped WeatherAPI code: {weather_code} ({condition.get('text')}) -> {simplified_type.value}"
-            )
-            
-            # Create simplified response
-            weather_response = WeatherResponse(
-                weather_type=simplified_type.value,
-                group_id=group_id,
-            )
-            
-            return weather_response
-            
+        data = await _call_provider(
+            provider, lambda client: provider.fetch_hourly(client, location, date)
+        )
+        forecast_date, hourly_weather = provider.parse_hourly(data)
     except httpx.HTTPStatusError as e:
-        logger.error(f"WeatherAPI.com HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"WeatherAPI.com error: {e.response.status_code}")
+        logger.error(f"{provider.label} HTTP error: {e.response.status_code} - {e.response.text}")
+        raise Exception(f"{provider.label} error: {e.response.status_code}")
     except Exception as e:
-        logger.error(f"WeatherAPI.com error: {str(e)}")
-        raise Exception(f"Failed to fetch weather data from WeatherAPI.com: {str(e)}")
+        logger.error(f"{provider.label} hourly forecast error: {str(e)}")
+        raise Exception(f"Failed to fetch hourly weather data from {provider.label}: {str(e)}")
+
+    logger.info(f"{provider.label} group_id={group_id} -> {len(hourly_weather)} intervals")
+    return WeatherHourlyResponse(
+        group_id=group_id,
+        forecast_date=forecast_date,
+        hourly=hourly_weather,
+    )
 
 
-async def get_weather_hourly_by_group_id(group_id: str):
+async def get_current_weather(provider_name: str, group_id: str) -> WeatherResponse:
     """
-    Get 24-hour weather forecast from WeatherAPI.com and return simplified weather types
-    
-    Args:
-        group_id: Group/store ID to fetch location and weather data
-        
-    Returns:
-        WeatherHourlyResponse with 24 hours of weather data
-        
+    Get current weather from any registered provider, served from cache when fresh
+
     Raises:
-        Exception: If location not found or API call fails
+        Exception: If provider is unknown, location not found or API call fails
     """
-    # Get location from database
-    location = await location_repo.get_by_group_id(group_id)
-    
-    if not location:
-        raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    url = "http://api.weatherapi.com/v1/forecast.json"
-    
-    params = {
-        "key": config.WEATHER_API_KEY,
-        "q": f"{lat},{long}",
-        "days": 1,  # Get today's forecast with hourly data
-        "aqi": "no",
-    }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"WeatherAPI.com hourly forecast for group_id={group_id}")
-            
-            # Get forecast data
-            forecast = data.get("forecast", {})
-            forecastday = forecast.get("forecastday", [])
-            
-            if not forecastday:
-                raise Exception("No forecast data available")
-            
-            today = forecastday[0]
-            forecast_date = today.get("date")
-            hour_data = today.get("hour", [])
-            
-            from app.models.weather_model import WEATHERAPI_CODE_MAPPING, HourlyWeather, WeatherHourlyResponse
-            
-            # Process hourly data
-            hourly_weather = []
-            for hour in hour_data:
-                time = hour.get("time")
-                temp_c = hour.get("temp_c", 0.0)
-                condition = hour.get("condition", {})
-                weather_code = condition.get("code", 1006)
-                chance_of_rain = hour.get("chance_of_rain", 0)  
-                
-                if hour_data.index(hour) == 0:
-                    logger.info(f"Sample hour data - chance_of_rain: {chance_of_rain}, condition: {condition.get('text')}")
-                
-                # Map to simplified weather type
-                simplified_type = WEATHERAPI_CODE_MAPPING.get(
-                    weather_code, SimplifiedWeatherType.CLOUDY
-                )
-                
-                hourly_weather.append(HourlyWeather(
-                    time=time,
-                    weather_type=simplified_type.value,
-                    temp_c=temp_c,
-                    chance_of_rain=chance_of_rain,
-                ))
-            
-            logger.info(f"Processed {len(hourly_weather)} hours of weather data")
-            
-            # Create response
-            weather_response = WeatherHourlyResponse(
-                group_id=group_id,
-                forecast_date=forecast_date,
-                hourly=hourly_weather,
-            )
-            
-            return weather_response
-            
-    except httpx.HTTPStatusError as e:
-        logger.error(f"WeatherAPI.com HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"WeatherAPI.com error: {e.response.status_code}")
-    except Exception as e:
-        logger.error(f"WeatherAPI.com hourly forecast error: {str(e)}")
-        raise Exception(f"Failed to fetch hourly weather data: {str(e)}")
+    provider = registry.get_provider(provider_name)
+    weather = await weather_cache.get_or_load(
+        provider.name,
+        WeatherKind.CURRENT,
+        group_id,
+        lambda: _load_current(provider, group_id),
+    )
+    # only now is group_id known to be a location
+    weather_cache.mark_requested(group_id)
+    return weather
 
 
-# OpenWeather API - Free tier: 1,000 calls/day, 60 calls/minute, only have 3h interval forecast for free tier
-async def get_weather_by_group_id_openweather(group_id: str) -> Optional[WeatherResponse]:
+async def get_hourly_weather(
+    provider_name: str, group_id: str, date: Optional[str] = None
+) -> WeatherHourlyResponse:
     """
-    Get current weather conditions from OpenWeather API and return simplified weather type
-    
-    Args:
-        group_id: Group/store ID to fetch location and weather data
-        
-    Returns:
-        WeatherResponse with simplified weather type (sunny, partly cloudy, cloudy, light rain, heavy rain)
-        
+    Get hourly forecast from any registered provider, served from cache when fresh
+
     Raises:
-        Exception: If location not found or API call fails
+        Exception: If provider is unknown or has no hourly data, location not found or API call fails
     """
-    # Get location from database
-    location = await location_repo.get_by_group_id(group_id)
-    
-    if not location:
-        raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    
-    params = {
-        "lat": lat,
-        "lon": long,
-        "appid": config.OPENWEATHER_API_KEY,
-        "units": "metric",
-    }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"OpenWeather API response for group_id={group_id}")
-            
-            # Get weather condition from API
-            weather_list = data.get("weather", [])
-            if not weather_list:
-                raise Exception("No weather data in response")
-            
-            weather_main = weather_list[0].get("main", "Clouds")
-            weather_id = weather_list[0].get("id", 803)
-            
-            from app.models.weather_model import OPENWEATHER_ID_MAPPING, OPENWEATHER_CONDITION_MAPPING
-            
-            # Try specific ID mapping first, then fallback to main condition mapping
-            simplified_type = OPENWEATHER_ID_MAPPING.get(weather_id)
-            if not simplified_type:
-                simplified_type = OPENWEATHER_CONDITION_MAPPING.get(
-                    weather_main, SimplifiedWeatherType.CLOUDY
-                )
-            
-            logger.info(
-                f"Mapped OpenWeather: {weather_main} (ID: {weather_id}) -> {simplified_type.value}"
-            )
-            
-            # Create simplified response
-            weather_response = WeatherResponse(
-                weather_type=simplified_type.value,
-                group_id=group_id,
-            )
-            
-            return weather_response
-            
-    except httpx.HTTPStatusError as e:
-        logger.error(f"OpenWeather API HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"OpenWeather API error: {e.response.status_code}")
-    except Exception as e:
-        logger.error(f"OpenWeather API error: {str(e)}")
-        raise Exception(f"Failed to fetch weather data from OpenWeather: {str(e)}")
+    provider = registry.get_provider(provider_name)
+    weather = await weather_cache.get_or_load(
+        provider.name,
+        WeatherKind.HOURLY,
+        group_id,
+        lambda: _load_hourly(provider, group_id, date),
+        date=date,
+    )
+    weather_cache.mark_requested(group_id)
+    return weather
 
 
-async def get_weather_hourly_by_group_id_openweather(group_id: str):
+async def refresh_weather(provider_name: str, kind: str, location: Location):
     """
-    Get 24-hour weather forecast from OpenWeather API and return simplified weather types
-    
-    Args:
-        group_id: Group/store ID to fetch location and weather data
-        
-    Returns:
-        WeatherHourlyResponse with hourly weather data
-        
+    Fetch current weather or today's hourly forecast and store it in the cache,
+    whether the cached entry is still fresh or not (weather prefetch)
+
     Raises:
-        Exception: If location not found or API call fails
+        Exception: If provider is unknown or the API call fails
     """
-    # Get location from database
-    location = await location_repo.get_by_group_id(group_id)
-    
-    if not location:
-        raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    url = "https://api.openweathermap.org/data/2.5/forecast"
-    
-    params = {
-        "lat": lat,
-        "lon": long,
-        "appid": config.OPENWEATHER_API_KEY,
-        "units": "metric",
-        "cnt": 8,  # Get 8 x 3-hour intervals = 24 hours
-    }
-    
+    provider = registry.get_provider(provider_name)
+    if kind == WeatherKind.HOURLY:
+        weather = await _load_hourly(provider, location.group_id, None)
+    else:
+        weather = await _load_current(provider, location.group_id, location)
+    weather_cache.get_cache(provider.name).set(weather_cache.cache_key(kind, location.group_id), weather)
+
+
+def _rank_providers(providers: list[WeatherProvider]) -> list[WeatherProvider]:
+    """
+    Order providers by observed p50 latency, fastest first. Providers without
+    samples yet keep their configured order behind the default hedge delay.
+    """
+    def score(provider: WeatherProvider) -> float:
+        provider_metrics = metrics.get_metrics(provider.name)
+        p50 = provider_metrics.percentile(0.5)
+        latency = p50 if p50 is not None else config.WEATHER_HEDGE_DELAY
+        total = provider_metrics.successes + provider_metrics.failures
+        # a provider that keeps failing is pushed back even when it fails fast
+        failure_rate = provider_metrics.failures / total if total else 0.0
+        return latency * (1 + 4 * failure_rate)
+
+    return sorted(providers, key=score)
+
+
+def _hedge_delay(provider: WeatherProvider) -> float:
+    """
+    How long to wait on a provider before also asking the next one: its p99
+    latency, so only its slowest calls get hedged.
+    """
+    p99 = metrics.get_metrics(provider.name).percentile(0.99)
+    delay = p99 if p99 is not None else config.WEATHER_HEDGE_DELAY
+    return min(max(delay, config.WEATHER_HEDGE_MIN_DELAY), config.WEATHER_HEDGE_MAX_DELAY)
+
+
+async def _race_current(group_id: str) -> WeatherResponse:
+    providers = [
+        registry.get_provider(name)
+        for name in config.WEATHER_HEDGE_PROVIDERS
+        if registry.get_provider(name).is_configured()
+    ]
+    if not providers:
+        raise Exception("No weather provider configured")
+
+    # Any provider with a fresh cached value answers immediately
+    for provider in providers:
+        cached = weather_cache.get_cache(provider.name).get(
+            weather_cache.cache_key(WeatherKind.CURRENT, group_id)
+        )
+        if cached is not None:
+            return cached
+
+    location = await _get_location(group_id)
+    queue = _rank_providers(providers)
+    pending: dict[asyncio.Task, WeatherProvider] = {}
+    errors = []
+
+    def launch():
+        provider = queue.pop(0)
+        task = asyncio.ensure_future(_load_current(provider, group_id, location))
+        pending[task] = provider
+        return provider
+
+    delay = _hedge_delay(launch())
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"OpenWeather API hourly forecast for group_id={group_id}")
-            
-            # Get forecast data
-            forecast_list = data.get("list", [])
-            
-            if not forecast_list:
-                raise Exception("No forecast data available")
-            
-            from app.models.weather_model import (
-                OPENWEATHER_ID_MAPPING, 
-                OPENWEATHER_CONDITION_MAPPING,
-                HourlyWeather, 
-                WeatherHourlyResponse
+        while pending:
+            done, _ = await asyncio.wait(
+                pending.keys(),
+                timeout=delay if queue else None,
+                return_when=asyncio.FIRST_COMPLETED,
             )
-            from datetime import datetime
-            
-            # Process forecast data
-            hourly_weather = []
-            forecast_date = None
-            
-            for item in forecast_list:
-                dt_txt = item.get("dt_txt")  # Format: "2025-12-24 15:00:00"
-                
-                # Extract date for response
-                if not forecast_date:
-                    forecast_date = dt_txt.split(" ")[0]
-                
-                # Format time to match expected format
-                time = dt_txt[:-3]  # Remove seconds: "2025-12-24 15:00"
-                
-                temp_c = item.get("main", {}).get("temp", 0.0)
-                
-                # Get weather condition
-                weather_list = item.get("weather", [])
-                if weather_list:
-                    weather_main = weather_list[0].get("main", "Clouds")
-                    weather_id = weather_list[0].get("id", 803)
-                    
-                    # Try specific ID mapping first, then fallback to main condition
-                    simplified_type = OPENWEATHER_ID_MAPPING.get(weather_id)
-                    if not simplified_type:
-                        simplified_type = OPENWEATHER_CONDITION_MAPPING.get(
-                            weather_main, SimplifiedWeatherType.CLOUDY
-                        )
-                else:
-                    simplified_type = SimplifiedWeatherType.CLOUDY
-                
-                # Get chance of rain (pop = probability of precipitation, 0.0-1.0)
-                chance_of_rain = item.get("pop", 0) * 100
-                
-                hourly_weather.append(HourlyWeather(
-                    time=time,
-                    weather_type=simplified_type.value,
-                    temp_c=temp_c,
-                    chance_of_rain=chance_of_rain,
-                ))
-            
-            logger.info(f"Processed {len(hourly_weather)} forecast intervals from OpenWeather")
-            
-            # Create response
-            weather_response = WeatherHourlyResponse(
-                group_id=group_id,
-                forecast_date=forecast_date,
-                hourly=hourly_weather,
-            )
-            
-            return weather_response
-            
-    except httpx.HTTPStatusError as e:
-        logger.error(f"OpenWeather API HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"OpenWeather API error: {e.response.status_code}")
-    except Exception as e:
-        logger.error(f"OpenWeather API hourly forecast error: {str(e)}")
-        raise Exception(f"Failed to fetch hourly weather data from OpenWeather: {str(e)}")
+            if not done:
+                # hedge: the running providers are slow, start the next one too
+                delay = _hedge_delay(launch())
+                continue
 
+            for task in done:
+                provider = pending.pop(task)
+                if task.exception() is None:
+                    weather = task.result()
+                    weather_cache.get_cache(provider.name).set(
+                        weather_cache.cache_key(WeatherKind.CURRENT, group_id), weather
+                    )
+                    logger.info(f"Best weather for group_id={group_id} from {provider.label}")
+                    return weather
+                errors.append(str(task.exception()))
 
-# Visual Crossing API - Free tier: 1,000 records/day, works best
-async def get_weather_by_group_id_visualcrossing(group_id: str) -> Optional[WeatherResponse]:
+            # failover: every finished provider failed, try the next one right away
+            if queue:
+                delay = _hedge_delay(launch())
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise Exception(f"All weather providers failed: {'; '.join(errors)}")
+
+
+async def get_best_current_weather(group_id: str) -> WeatherResponse:
     """
-    Get weather conditions from Visual Crossing API for a specific date and return simplified weather type
-    
-    Args:
-        group_id: Group/store ID to fetch location and weather data
-        date: Date in YYYY-MM-DD format (e.g., "2025-12-24"). If None, gets current weather
-        
-    Returns:
-        WeatherResponse with simplified weather type (sunny, partly cloudy, cloudy, light rain, heavy rain)
-        
+    Race the configured providers with hedging delays and return the first
+    valid response; the remaining calls are cancelled.
+
     Raises:
-        Exception: If location not found or API call fails
+        Exception: If location not found or every provider fails
     """
-    # Get location from database
-    location = await location_repo.get_by_group_id(group_id)
-    
-    if not location:
-        raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    
-    # Visual Crossing uses location format: "lat,long"
-    location_str = f"{lat},{long}"
-    
-    # Build URL with optional date for historical data
-    url = f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{location_str}"
-    include_param = "current"  # For current weather
-    
-    params = {
-        "key": config.VISUAL_CROSSING_API_KEY,
-        "unitGroup": "metric",
-        "include": include_param,
-        "contentType": "json",
+    weather = await weather_cache.get_or_load(
+        weather_cache.BEST,
+        WeatherKind.CURRENT,
+        group_id,
+        lambda: _race_current(group_id),
+    )
+    weather_cache.mark_requested(group_id)
+    return weather
+
+
+def _batch_item(group_id: str, weather: Optional[WeatherResponse] = None, error: str = "") -> dict:
+    return {
+        "group_id": group_id,
+        "success": weather is not None,
+        "data": weather.model_dump() if weather is not None else None,
+        "message": error,
     }
-    
+
+
+async def _load_current_bulk(provider: WeatherProvider, locations: list[Location]) -> list[dict]:
+    """
+    One bulk upstream call for a chunk of locations; results are written to the cache
+    """
+    cache = weather_cache.get_cache(provider.name)
+    data = await _call_provider(
+        provider, lambda client: provider.fetch_current_bulk(client, locations)
+    )
+    simplified_types = provider.parse_current_bulk(data)
+
+    items = []
+    for location in locations:
+        simplified_type = simplified_types.get(location.group_id)
+        if simplified_type is None:
+            items.append(_batch_item(location.group_id, error=f"No data from {provider.label}"))
+            continue
+        weather = WeatherResponse(weather_type=simplified_type.value, group_id=location.group_id)
+        cache.set(weather_cache.cache_key(WeatherKind.CURRENT, location.group_id), weather)
+        items.append(_batch_item(location.group_id, weather))
+    return items
+
+
+async def get_current_weather_batch(
+    provider_name: str, group_ids: list[str]
+) -> AsyncIterator[dict]:
+    """
+    Current weather for many group_ids, yielded per group_id as soon as it is ready.
+
+    Cached entries come first, remaining locations are resolved with one $in query
+    and fetched with bounded concurrency, through the provider bulk API when it has one.
+    """
+    provider = registry.get_provider(provider_name)
+    cache = weather_cache.get_cache(provider.name)
+
+    misses = []
+    for group_id in dict.fromkeys(group_ids):
+        cached = cache.get(weather_cache.cache_key(WeatherKind.CURRENT, group_id))
+        if cached is not None:
+            weather_cache.mark_requested(group_id)
+            yield _batch_item(group_id, cached)
+        else:
+            misses.append(group_id)
+    if not misses:
+        return
+
+    locations = await location_repo.get_by_group_ids(misses)
+    for group_id in misses:
+        if group_id not in locations:
+            yield _batch_item(group_id, error=f"Location not found for group_id: {group_id}")
+    for group_id in locations:
+        weather_cache.mark_requested(group_id)
+
+    semaphore = asyncio.Semaphore(config.WEATHER_BATCH_CONCURRENCY)
+
+    async def fetch_one(location: Location) -> list[dict]:
+        async with semaphore:
+            try:
+                weather = await weather_cache.get_or_load(
+                    provider.name,
+                    WeatherKind.CURRENT,
+                    location.group_id,
+                    lambda: _load_current(provider, location.group_id, location),
+                )
+                return [_batch_item(location.group_id, weather)]
+            except Exception as e:
+                return [_batch_item(location.group_id, error=str(e))]
+
+    async def fetch_chunk(chunk: list[Location]) -> list[dict]:
+        async with semaphore:
+            try:
+                return await _load_current_bulk(provider, chunk)
+            except Exception as e:
+                logger.warning(f"{provider.label} bulk query failed, falling back: {str(e)}")
+        # fall back to one call per location
+        return [item for result in await asyncio.gather(*map(fetch_one, chunk)) for item in result]
+
+    found = list(locations.values())
+    if provider.bulk_size:
+        chunks = [found[i:i + provider.bulk_size] for i in range(0, len(found), provider.bulk_size)]
+        tasks = [asyncio.ensure_future(fetch_chunk(chunk)) for chunk in chunks]
+    else:
+        tasks = [asyncio.ensure_future(fetch_one(location)) for location in found]
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"Visual Crossing API response for group_id={group_id} current")
-            
-            # Get weather conditions (current)
-            current_conditions = data.get("currentConditions", {})
-            if not current_conditions:
-                raise Exception("No current conditions in response")
-            icon = current_conditions.get("icon", "cloudy")
-            
-            from app.models.weather_model import VISUAL_CROSSING_ICON_MAPPING
-            
-            # Map to simplified weather type
-            simplified_type = VISUAL_CROSSING_ICON_MAPPING.get(
-                icon, SimplifiedWeatherType.CLOUDY
-            )
-            
-            logger.info(
-                f"Mapped Visual Crossing icon: {icon} -> {simplified_type.value}"
-            )
-            
-            # Create simplified response
-            weather_response = WeatherResponse(
-                weather_type=simplified_type.value,
-                group_id=group_id,
-            )
-            
-            return weather_response
-            
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Visual Crossing API HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"Visual Crossing API error: {e.response.status_code}")
-    except Exception as e:
-        logger.error(f"Visual Crossing API error: {str(e)}")
-        raise Exception(f"Failed to fetch weather data from Visual Crossing: {str(e)}")
+        for next_done in asyncio.as_completed(tasks):
+            for item in await next_done:
+                yield item
+    finally:
+        # client went away mid-stream
+        for task in tasks:
+            task.cancel()
 
 
-async def get_weather_hourly_by_group_id_visualcrossing(group_id: str, date: str = None):
+#open weather api, limit free tier
+#gg do not support vietnam
+async def get_weather_by_group_id(group_id: str) -> Optional[WeatherResponse]:
+    """
+    Get current weather conditions from Google Weather API
+    """
+    return await get_current_weather(WEATHER_PROVIDERS.GOOGLE, group_id)
+
+
+async def get_weather_by_group_id_weatherapi(group_id: str) -> Optional[WeatherResponse]:
+    """
+    Get current weather conditions from WeatherAPI.com
+    """
+    return await get_current_weather(WEATHER_PROVIDERS.WEATHERAPI, group_id)
+
+
+async def get_weather_hourly_by_group_id(group_id: str) -> WeatherHourlyResponse:
+    """
+    Get 24-hour weather forecast from WeatherAPI.com
+    """
+    return await get_hourly_weather(WEATHER_PROVIDERS.WEATHERAPI, group_id)
+
+
+async def get_weather_by_group_id_openweather(group_id: str) -> Optional[WeatherResponse]:
+    """
+    Get current weather conditions from OpenWeather API
+    """
+    return await get_current_weather(WEATHER_PROVIDERS.OPENWEATHER, group_id)
+
+
+async def get_weather_hourly_by_group_id_openweather(group_id: str) -> WeatherHourlyResponse:
     """
-    Get 24-hour weather data from Visual Crossing API for a specific date and return simplified weather types
-    
+    Get 24-hour weather forecast (8 x 3-hour intervals) from OpenWeather API
+    """
+    return await get_hourly_weather(WEATHER_PROVIDERS.OPENWEATHER, group_id)
+
+
+async def get_weather_by_group_id_visualcrossing(group_id: str) -> Optional[WeatherResponse]:
+    """
+    Get current weather conditions from Visual Crossing API
+    """
+    return await get_current_weather(WEATHER_PROVIDERS.VISUAL_CROSSING, group_id)
+
+
+async def get_weather_hourly_by_group_id_visualcrossing(
+    group_id: str, date: str = None
+) -> WeatherHourlyResponse:
+    """
+    Get 24-hour weather data from Visual Crossing API
+
     Args:
         group_id: Group/store ID to fetch location and weather data
         date: Date in YYYY-MM-DD format (e.g., "2025-12-24"). If None, gets today's forecast
-        
-    Returns:
-        WeatherHourlyResponse with 24 hours of weather data
-        
-    Raises:
-        Exception: If location not found or API call fails
     """
-    # Get location from database
-    location = await location_repo.get_by_group_id(group_id)
-    
-    if not location:
-        raise Exception(f"Location not found for group_id: {group_id}")
-    
-    lat = location.lat
-    long = location.long
-    
-    # Visual Crossing uses location format: "lat,long"
-    location_str = f"{lat},{long}"
-    
-    # Build URL with date (default to today if not specified)
-    date_param = date if date else "today"
-    url = f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{location_str}/{date_param}"
-    
-    params = {
-        "key": config.VISUAL_CROSSING_API_KEY,
-        "unitGroup": "metric",
-        "include": "hours",
-        "contentType": "json",
-    }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"Visual Crossing API hourly forecast for group_id={group_id}")
-            
-            # Get forecast data
-            days = data.get("days", [])
-            
-            if not days:
-                raise Exception("No forecast data available")
-            
-            today = days[0]
-            forecast_date = today.get("datetime")  # Format: "2025-12-24"
-            hours = today.get("hours", [])
-            
-            from app.models.weather_model import VISUAL_CROSSING_ICON_MAPPING, HourlyWeather, WeatherHourlyResponse
-            
-            # Process hourly data
-            hourly_weather = []
-            for hour in hours:
-                datetime_str = hour.get("datetime")  # Format: "15:00:00"
-                hour_time = datetime_str[:5]  # Extract "15:00"
-                time = f"{forecast_date} {hour_time}"  # "2025-12-24 15:00"
-                
-                temp_c = hour.get("temp", 0.0)
-                icon = hour.get("icon", "cloudy")
-                precip_prob = hour.get("precipprob", 0)  # Precipitation probability 0-100
-                
-                # Map to simplified weather type
-                simplified_type = VISUAL_CROSSING_ICON_MAPPING.get(
-                    icon, SimplifiedWeatherType.CLOUDY
-                )
-                
-                hourly_weather.append(HourlyWeather(
-                    time=time,
-                    weather_type=simplified_type.value,
-                    temp_c=temp_c,
-                    chance_of_rain=precip_prob,
-                ))
-            
-            logger.info(f"Processed {len(hourly_weather)} hours from Visual Crossing")
-            
-            # Create response
-            weather_response = WeatherHourlyResponse(
-                group_id=group_id,
-                forecast_date=forecast_date,
-                hourly=hourly_weather,
-            )
-            
-            return weather_response
-            
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Visual Crossing API HTTP error: {e.response.status_code} - {e.response.text}")
-        raise Exception(f"Visual Crossing API error: {e.response.status_code}")
-    except Exception as e:
-        logger.error(f"Visual Crossing API hourly forecast error: {str(e)}")
-        raise Exception(f"Failed to fetch hourly weather data from Visual Crossing: {str(e)}")
+    return await get_hourly_weather(WEATHER_PROVIDERS.VISUAL_CROSSING, group_id, date)
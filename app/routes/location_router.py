@@ -3,7 +3,11 @@ from app.auth.auth import AuthUser, RoleChecker
 from app.schemas.base import AppBaseResponse
 from app.services import location_service
 from app.models.location_model import LocationCreateReq
-from fastapi import APIRouter, Depends, status
+from app.utils.utils import iter_lines
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 
 
 router = APIRouter()
@@ -34,4 +38,68 @@ async def create_location(
     Returns the created location with latitude and longitude coordinates.
     """
     location = await location_service.create_location(data)
-    return AppBaseResponse(location).to_dict()
+    return AppBaseResponse(location).to_json()
+
+
+@router.post(
+    "/bulk",
+    summary="Import many locations",
+    description="Create or update many locations from a CSV (header: group_id,address) or NDJSON body. Addresses are geocoded concurrently under a rate limit and written with unordered bulk upserts. One result per row is streamed back as NDJSON.",
+    response_description="NDJSON stream of per-row import results",
+    status_code=status.HTTP_200_OK,
+)
+async def import_locations(
+    request: Request,
+    # user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    """
+    Import many locations at once.
+    
+    Request Body (Content-Type: text/csv):
+        group_id,address
+        store-1,"485B Nguyễn Đình Chiểu, Phường 2, Quận 3, Thành phố Hồ Chí Minh"
+    
+    Request Body (Content-Type: application/x-ndjson):
+        {"group_id": "store-1", "address": "485B Nguyễn Đình Chiểu, Phường 2, Quận 3, ..."}
+    
+    Returns one JSON object per row, in completion order:
+        - line: Line number in the uploaded body
+        - group_id: The row group_id
+        - success: Whether the location was geocoded and saved
+        - data: The saved location or null
+        - message: Error message when success is false
+    """
+    body_read = asyncio.Event()
+
+    async def body_lines():
+        try:
+            async for line in iter_lines(request.stream()):
+                yield line
+        finally:
+            body_read.set()
+
+    rows = location_service.parse_location_rows(
+        body_lines(), request.headers.get("content-type", "")
+    )
+
+    async def ndjson():
+        async for result in location_service.import_locations(rows):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return _ImportResponse(body_read, ndjson(), media_type="application/x-ndjson")
+
+
+class _ImportResponse(StreamingResponse):
+    """
+    Results are streamed while the body is still being read. StreamingResponse
+    watches receive() for a disconnect, which would swallow the remaining body
+    chunks, so the watch only starts once the body has been read.
+    """
+
+    def __init__(self, body_read: asyncio.Event, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.body_read = body_read
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body_read.wait()
+        await super().listen_for_disconnect(receive)
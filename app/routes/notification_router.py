@@ -1,8 +1,12 @@
 from typing import Annotated, Optional
-from app.auth.auth import AuthUser, RoleChecker
-from app.schemas.base import AppBaseResponse, BasePagingReq
-from app.services import notification_service
-from fastapi import APIRouter, Depends
+from app.auth.auth import AuthUser, RoleChecker, get_stream_user
+from app.models.notification_model import NotificationIdsReq
+from app.schemas.base import AppBaseResponse, BasePagingReq, dumps
+from app.services import notification_ingest, notification_service
+from app.utils.utils import iter_lines
+from app.configs import config
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 
 
 router = APIRouter()
@@ -11,11 +15,51 @@ BASE_URL = "/notifications"
 router = APIRouter(prefix=BASE_URL)
 
 
+@router.get("/stream")
+async def stream(
+    user: Annotated[AuthUser, Depends(get_stream_user)],
+):
+    """
+    Server-Sent Events: one `notification` event per new notification visible to the user,
+    with the same fields as the items of GET /notifications. A comment line is sent
+    every NOTIFICATION_SSE_HEARTBEAT seconds to keep proxies from closing the connection.
+
+    Browsers (EventSource cannot send headers) pass a short-lived token instead:
+    GET /notifications/stream?access_token=<token expiring within AUTH_QUERY_TOKEN_MAX_TTL>
+    """
+
+    async def events():
+        yield ": connected\n\n"
+        async for item in notification_service.stream_notifications(
+            user.user_id, user.user_id, config.NOTIFICATION_SSE_HEARTBEAT
+        ):
+            if item is None:
+                yield ": ping\n\n"
+                continue
+            data = dumps(item).decode()
+            yield f"id: {item['id']}\nevent: notification\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/unread-count")
+async def get_unread_count(
+    user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    res = await notification_service.get_unread_count(user.user_id, user.user_id)
+
+    return AppBaseResponse(res).to_json()
+
+
 @router.get("/{id}")
 async def get_by_id(id: str):
     noti = await notification_service.get_by_id(id)
 
-    return AppBaseResponse(noti).to_dict()
+    return AppBaseResponse(noti).to_json()
 
 
 @router.get("")
@@ -24,11 +68,70 @@ async def get_by_filter(
     keyword: Optional[str] = None,
     page: Optional[int] = 1,
     page_size: Optional[int] = 10,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = True,
 ):
     noti = await notification_service.get_by_filter(
-        BasePagingReq(keyword=keyword, page=page, page_size=page_size),
+        BasePagingReq(
+            keyword=keyword,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        ),
         user.user_id,
         user.user_id,
     )
 
-    return AppBaseResponse(noti).to_dict()
+    return AppBaseResponse(noti).to_json()
+
+
+@router.post("/read")
+async def mark_read(
+    data: NotificationIdsReq,
+    user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    res = await notification_service.mark_read(data.ids, user.user_id, user.user_id)
+
+    return AppBaseResponse(res).to_json()
+
+
+@router.post("/read-all")
+async def mark_all_read(
+    user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    res = await notification_service.mark_all_read(user.user_id, user.user_id)
+
+    return AppBaseResponse(res).to_json()
+
+
+@router.post("/delete")
+async def delete(
+    data: NotificationIdsReq,
+    user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    res = await notification_service.delete(data.ids, user.user_id, user.user_id)
+
+    return AppBaseResponse(res).to_json()
+
+
+@router.post("/ingest")
+async def ingest(
+    request: Request,
+    user: Annotated[AuthUser, Depends(RoleChecker(config.NOTIFICATION_INGEST_ROLES))],
+):
+    """
+    Bulk create notifications from an NDJSON body (Content-Type: application/x-ndjson),
+    one notification per line:
+        {"type": "long_queue_detected", "status": "warning", "title": "...",
+         "tenant_id": "...", "data": {"cam_id": "...", "zone_id": "...", "people_count": 12}}
+
+    Valid lines are queued and written in batches shortly after; when the writer
+    falls behind, the body is read more slowly. Returns the number accepted and
+    the line number and reason of every rejected line.
+
+    Only for producers: the token's role must be one of NOTIFICATION_INGEST_ROLES.
+    """
+    res = await notification_ingest.ingest(iter_lines(request.stream()))
+
+    return AppBaseResponse(res).to_json()
@@ -2,10 +2,10 @@ from typing import Annotated, Union
 from app.auth.auth import AuthUser, RoleChecker
 from app.schemas.base import AppBaseResponse
 from app.services import weather_service
-from app.models.weather_model import WeatherByGroupIdReq, WeatherHistoricalReq
-from fastapi import APIRouter, Depends, status, Response
+from app.models.weather_model import WeatherBatchReq, WeatherByGroupIdReq, WeatherHistoricalReq
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import StreamingResponse
 
-from pydantic import BaseModel
 import json
 
 
@@ -42,7 +42,7 @@ async def get_weather_by_group_id(
     All Google Weather API types are mapped to these 5 simplified categories.
     """
     weather = await weather_service.get_weather_by_group_id(data)
-    return AppBaseResponse(weather).to_dict()
+    return AppBaseResponse(weather).to_json()
 
 
 @router.get(
@@ -79,7 +79,67 @@ async def get_weather_by_group_id_weatherapi(
         - Reliable and accurate data
     """
     weather = await weather_service.get_weather_by_group_id_weatherapi(data)
-    return AppBaseResponse(weather).to_dict()
+    return AppBaseResponse(weather).to_json()
+
+
+@router.get(
+    "/by-group-best",
+    summary="Get weather by group ID from the fastest provider",
+    description="Get simplified weather type for a location using its group_id by racing the configured weather providers (WeatherAPI.com, OpenWeather, Visual Crossing, Google). Providers are tried in order of observed latency; a slow provider is hedged by starting the next one, a failing provider fails over immediately, and the first valid response wins.",
+    response_description="Simplified weather type: sunny, partly cloudy, cloudy, light rain, or heavy rain",
+    status_code=status.HTTP_200_OK,
+)
+async def get_weather_by_group_id_best(
+    data: WeatherByGroupIdReq = Depends(),
+    #user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    """
+    Get simplified weather type for a location by group_id from the fastest provider.
+    
+    Query Parameters:
+        - group_id: The unique identifier for the group/store location
+    
+    Returns simplified weather information:
+        - weather_type: One of 5 types (sunny, partly cloudy, cloudy, light rain, heavy rain)
+        - group_id: The location identifier
+        
+    Providers without an API key are skipped. Per-provider p50/p99 latency decides
+    which provider is tried first and how long to wait before hedging.
+    """
+    weather = await weather_service.get_weather_by_group_id_best(data)
+    return AppBaseResponse(weather).to_json()
+
+
+@router.post(
+    "/batch",
+    summary="Get current weather for many group IDs",
+    description="Get simplified weather types for many locations in one request. All locations are resolved with a single database query, upstream calls run with bounded concurrency (using the provider bulk API when available), and results are streamed back as NDJSON, one line per group_id, as soon as each one is ready.",
+    response_description="NDJSON stream of per-group_id weather results",
+    status_code=status.HTTP_200_OK,
+)
+async def get_weather_batch(
+    data: WeatherBatchReq,
+    #user: Annotated[AuthUser, Depends(RoleChecker())],
+):
+    """
+    Get current weather for many group_ids at once.
+    
+    Request Body Parameters:
+        - group_ids: List of group/store identifiers
+        - provider: Weather provider to use (default "weatherapi")
+    
+    Returns one JSON object per line:
+        - group_id: The location identifier
+        - success: Whether weather was found for this group_id
+        - data: {"weather_type", "group_id"} or null
+        - message: Error message when success is false
+    """
+
+    async def ndjson():
+        async for item in weather_service.get_weather_batch(data):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 @router.get(
@@ -108,7 +168,7 @@ async def get_weather_hourly_by_group_id_weatherapi(
           * temp_c: Temperature in Celsius
     """
     weather = await weather_service.get_weather_hourly_by_group_id(data)
-    return AppBaseResponse(weather).to_dict()
+    return AppBaseResponse(weather).to_json()
 
 
 @router.get(
@@ -146,7 +206,7 @@ async def get_weather_by_group_id_openweather(
         - Reliable data source
     """
     weather = await weather_service.get_weather_by_group_id_openweather(data)
-    return AppBaseResponse(weather).to_dict()
+    return AppBaseResponse(weather).to_json()
 
 
 @router.get(
@@ -176,7 +236,7 @@ async def get_weather_hourly_by_group_id_openweather(
           * chance_of_rain: Probability of precipitation (0-100%)
     """
     weather = await weather_service.get_weather_hourly_by_group_id_openweather(data)
-    return AppBaseResponse(weather).to_dict()
+    return AppBaseResponse(weather).to_json()
 
 
 @router.get(
@@ -222,7 +282,7 @@ async def get_weather_by_group_id_visualcrossing(
         ```
     """
     weather = await weather_service.get_weather_by_group_id_visualcrossing(data)
-    return AppBaseResponse(weather).to_dict()
+    return AppBaseResponse(weather).to_json()
 
 
 @router.get(
@@ -266,19 +326,4 @@ async def get_weather_hourly_by_group_id_visualcrossing(
     """
 
     weather = await weather_service.get_weather_hourly_by_group_id_visualcrossing(data)
-    
-    def to_dict(obj):
-        if isinstance(obj, BaseModel):
-            return obj.model_dump()
-        if isinstance(obj, list):
-            return [to_dict(i) for i in obj]
-        if isinstance(obj, dict):
-            return {k: to_dict(v) for k, v in obj.items()}
-        return obj
-    
-    response_data = AppBaseResponse(to_dict(weather)).to_dict()
-    return Response(
-        content=json.dumps(response_data),
-        media_type="application/json",
-        headers={"Cache-Control": "public, max-age=3600"} # Cache for 1 hour
-    )
+    return AppBaseResponse(weather).to_json()
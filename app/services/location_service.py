@@ -1,33 +1,82 @@
-import googlemaps
+import asyncio
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+from pydantic import ValidationError
+from app.cache.ttl_cache import TTLCache
+from app.clients import http_client
 from app.configs import config
-from app.repositories import location_repo
-from app.models.location_model import LocationCreateReq
+from app.repositories import geocode_repo, location_repo
+from app.models.location_model import Location, LocationCreateReq
+from app.utils.rate_limiter import AsyncRateLimiter
+from app.utils.utils import normalize_address
 
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
-# Initialize Google Maps client
-gmaps = googlemaps.Client(key=config.GOOGLE_MAPS_API_KEY)
+# Bounds in-flight Google calls so a bulk import cannot exhaust the pool or quota
+_geocode_semaphore = asyncio.Semaphore(config.GEOCODE_CONCURRENCY)
+_geocode_rate_limiter = AsyncRateLimiter(config.GEOCODE_RATE_LIMIT)
+
+# Normalized address -> (lat, lng), in front of the geocode collection
+_geocode_cache = TTLCache(
+    "geocode", ttl=config.GEOCODE_CACHE_TTL, maxsize=config.GEOCODE_CACHE_MAXSIZE
+)
 
 
 async def geocode_address(address: str) -> tuple[float, float]:
+    """
+    Convert address to latitude and longitude.
+
+    Lookup order: in-memory LRU, geocode collection, Google Maps Geocoding API.
+    Addresses are compared in normalized form, so re-imports with different
+    spacing, casing or abbreviations ("Q.3" / "Quận 3") never call Google again.
+    """
+    key = normalize_address(address)
+    return await _geocode_cache.get_or_load(key, lambda: _geocode_and_store(key, address))
+
+
+async def _geocode_and_store(key: str, address: str) -> tuple[float, float]:
+    cached = await geocode_repo.get_by_address(key)
+    if cached:
+        return cached
+
+    lat, lng = await geocode_google(address)
+    await geocode_repo.save(key, address, lat, lng)
+    return lat, lng
+
+
+async def geocode_google(address: str) -> tuple[float, float]:
     """
     Convert address to latitude and longitude using Google Maps Geocoding API
-    
+
     Returns:
         tuple: (latitude, longitude)
-    
+
     Raises:
         Exception: If geocoding fails or no results found
     """
     try:
-        geocode_result = gmaps.geocode(address)
-        
-        if not geocode_result:
+        async with _geocode_semaphore:
+            await _geocode_rate_limiter.acquire()
+            client = http_client.get_client(http_client.GOOGLE_MAPS)
+            response = await client.get(
+                GEOCODE_URL,
+                params={"address": address, "key": config.GOOGLE_MAPS_API_KEY},
+            )
+            response.raise_for_status()
+            data = response.json()
+
+        status = data.get("status")
+        if status == "ZERO_RESULTS" or (status == "OK" and not data.get("results")):
             raise Exception(f"No geocoding results found for address: {address}")
-        
-        location = geocode_result[0]['geometry']['location']
+        if status != "OK":
+            raise Exception(f"{status} {data.get('error_message', '')}".strip())
+
+        location = data["results"][0]['geometry']['location']
         lat = location['lat']
         lng = location['lng']
-        
+
         return lat, lng
     except Exception as e:
         raise Exception(f"Geocoding error: {str(e)}")
@@ -38,7 +87,7 @@ async def create_location(data: LocationCreateReq) -> dict:
     Create a new location by geocoding the address
     """
     lat, lng = await geocode_address(data.address)
-    
+
     # Save to database
     location = await location_repo.create_location(
         group_id=data.group_id,
@@ -46,5 +95,177 @@ async def create_location(data: LocationCreateReq) -> dict:
         lat=lat,
         long=lng
     )
-    
+
     return location
+
+
+class RowError:
+    """A row that could not be parsed; reported as a failed result without geocoding"""
+
+    def __init__(self, message: str):
+        self.message = message
+
+    def __eq__(self, other):
+        return isinstance(other, RowError) and other.message == self.message
+
+    def __repr__(self):
+        return f"RowError({self.message!r})"
+
+
+async def _decode_lines(lines: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str | RowError]]:
+    # decoded line by line so one bad byte only fails its own row
+    index = 0
+    async for raw in lines:
+        index += 1
+        if index == 1:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+        try:
+            yield index, raw.decode("utf-8")
+        except UnicodeDecodeError as e:
+            yield index, RowError(f"Invalid UTF-8: {e.reason} at byte {e.start}")
+
+
+async def _parse_csv(lines: AsyncIterator[tuple[int, str | RowError]]) -> AsyncIterator[tuple[int, dict | RowError]]:
+    fieldnames = None
+    record = ""
+    async for index, line in lines:
+        if isinstance(line, RowError):
+            yield index, line
+            continue
+        # a quoted field may span lines; a record is complete once its quotes balance
+        record += line + "\n"
+        if record.count('"') % 2:
+            continue
+        fields = next(csv.reader([record]), [])
+        record = ""
+        if not fields:
+            continue
+        if fieldnames is None:
+            fieldnames = fields
+            continue
+        row = dict(zip(fieldnames, fields))
+        # reported on the physical line the record ended on, header included
+        yield index, {name: row.get(name) for name in fieldnames}
+
+
+async def parse_location_rows(
+    lines: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[tuple[int, dict | RowError]]:
+    """
+    Parse a CSV (header: group_id,address) or NDJSON body, as it arrives, into
+    (line number, row). A line that cannot be decoded or parsed is returned as a RowError.
+    """
+    decoded = _decode_lines(lines)
+    if "csv" in content_type:
+        async for item in _parse_csv(decoded):
+            yield item
+        return
+
+    async for index, line in decoded:
+        if isinstance(line, RowError):
+            yield index, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield index, RowError(f"Invalid JSON: {str(e)}")
+            continue
+        if not isinstance(value, dict):
+            yield index, RowError("Invalid row: expected a JSON object")
+            continue
+        yield index, value
+
+
+def _import_result(line: int, group_id: str | None, location: Location | None = None, error: str = "") -> dict:
+    return {
+        "line": line,
+        "group_id": group_id,
+        "success": location is not None,
+        "data": location.model_dump(by_alias=True) if location is not None else None,
+        "message": error,
+    }
+
+
+async def import_locations(rows: AsyncIterator[tuple[int, dict | RowError]]) -> AsyncIterator[dict]:
+    """
+    Geocode rows with a pool of GEOCODE_CONCURRENCY workers (calls also bounded by
+    GEOCODE_RATE_LIMIT) and upsert them in unordered bulk writes, yielding one result
+    per row. Rows are pulled from the body only as fast as workers take them, and
+    reported as soon as their batch is written.
+    """
+
+    async def geocode_row(line: int, row: dict | RowError):
+        if isinstance(row, RowError):
+            return line, None, None, row.message
+        try:
+            data = LocationCreateReq.model_validate(row)
+        except ValidationError as e:
+            return line, row.get("group_id"), None, f"Invalid row: {e.errors()[0].get('msg')}"
+        try:
+            lat, lng = await geocode_address(data.address)
+        except Exception as e:
+            return line, data.group_id, None, str(e)
+        return line, data.group_id, Location(group_id=data.group_id, address=data.address, lat=lat, long=lng), ""
+
+    async def write(batch: list[tuple[int, Location]]) -> list[dict]:
+        errors = await location_repo.upsert_locations([location for _, location in batch])
+        return [
+            _import_result(line, location.group_id, None, errors[index])
+            if index in errors
+            else _import_result(line, location.group_id, location)
+            for index, (line, location) in enumerate(batch)
+        ]
+
+    workers = config.GEOCODE_CONCURRENCY
+    # both queues are bounded, so a slow geocoder or writer stops reading the body
+    pending: asyncio.Queue = asyncio.Queue(maxsize=workers)
+    done: asyncio.Queue = asyncio.Queue(maxsize=workers)
+
+    async def produce():
+        error = None
+        try:
+            async for row in rows:
+                await pending.put(row)
+        except Exception as e:
+            # still stop the workers, then report it once they drain
+            error = e
+        for _ in range(workers):
+            await pending.put(None)
+        if error is not None:
+            raise error
+
+    async def work():
+        while (item := await pending.get()) is not None:
+            await done.put(await geocode_row(*item))
+        await done.put(None)
+
+    producer = asyncio.create_task(produce())
+    tasks = [producer] + [asyncio.create_task(work()) for _ in range(workers)]
+    batch: list[tuple[int, Location]] = []
+    try:
+        running = workers
+        while running:
+            item = await done.get()
+            if item is None:
+                running -= 1
+                continue
+            line, group_id, location, error = item
+            if location is None:
+                yield _import_result(line, group_id, error=error)
+                continue
+            batch.append((line, location))
+            if len(batch) >= config.LOCATION_IMPORT_BATCH_SIZE:
+                for result in await write(batch):
+                    yield result
+                batch = []
+        # surfaces a failure reading the body
+        await producer
+        if batch:
+            for result in await write(batch):
+                yield result
+    finally:
+        # client went away mid-import
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,183 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable
+from pymongo.errors import OperationFailure, PyMongoError
+from app.configs import config
+from app.logger.logger import logger
+from app.repositories import notification_repo
+
+
+class Subscriber:
+    """
+    One connected client. Events wait in a bounded queue; when the client
+    falls behind, the oldest events are dropped rather than blocking the hub.
+    """
+
+    def __init__(self, tenant_id: str, user_id: str):
+        self.tenant_id = tenant_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(config.NOTIFICATION_SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, doc: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(doc)
+
+
+class NotificationHub:
+    """
+    In-process fan-out of new notifications to connected subscribers.
+
+    Subscribers are indexed by tenant and user, so routing a notification touches
+    only the subscribers it is visible to (same rules as get_by_filter), and no
+    subscriber ever queries the database itself.
+    """
+
+    def __init__(self):
+        # tenant_id -> user_id -> subscribers
+        self._subscribers: dict[str, dict[str, set[Subscriber]]] = {}
+        # in-process consumers of every notification, e.g. the unread counters,
+        # each with a check of whether it currently needs them
+        self._listeners: list[tuple[Callable[[dict], None], Callable[[], bool]]] = []
+        self.published = 0
+
+    def add_listener(self, listener: Callable[[dict], None], active: Callable[[], bool]):
+        self._listeners.append((listener, active))
+
+    def subscribe(self, tenant_id: str, user_id: str) -> Subscriber:
+        subscriber = Subscriber(tenant_id, user_id)
+        self._subscribers.setdefault(tenant_id, {}).setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        users = self._subscribers.get(subscriber.tenant_id, {})
+        subscribers = users.get(subscriber.user_id, set())
+        subscribers.discard(subscriber)
+        if not subscribers:
+            users.pop(subscriber.user_id, None)
+        if not users:
+            self._subscribers.pop(subscriber.tenant_id, None)
+
+    def _match(self, doc: dict):
+        if doc.get("has_for_all"):
+            for users in self._subscribers.values():
+                for subscribers in users.values():
+                    yield from subscribers
+            return
+        users = self._subscribers.get(doc.get("tenant_id"), {})
+        if doc.get("user_id") is None:
+            for subscribers in users.values():
+                yield from subscribers
+        else:
+            yield from users.get(doc["user_id"], ())
+
+    def publish(self, doc: dict):
+        self.published += 1
+        for listener, _ in self._listeners:
+            listener(doc)
+        for subscriber in self._match(doc):
+            subscriber.push(doc)
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers) or any(active() for _, active in self._listeners)
+
+    def stats(self) -> dict:
+        subscribers = [
+            subscriber
+            for users in self._subscribers.values()
+            for group in users.values()
+            for subscriber in group
+        ]
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "dropped": sum(subscriber.dropped for subscriber in subscribers),
+        }
+
+
+hub = NotificationHub()
+_follow_task: asyncio.Task | None = None
+
+
+async def _watch_changes():
+    resume_token = None
+    while True:
+        try:
+            async for change in notification_repo.watch_inserts(resume_token):
+                resume_token = change["_id"]
+                hub.publish(change["fullDocument"])
+        except OperationFailure as e:
+            if resume_token is None:
+                # could not open a stream at all
+                raise
+            # e.g. the resume point fell off the oplog: start over from now
+            logger.error(f"Notification change stream lost ({e.code}), restarting")
+            resume_token = None
+        except PyMongoError as e:
+            # transient: resume where the stream stopped
+            logger.error(f"Notification change stream error: {str(e)}")
+            await asyncio.sleep(config.NOTIFICATION_POLL_INTERVAL)
+
+
+async def _poll_changes():
+    last_created_at = datetime.now()
+    # _id -> created_at of what was published within the lookback window
+    seen: dict = {}
+    while True:
+        await asyncio.sleep(config.NOTIFICATION_POLL_INTERVAL)
+        if not hub.has_subscribers():
+            # nobody listening: nothing to catch up on later either
+            last_created_at = datetime.now()
+            seen.clear()
+            continue
+        # created_at is stamped before the insert, so a notification can land behind
+        # the newest one seen: look back a little and skip what was already published
+        since = last_created_at - timedelta(seconds=config.NOTIFICATION_POLL_LOOKBACK)
+        after, after_id = since, None
+        try:
+            while True:
+                docs = await notification_repo.find_created_after(after, after_id, limit=1000)
+                for doc in docs:
+                    if doc["_id"] not in seen:
+                        seen[doc["_id"]] = doc["created_at"]
+                        hub.publish(doc)
+                        last_created_at = max(last_created_at, doc["created_at"])
+                if len(docs) < 1000:
+                    break
+                after, after_id = docs[-1]["created_at"], docs[-1]["_id"]
+        except PyMongoError as e:
+            logger.error(f"Notification poll failed: {str(e)}")
+            continue
+        since = last_created_at - timedelta(seconds=config.NOTIFICATION_POLL_LOOKBACK)
+        seen = {bson_id: created_at for bson_id, created_at in seen.items() if created_at > since}
+
+
+async def _follow_notifications():
+    try:
+        logger.info("Notification hub following change stream")
+        await _watch_changes()
+    except OperationFailure as e:
+        # Change streams need a replica set; standalone mongod falls back to polling
+        logger.info(f"Change stream unavailable ({e.code}), polling every {config.NOTIFICATION_POLL_INTERVAL}s")
+        await _poll_changes()
+
+
+async def start_notification_hub():
+    """
+    Start feeding the hub from the notification collection. Called from the app lifespan.
+    """
+    global _follow_task
+    _follow_task = asyncio.create_task(_follow_notifications())
+
+
+async def stop_notification_hub():
+    global _follow_task
+    if _follow_task is not None:
+        _follow_task.cancel()
+        try:
+            await _follow_task
+        except asyncio.CancelledError:
+            pass
+        _follow_task = None
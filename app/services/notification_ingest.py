@@ -0,0 +1,302 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator
+from bson import Binary, UUID_SUBTYPE
+from pydantic import ValidationError
+from app.configs import config
+from app.logger.logger import logger
+from app.models.notification_model import NotificationCreateReq
+from app.repositories import notification_repo
+
+
+def to_document(data: NotificationCreateReq) -> dict:
+    now = datetime.now()
+    doc = {
+        "_id": Binary(uuid.uuid4().bytes, UUID_SUBTYPE),
+        **data.model_dump(mode="json", exclude={"data"}),
+        "data": data.data.model_dump(exclude_none=True),
+        "repeat_count": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    return notification_repo.with_search_tokens(doc)
+
+
+def dedup_key(doc: dict) -> tuple:
+    return (doc.get("tenant_id"), doc["type"], doc["data"].get("cam_id"), doc["data"].get("zone_id"))
+
+
+class _Recent:
+    __slots__ = ("id", "doc", "last_seen")
+
+    def __init__(self, doc: dict, last_seen: float):
+        self.id = doc["_id"]
+        # the queued document until the writer takes it, then None
+        self.doc: dict | None = doc
+        self.last_seen = last_seen
+
+
+class DedupIndex:
+    """
+    Bounded LRU of the latest notification per dedup_key. An alert is a repeat
+    when its key was seen less than `window` seconds ago; every repeat slides
+    the window, so a condition that lasts produces one notification.
+    """
+
+    def __init__(self, window: float, maxsize: int):
+        self.window = window
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple, _Recent] = OrderedDict()
+        self.coalesced = 0
+
+    def find(self, key: tuple, now: float) -> _Recent | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry.last_seen > self.window:
+            del self._entries[key]
+            return None
+        entry.last_seen = now
+        self._entries.move_to_end(key)
+        self.coalesced += 1
+        return entry
+
+    def add(self, key: tuple, doc: dict, now: float):
+        self._entries[key] = _Recent(doc, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def taken(self, doc: dict):
+        """The writer owns `doc` now: later repeats must go to the database"""
+        entry = self._entries.get(dedup_key(doc))
+        if entry is not None and entry.id == doc["_id"]:
+            entry.doc = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Queued by stop(): the writer exits once it has taken everything before it
+_STOP: dict = {}
+
+
+class NotificationBuffer:
+    """
+    Queue between ingest requests and the database.
+
+    A single writer drains it in unordered insert_many batches, flushing when
+    NOTIFICATION_INGEST_BATCH_SIZE documents are waiting or
+    NOTIFICATION_INGEST_FLUSH_INTERVAL seconds after the first one arrived.
+    When the queue is full, `put` waits: ingest requests slow down to the
+    speed of the writer instead of growing memory.
+
+    Repeats of a recent camera alert (see DedupIndex) are not inserted. While
+    the first one is still queued it is updated in place; once written, the
+    repeat is queued as a repeat_count / updated_at update instead.
+
+    Delivery is best effort: a failed flush is retried `retries` times with
+    backoff, then its batch is dropped and counted in stats()["dropped"].
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        batch_size: int,
+        flush_interval: float,
+        dedup: DedupIndex | None = None,
+        retries: int = config.NOTIFICATION_INGEST_FLUSH_RETRIES,
+        retry_delay: float = 0.5,
+    ):
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedup = dedup
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._batch: list[dict] = []
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.inserted = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    async def put(self, doc: dict):
+        if self.dedup is not None and self.dedup.window > 0:
+            key = dedup_key(doc)
+            now = time.monotonic()
+            recent = self.dedup.find(key, now)
+            if recent is None:
+                self.dedup.add(key, doc, now)
+            elif recent.doc is not None:
+                recent.doc["repeat_count"] += 1
+                recent.doc["updated_at"] = doc["updated_at"]
+                return
+            else:
+                doc = {"_repeat_of": recent.id, "updated_at": doc["updated_at"]}
+        await self.queue.put(doc)
+
+    def _take(self, doc: dict) -> bool:
+        """Add a queued item to the batch; False on the stop marker"""
+        if doc is _STOP:
+            self._stopping = True
+            return False
+        if self.dedup is not None and "_repeat_of" not in doc:
+            self.dedup.taken(doc)
+        self._batch.append(doc)
+        return True
+
+    async def _collect(self):
+        if not self._take(await self.queue.get()):
+            return
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            try:
+                if not self._take(self.queue.get_nowait()):
+                    return
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                doc = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if not self._take(doc):
+                return
+
+    async def _flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        docs = [doc for doc in batch if "_repeat_of" not in doc]
+        now = datetime.now()
+        for doc in docs:
+            # stamped when written rather than when received, so a notification that
+            # waited in the queue is not inserted far behind newer ones (polling, keyset pages)
+            doc["created_at"] = doc["updated_at"] = now
+        repeats: dict = {}
+        for op in batch:
+            if "_repeat_of" in op:
+                count, _ = repeats.get(op["_repeat_of"], (0, None))
+                repeats[op["_repeat_of"]] = (count + 1, op["updated_at"])
+        for attempt in range(self.retries + 1):
+            try:
+                # inserts first: a repeat may target a document of this same batch.
+                # A retried insert_many skips the _ids already written as duplicates.
+                if docs:
+                    self.inserted += await notification_repo.insert_many(docs)
+                    docs = []
+                if repeats:
+                    await notification_repo.add_repeats(repeats)
+                    repeats = {}
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    lost = len(docs) + sum(count for count, _ in repeats.values())
+                    self.dropped += lost
+                    logger.error(f"Notification flush failed {attempt + 1} times, dropped {lost}: {str(e)}")
+                    break
+                logger.error(f"Notification flush failed, retrying: {str(e)}")
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+        self.flushes += 1
+
+    async def _run(self):
+        while not self._stopping:
+            await self._collect()
+            await self._flush()
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = config.NOTIFICATION_INGEST_DRAIN_TIMEOUT):
+        """
+        Let the writer flush everything queued before the call, then stop it.
+        After `timeout` seconds (e.g. the database is down) the rest is dropped.
+        """
+        if self._task is None:
+            # never started: write what is queued here
+            while not self.queue.empty():
+                self._take(self.queue.get_nowait())
+            while self._batch:
+                remaining = self._batch[self.batch_size:]
+                self._batch = self._batch[: self.batch_size]
+                await self._flush()
+                self._batch = remaining
+            return
+
+        async def drain():
+            # queued behind everything accepted so far, so the writer reaches it last
+            await self.queue.put(_STOP)
+            await self._task
+
+        try:
+            await asyncio.wait_for(drain(), timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the writer; a batch it was writing may be partly written
+            lost, self._batch = len(self._batch), []
+            while not self.queue.empty():
+                lost += self.queue.get_nowait() is not _STOP
+            self.dropped += lost
+            logger.error(f"Notification writer did not drain within {timeout}s, dropped {lost} queued")
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "inserted": self.inserted,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "coalesced": self.dedup.coalesced if self.dedup is not None else 0,
+            "dedup_keys": len(self.dedup) if self.dedup is not None else 0,
+        }
+
+
+buffer = NotificationBuffer(
+    config.NOTIFICATION_INGEST_BUFFER_SIZE,
+    config.NOTIFICATION_INGEST_BATCH_SIZE,
+    config.NOTIFICATION_INGEST_FLUSH_INTERVAL,
+    DedupIndex(config.NOTIFICATION_DEDUP_WINDOW, config.NOTIFICATION_DEDUP_MAXSIZE),
+)
+
+
+async def ingest(lines: AsyncIterator[bytes]) -> dict:
+    """
+    Validate NDJSON notifications and queue them for the writer.
+
+    Returns how many were accepted and why the others were rejected. Accepted
+    notifications are queued, and written within NOTIFICATION_INGEST_FLUSH_INTERVAL
+    on a best-effort basis (see NotificationBuffer): accepted is not yet durable.
+    """
+    accepted = 0
+    rejected = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            data = NotificationCreateReq.model_validate_json(line)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(loc) for loc in error.get("loc", ()))
+            rejected.append({"line": line_number, "message": f"{field}: {error.get('msg')}" if field else error.get("msg")})
+            continue
+        await buffer.put(to_document(data))
+        accepted += 1
+    return {"accepted": accepted, "rejected": rejected}
+
+
+async def start_notification_ingest():
+    buffer.start()
+
+
+async def stop_notification_ingest():
+    await buffer.stop()
@@ -1,4 +1,10 @@
-from app.repositories import notification_repo
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator
+from app.models.notification_model import to_notification_res
+from app.repositories import notification_repo, notification_state_repo
+from app.services import unread_counter
+from app.services.notification_hub import hub
 from app.schemas.base import BasePagingReq
 
 
@@ -8,3 +14,49 @@ async def get_by_id(id_str: str) -> dict | None:
 
 async def get_by_filter(params: BasePagingReq, tenant_id: str, user_id: str) -> dict:
     return await notification_repo.get_by_filter(params, tenant_id, user_id)
+
+
+async def mark_read(ids: list[str], tenant_id: str, user_id: str) -> dict:
+    bson_ids = [notification_repo.to_bson_id(id_str) for id_str in ids]
+    # only these were counted as unread
+    unread = await notification_repo.get_unread_ids(tenant_id, user_id, bson_ids)
+    updated = await notification_state_repo.mark_read(user_id, bson_ids)
+    unread_counter.adjust(tenant_id, user_id, -len(unread))
+    return {"updated": updated}
+
+
+async def mark_all_read(tenant_id: str, user_id: str) -> dict:
+    await notification_state_repo.mark_all_read(user_id, datetime.now())
+    unread_counter.reset(tenant_id, user_id)
+    return {"updated": True}
+
+
+async def delete(ids: list[str], tenant_id: str, user_id: str) -> dict:
+    bson_ids = [notification_repo.to_bson_id(id_str) for id_str in ids]
+    unread = await notification_repo.get_unread_ids(tenant_id, user_id, bson_ids)
+    updated = await notification_state_repo.mark_deleted(user_id, bson_ids)
+    notification_repo.invalidate_totals(user_id)
+    unread_counter.adjust(tenant_id, user_id, -len(unread))
+    return {"updated": updated}
+
+
+async def get_unread_count(tenant_id: str, user_id: str) -> dict:
+    return {"unread": await unread_counter.get_unread_count(tenant_id, user_id)}
+
+
+async def stream_notifications(tenant_id: str, user_id: str, heartbeat: float) -> AsyncIterator[dict | None]:
+    """
+    New notifications visible to the user as they arrive, from the in-process hub.
+    Yields None whenever `heartbeat` seconds pass without one.
+    """
+    subscriber = hub.subscribe(tenant_id, user_id)
+    try:
+        while True:
+            try:
+                doc = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            yield to_notification_res(doc, user_id)
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,71 @@
+from app.cache.ttl_cache import TTLCache
+from app.configs import config
+from app.repositories import notification_repo
+from app.services.notification_hub import hub
+
+# (tenant_id, user_id) -> unread count. An entry is loaded with an exact count,
+# then kept current incrementally; when it expires it is recounted, which
+# reconciles any drift (e.g. the same notification read from two devices at once).
+_counts = TTLCache(
+    "notification_unread",
+    ttl=config.NOTIFICATION_UNREAD_RECONCILE_INTERVAL,
+    maxsize=config.NOTIFICATION_UNREAD_CACHE_MAXSIZE,
+)
+# tenant_id -> user_ids with a counter, to route new notifications; may hold expired keys
+_users_by_tenant: dict[str, set[str]] = {}
+
+
+async def get_unread_count(tenant_id: str, user_id: str) -> int:
+    async def load() -> int:
+        count = await notification_repo.count_unread(tenant_id, user_id)
+        _users_by_tenant.setdefault(tenant_id, set()).add(user_id)
+        return count
+
+    return await _counts.get_or_load((tenant_id, user_id), load)
+
+
+def adjust(tenant_id: str, user_id: str, delta: int):
+    key = (tenant_id, user_id)
+    count = _counts.get(key)
+    if count is not None:
+        _counts.update(key, max(0, count + delta))
+
+
+def reset(tenant_id: str, user_id: str):
+    _counts.update((tenant_id, user_id), 0)
+
+
+def _targets(doc: dict) -> list[tuple[str, str]]:
+    # same visibility rules as get_by_filter
+    if doc.get("has_for_all"):
+        return [(tenant_id, user_id) for tenant_id, users in _users_by_tenant.items() for user_id in users]
+    tenant_id = doc.get("tenant_id")
+    users = _users_by_tenant.get(tenant_id, set())
+    if doc.get("user_id") is None:
+        return [(tenant_id, user_id) for user_id in users]
+    return [(tenant_id, doc["user_id"])] if doc["user_id"] in users else []
+
+
+def on_notification(doc: dict):
+    """
+    Hub listener: count a new notification for every live counter it is visible to
+    """
+    for tenant_id, user_id in _targets(doc):
+        key = (tenant_id, user_id)
+        if not _counts.update(key, _counts.get(key, 0) + 1):
+            # expired or evicted: recounted on the next read anyway
+            _users_by_tenant[tenant_id].discard(user_id)
+            if not _users_by_tenant[tenant_id]:
+                del _users_by_tenant[tenant_id]
+
+
+def has_counts() -> bool:
+    """Whether any live counter needs new notifications from the hub"""
+    return bool(_counts.keys())
+
+
+def stats() -> dict:
+    return _counts.stats()
+
+
+hub.add_listener(on_notification, has_counts)
@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime, timezone
+from app.cache import weather_cache
+from app.cache.weather_cache import WeatherKind
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.logger.logger import logger
+from app.models.location_model import Location
+from app.providers import registry
+from app.providers.base import WeatherProvider
+from app.repositories import location_repo, weather_repo
+from app.utils.rate_limiter import AsyncRateLimiter
+
+# Upstream quota per provider, calls per minute
+PROVIDER_RATE_LIMITS = {
+    WEATHER_PROVIDERS.GOOGLE: config.GOOGLE_WEATHER_RATE_LIMIT,
+    WEATHER_PROVIDERS.WEATHERAPI: config.WEATHER_API_RATE_LIMIT,
+    WEATHER_PROVIDERS.OPENWEATHER: config.OPENWEATHER_RATE_LIMIT,
+    WEATHER_PROVIDERS.VISUAL_CROSSING: config.VISUAL_CROSSING_RATE_LIMIT,
+}
+
+# Upstream quota per provider, calls per UTC day
+PROVIDER_DAILY_LIMITS = {
+    WEATHER_PROVIDERS.GOOGLE: config.GOOGLE_WEATHER_DAILY_LIMIT,
+    WEATHER_PROVIDERS.WEATHERAPI: config.WEATHER_API_DAILY_LIMIT,
+    WEATHER_PROVIDERS.OPENWEATHER: config.OPENWEATHER_DAILY_LIMIT,
+    WEATHER_PROVIDERS.VISUAL_CROSSING: config.VISUAL_CROSSING_DAILY_LIMIT,
+}
+
+
+class DailyBudget:
+    """
+    Calls prefetch may still make today (UTC). Handed out per walk in even
+    shares of what is left, so the budget lasts the whole day. The fraction of
+    a call left over from a share carries to the next walk, so a budget smaller
+    than the number of walks in a day still gets spent.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.day = None
+        self.used = 0
+        self.carry = 0.0
+
+    def _roll(self, now: datetime):
+        if now.date() != self.day:
+            self.day, self.used, self.carry = now.date(), 0, 0.0
+
+    def remaining(self) -> int:
+        self._roll(datetime.now(timezone.utc))
+        return max(0, self.limit - self.used)
+
+    def spend(self):
+        self._roll(datetime.now(timezone.utc))
+        self.used += 1
+
+    def per_walk(self, interval: float, now: datetime | None = None) -> int:
+        now = now or datetime.now(timezone.utc)
+        self._roll(now)
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        walks_left = max(1.0, (86400 - (now - midnight).total_seconds()) / interval)
+        remaining = max(0, self.limit - self.used)
+        share = remaining / walks_left + self.carry
+        allowance = min(int(share), remaining)
+        self.carry = share - allowance if remaining else 0.0
+        return allowance
+
+
+async def recent_locations() -> list[Location]:
+    """Recently requested stores, most recent first"""
+    group_ids = weather_cache.recently_requested()
+    locations = await location_repo.get_by_group_ids(group_ids)
+    return [locations[group_id] for group_id in group_ids if group_id in locations]
+
+
+class ProviderPrefetcher:
+    """
+    Keeps one provider's cached current weather and today's hourly forecast of
+    the recently requested stores fresh, so their weather requests are served
+    from the cache.
+
+    Every WEATHER_PREFETCH_INTERVAL seconds it walks the stores requested
+    within WEATHER_PREFETCH_ACTIVE_WINDOW, most recent first, and refreshes the
+    entries that would expire before the next walk, as far as this walk's share
+    of the daily budget goes; the rest are loaded on demand. Calls are spaced
+    evenly (no bursts) at WEATHER_PREFETCH_QUOTA_SHARE of the provider's
+    per-minute quota, and never exceed that share of its daily quota.
+    """
+
+    def __init__(self, provider: WeatherProvider, calls_per_minute: float, calls_per_day: int):
+        self.provider = provider
+        self.calls_per_minute = calls_per_minute
+        self.limiter = AsyncRateLimiter(calls_per_minute, period=60, burst=1)
+        self.budget = DailyBudget(calls_per_day)
+        self.kinds = [WeatherKind.CURRENT] + ([WeatherKind.HOURLY] if provider.supports_hourly else [])
+        self.refreshed = 0
+        self.fresh = 0
+        self.deferred = 0
+        self.failures = 0
+        self.last_walk_seconds = 0.0
+
+    def needs_refresh(self, kind: str, group_id: str) -> bool:
+        remaining = weather_cache.get_cache(self.provider.name).remaining_ttl(
+            weather_cache.cache_key(kind, group_id)
+        )
+        return remaining is None or remaining < config.WEATHER_PREFETCH_INTERVAL
+
+    async def walk(self, locations: list[Location]):
+        allowance = self.budget.per_walk(config.WEATHER_PREFETCH_INTERVAL)
+        for location in locations:
+            for kind in self.kinds:
+                # checked before waiting for a call, so fresh entries cost no quota
+                if not self.needs_refresh(kind, location.group_id):
+                    self.fresh += 1
+                    continue
+                if allowance <= 0:
+                    self.deferred += 1
+                    continue
+                allowance -= 1
+                self.budget.spend()
+                await self.limiter.acquire()
+                try:
+                    await weather_repo.refresh_weather(self.provider.name, kind, location)
+                    self.refreshed += 1
+                except Exception:
+                    # already logged by weather_repo; a request for it loads it on demand
+                    self.failures += 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            locations = await recent_locations()
+            await self.walk(locations)
+            self.last_walk_seconds = loop.time() - started
+            if self.last_walk_seconds > config.WEATHER_PREFETCH_INTERVAL:
+                logger.warning(
+                    f"{self.provider.label} prefetch took {self.last_walk_seconds:.0f}s, longer than "
+                    f"WEATHER_PREFETCH_INTERVAL: {self.calls_per_minute:g} calls/min is too few for "
+                    f"{len(locations)} locations, the least requested ones will miss"
+                )
+            await asyncio.sleep(max(0.0, config.WEATHER_PREFETCH_INTERVAL - self.last_walk_seconds))
+
+    def stats(self) -> dict:
+        return {
+            "calls_per_minute": self.calls_per_minute,
+            "daily_budget": self.budget.limit,
+            "remaining_today": self.budget.remaining(),
+            "refreshed": self.refreshed,
+            "fresh": self.fresh,
+            "deferred": self.deferred,
+            "failures": self.failures,
+            "last_walk_seconds": round(self.last_walk_seconds, 1),
+        }
+
+
+_prefetchers: list[ProviderPrefetcher] = []
+_tasks: list[asyncio.Task] = []
+
+
+async def start_weather_prefetch():
+    """
+    Start one prefetch loop per configured provider. Called from the app lifespan,
+    after the location cache is loaded.
+    """
+    for name in config.WEATHER_PREFETCH_PROVIDERS:
+        provider = registry.get_provider(name)
+        if not provider.is_configured():
+            logger.info(f"{provider.label} has no API key, not prefetched")
+            continue
+        prefetcher = ProviderPrefetcher(
+            provider,
+            PROVIDER_RATE_LIMITS[provider.name] * config.WEATHER_PREFETCH_QUOTA_SHARE,
+            int(PROVIDER_DAILY_LIMITS[provider.name] * config.WEATHER_PREFETCH_QUOTA_SHARE),
+        )
+        _prefetchers.append(prefetcher)
+        _tasks.append(asyncio.create_task(prefetcher.run()))
+
+
+async def stop_weather_prefetch():
+    for task in _tasks:
+        task.cancel()
+    for task in _tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _tasks.clear()
+    _prefetchers.clear()
+
+
+def stats() -> dict:
+    return {prefetcher.provider.name: prefetcher.stats() for prefetcher in _prefetchers}
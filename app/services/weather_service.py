@@ -1,6 +1,6 @@
 from app.repositories import weather_repo
-from app.models.weather_model import WeatherByGroupIdReq, WeatherResponse
-from typing import Optional
+from app.models.weather_model import WeatherBatchReq, WeatherByGroupIdReq, WeatherResponse
+from typing import AsyncIterator, Optional
 
 
 async def get_weather_by_group_id(data: WeatherByGroupIdReq) -> Optional[WeatherResponse]:
@@ -41,6 +41,25 @@ async def get_weather_by_group_id_weatherapi(data: WeatherByGroupIdReq) -> Optio
     return weather
 
 
+async def get_weather_by_group_id_best(data: WeatherByGroupIdReq) -> Optional[WeatherResponse]:
+    """
+    Get weather information for a location identified by group_id from the
+    fastest healthy provider (hedged race with automatic failover)
+    
+    Args:
+        data: Request containing group_id
+        
+    Returns:
+        WeatherResponse with current weather conditions
+        
+    Raises:
+        Exception: If location not found or every weather API fails
+    """
+    weather = await weather_repo.get_best_current_weather(data.group_id)
+    
+    return weather
+
+
 async def get_weather_hourly_by_group_id(data: WeatherByGroupIdReq):
     """
     Get 24-hour weather forecast for a location identified by group_id using WeatherAPI.com
@@ -142,3 +161,16 @@ async def get_weather_hourly_by_group_id_visualcrossing(data):
     weather = await weather_repo.get_weather_hourly_by_group_id_visualcrossing(data.group_id, date)
     
     return weather
+
+
+def get_weather_batch(data: WeatherBatchReq) -> AsyncIterator[dict]:
+    """
+    Get current weather for many group_ids with a single location query
+    
+    Args:
+        data: Request containing group_ids and the provider to use
+        
+    Returns:
+        Async iterator of per-group_id results, in completion order
+    """
+    return weather_repo.get_current_weather_batch(data.provider, data.group_ids)
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket limiter: `rate` acquisitions per `period` seconds on average,
+    with bursts up to `burst`. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0, burst: int | None = None):
+        self.rate = rate / period
+        self.capacity = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
@@ -1,8 +1,11 @@
+import re
+import unicodedata
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import pytz
 from app.constants.constant import LOCAL_TIMEZONE
 from io import BytesIO
+from typing import AsyncIterator
 
 
 vn_timezone = ZoneInfo(LOCAL_TIMEZONE)
@@ -30,3 +33,83 @@ def convert_timestamp_to_iso(timestamp: float) -> str:
         return None
     dt = datetime.fromtimestamp(timestamp, tz=pytz.UTC)
     return dt.isoformat().replace("+00:00", "Z")  # Định dạng ISO 8601 với 'Z'
+
+
+# Common Vietnamese address abbreviations, applied after lowercasing
+ADDRESS_ABBREVIATIONS = [
+    (re.compile(r"\btp\.?\s*hcm\b"), "thành phố hồ chí minh"),
+    (re.compile(r"\bhcm\b"), "hồ chí minh"),
+    (re.compile(r"\btp\.\s*|\btp\s+"), "thành phố "),
+    (re.compile(r"\btx\.\s*"), "thị xã "),
+    (re.compile(r"\btt\.\s*"), "thị trấn "),
+    (re.compile(r"\bq\.\s*|\bq(?=\d)"), "quận "),
+    (re.compile(r"\bp\.\s*|\bp(?=\d)"), "phường "),
+    (re.compile(r"\bđ\.\s*"), "đường "),
+    (re.compile(r"\bh\.\s*"), "huyện "),
+    (re.compile(r"\bx\.\s*"), "xã "),
+]
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of an address used as geocode cache key:
+    Unicode NFC, lowercase, expanded abbreviations ("Q.3" -> "quận 3"), single spaces.
+    """
+    value = unicodedata.normalize("NFC", address).lower()
+    for pattern, replacement in ADDRESS_ABBREVIATIONS:
+        value = pattern.sub(replacement, value)
+    # "quận 03" -> "quận 3"
+    value = re.sub(r"\b(quận|phường) 0+(?=\d)", r"\1 ", value)
+    value = re.sub(r"\s*,\s*", ", ", value)
+    value = re.sub(r"\s+", " ", value)
+    return value.strip(" ,.")
+
+
+# Longest prefix stored per word; longer search words are truncated to match
+SEARCH_TOKEN_MAX_PREFIX = 20
+
+
+def fold_diacritics(text: str) -> str:
+    """Strip Vietnamese diacritics: "Nguyễn Đình" -> "Nguyen Dinh"."""
+    value = unicodedata.normalize("NFD", text)
+    value = "".join(c for c in value if unicodedata.category(c) != "Mn")
+    return value.replace("đ", "d").replace("Đ", "D")
+
+
+def search_words(text: str, fold: bool = True) -> list[str]:
+    """
+    Lowercased words of `text`. With `fold`, each word is also added in its
+    unaccented form, so "Hàng đợi" is found by both "hàng" and "hang".
+    """
+    value = unicodedata.normalize("NFC", text).lower()
+    words = re.findall(r"\w+", value)
+    if fold:
+        words += [fold_diacritics(w) for w in words]
+    return list(dict.fromkeys(words))
+
+
+def search_tokens(text: str | None) -> list[str]:
+    """
+    Prefix tokens of every word of `text`, stored on write so a keyword search
+    becomes an exact match on an indexed array: "queue" -> q, qu, que, queu, queue.
+    """
+    if not text:
+        return []
+    tokens = {
+        word[:length]
+        for word in search_words(text)
+        for length in range(1, min(len(word), SEARCH_TOKEN_MAX_PREFIX) + 1)
+    }
+    return sorted(tokens)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed request body into lines without reading it all first"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
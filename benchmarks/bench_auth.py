@@ -0,0 +1,44 @@
+"""
+Auth overhead per request: get_current_user with a fresh token every call
+(signature check + AuthUser) against a repeated token served from the
+verified-token cache.
+
+    python -m benchmarks.bench_auth
+"""
+import os
+import time
+import timeit
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from jose import jwt  # noqa: E402
+from app.auth import auth  # noqa: E402
+
+NUMBER = 20000
+
+
+def make_token(i: int) -> str:
+    payload = {
+        "user_id": f"user-{i}",
+        "role": "admin",
+        "email": f"user-{i}@example.com",
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+
+def main():
+    tokens = [make_token(i) for i in range(NUMBER)]
+    fresh = iter(tokens)
+
+    auth._verified_tokens.maxsize = NUMBER
+    cold = timeit.timeit(lambda: auth.decode_token(next(fresh)), number=NUMBER)
+    warm = timeit.timeit(lambda: auth.decode_token(tokens[0]), number=NUMBER)
+
+    print(f"verify + AuthUser (cache miss): {cold / NUMBER * 1e6:8.2f} us/request")
+    print(f"verified-token cache hit:       {warm / NUMBER * 1e6:8.2f} us/request")
+    print(f"speedup: {cold / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Response compression on typical payloads: a 40-interval OpenWeather hourly
+forecast and a notification page of 50. Size, compression time per response,
+and the resulting time to deliver the body over a slow and a fast link.
+
+    python -m benchmarks.bench_compression
+"""
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from app.middleware.compression import ENCODERS
+from app.models.notification_model import NotificationRes
+from app.models.weather_model import HourlyWeather, WeatherHourlyResponse
+from app.schemas.base import AppBasePagingRes, AppBaseResponse
+
+NUMBER = 500
+# bits per second
+LINKS = {"4G (10 Mbit/s)": 10e6, "office (100 Mbit/s)": 100e6}
+
+
+def hourly_forecast() -> bytes:
+    start = datetime(2025, 12, 22)
+    hourly = [
+        HourlyWeather(
+            time=(start + timedelta(hours=3 * i)).strftime("%Y-%m-%d %H:00"),
+            weather_type=("cloudy", "light rain", "partly cloudy")[i % 3],
+            temp_c=24.5 + i % 5,
+            chance_of_rain=(i * 7) % 100,
+        )
+        for i in range(40)
+    ]
+    data = WeatherHourlyResponse(group_id="store-123", forecast_date="2025-12-22", hourly=hourly)
+    return AppBaseResponse(data).to_json().body
+
+
+def notification_page() -> bytes:
+    items = [
+        NotificationRes(
+            _id=uuid.uuid4().bytes,
+            title=f"Zone {i % 7} overcrowded",
+            description="Too many people in the product zone",
+            status="warning",
+            type="product_zone_overcrowded",
+            created_at=datetime(2025, 12, 22, 14, 0) - timedelta(minutes=i),
+            is_read=i % 2 == 0,
+            repeat_count=i % 3,
+        )
+        for i in range(50)
+    ]
+    page = AppBasePagingRes(items=items, page=1, page_size=50, total=500)
+    return AppBaseResponse(page.to_dict()).to_json().body
+
+
+def compress(name: str, body: bytes) -> bytes:
+    encoder = ENCODERS[name]()
+    return encoder.compress(body) + encoder.finish()
+
+
+def main():
+    payloads = {"hourly forecast (40 intervals)": hourly_forecast(), "notification page (50)": notification_page()}
+    for label, body in payloads.items():
+        print(f"{label}: {len(body)} bytes")
+        rows = [("identity", len(body), 0.0)]
+        for name in ENCODERS:
+            seconds = timeit.timeit(lambda: compress(name, body), number=NUMBER) / NUMBER
+            rows.append((name, len(compress(name, body)), seconds))
+        for name, size, seconds in rows:
+            transfers = "  ".join(
+                f"{link}: {(seconds + size * 8 / bandwidth) * 1e3:6.2f} ms" for link, bandwidth in LINKS.items()
+            )
+            print(f"  {name:<9} {size:6d} B  {len(body) / size:5.1f}x  {seconds * 1e6:7.1f} us  {transfers}")
+
+
+if __name__ == "__main__":
+    main()
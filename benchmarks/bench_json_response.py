@@ -0,0 +1,90 @@
+"""
+Response encoding per request: the dict a route used to return, encoded by
+FastAPI's jsonable_encoder + JSONResponse (and the hand-rolled to_dict +
+json.dumps of the Visual Crossing hourly route), against FastJSONResponse.
+
+    python -m benchmarks.bench_json_response
+"""
+import json
+import timeit
+import uuid
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.models.notification_model import NotificationRes
+from app.models.weather_model import HourlyWeather, WeatherHourlyResponse
+from app.schemas.base import AppBasePagingRes, AppBaseResponse
+
+NUMBER = 2000
+
+
+def notification_page() -> AppBaseResponse:
+    items = [
+        NotificationRes(
+            _id=uuid.uuid4().bytes,
+            title=f"Zone {i} overcrowded",
+            description="Too many people in the zone",
+            status="warning",
+            type="product_zone_overcrowded",
+            created_at=datetime.now(),
+            is_read=i % 2 == 0,
+            repeat_count=i % 3,
+        )
+        for i in range(50)
+    ]
+    return AppBaseResponse(AppBasePagingRes(items=items, page=1, page_size=50, total=500, is_full=False).to_dict())
+
+
+def hourly_weather() -> AppBaseResponse:
+    hourly = [
+        HourlyWeather(time=f"2025-12-22 {hour:02d}:00", weather_type="cloudy", temp_c=24.5, chance_of_rain=30.0)
+        for hour in range(24)
+    ]
+    return AppBaseResponse(WeatherHourlyResponse(group_id="store-123", forecast_date="2025-12-22", hourly=hourly))
+
+
+def legacy_to_dict(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, list):
+        return [legacy_to_dict(i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: legacy_to_dict(v) for k, v in obj.items()}
+    return obj
+
+
+def report(name: str, candidates: dict):
+    print(name)
+    baseline = None
+    for label, fn in candidates.items():
+        seconds = timeit.timeit(fn, number=NUMBER) / NUMBER
+        baseline = baseline or seconds
+        print(f"  {label:<34} {seconds * 1e6:8.1f} us/response  ({baseline / seconds:.1f}x)")
+
+
+def main():
+    page = notification_page()
+    report(
+        "notification list (50 items)",
+        {
+            "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(page.to_dict())),
+            "FastJSONResponse": page.to_json,
+        },
+    )
+
+    weather = hourly_weather()
+    report(
+        "hourly weather (24 hours)",
+        {
+            "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(weather.to_dict())),
+            "to_dict + json.dumps (old route)": lambda: json.dumps(
+                AppBaseResponse(legacy_to_dict(weather.data)).to_dict()
+            ),
+            "FastJSONResponse": weather.to_json,
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
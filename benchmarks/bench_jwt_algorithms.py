@@ -0,0 +1,69 @@
+"""
+Signature check cost per algorithm: get_current_user with a fresh HS256,
+RS256 and ES256 token every call, against a token served from the
+verified-token cache (the same for every algorithm).
+
+    python -m benchmarks.bench_jwt_algorithms
+"""
+import os
+import time
+import timeit
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, rsa  # noqa: E402
+from jose import jwk, jwt  # noqa: E402
+from app.auth import auth, jwks  # noqa: E402
+
+NUMBER = 2000
+
+
+def private_pem(key) -> bytes:
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def make_tokens(key, algorithm: str, kid: str | None) -> list[str]:
+    headers = {"kid": kid} if kid else None
+    return [
+        jwt.encode(
+            {"user_id": f"user-{i}", "role": "admin", "email": f"user-{i}@example.com", "exp": int(time.time()) + 3600},
+            key,
+            algorithm=algorithm,
+            headers=headers,
+        )
+        for i in range(NUMBER)
+    ]
+
+
+def main():
+    rsa_pem = private_pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    ec_pem = private_pem(ec.generate_private_key(ec.SECP256R1()))
+    jwks.set_keys(
+        {
+            "keys": [
+                {**jwk.construct(rsa_pem, "RS256").public_key().to_dict(), "kid": "rsa"},
+                {**jwk.construct(ec_pem, "ES256").public_key().to_dict(), "kid": "ec"},
+            ]
+        }
+    )
+    auth._verified_tokens.maxsize = 3 * NUMBER
+
+    for algorithm, key, kid in (
+        ("HS256", auth.SECRET_KEY, None),
+        ("RS256", rsa_pem, "rsa"),
+        ("ES256", ec_pem, "ec"),
+    ):
+        tokens = make_tokens(key, algorithm, kid)
+        fresh = iter(tokens)
+        cold = timeit.timeit(lambda: auth.decode_token(next(fresh)), number=NUMBER)
+        print(f"{algorithm} verify + AuthUser (cache miss): {cold / NUMBER * 1e6:8.2f} us/request")
+
+    warm = timeit.timeit(lambda: auth.decode_token(tokens[0]), number=NUMBER)
+    print(f"verified-token cache hit:             {warm / NUMBER * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
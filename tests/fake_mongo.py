@@ -0,0 +1,287 @@
+"""
+Minimal in-memory stand-ins for Motor collections, so repository tests do not
+need a live mongod or replica set. Only the query shapes the repositories use
+are supported.
+"""
+import asyncio
+import re
+import weakref
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+
+_OPERATORS = {
+    "$all": lambda value, arg: isinstance(value, list) and all(a in value for a in arg),
+    "$exists": lambda value, arg: (value is not None) == arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$ne": lambda value, arg: value != arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+}
+
+
+# name -> collection, so $lookup can find the collection it joins
+_collections: "weakref.WeakValueDictionary[str, FakeCollection]" = weakref.WeakValueDictionary()
+
+
+def _matches_value(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(op in _OPERATORS for op in condition):
+        if isinstance(value, list) and set(condition) <= {"$ne", "$nin"}:
+            # array fields: $ne / $nin match when no element matches
+            return all(_matches_value(v, condition) for v in value)
+        return all(_OPERATORS[op](value, arg) for op, arg in condition.items())
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and condition.search(value) is not None
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def _get_path(doc: dict, path: str):
+    """Dotted lookup, with numeric parts indexing arrays ("users_read.0")"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list) and part.isdigit():
+            value = value[int(part)] if int(part) < len(value) else None
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif field == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif not _matches_value(_get_path(doc, field), condition):
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    def sort(self, keys: list[tuple[str, int]]):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    def skip(self, count: int):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs if length is None else self.docs[:length])
+
+    def __aiter__(self):
+        self._iter = iter(list(self.docs))
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _field(doc: dict, path: str):
+    """Field path value; a path through an array of documents collects the values"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [item.get(part) for item in value if isinstance(item, dict) and part in item]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def _evaluate(doc: dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _field(doc, expression[1:])
+    if isinstance(expression, dict):
+        (op, args), = expression.items()
+        # {"$size": "$field"}: a single argument may be given without a list
+        values = [_evaluate(doc, arg) for arg in (args if isinstance(args, list) else [args])]
+        if op == "$in":
+            return values[0] in values[1]
+        if op == "$ifNull":
+            return next((v for v in values if v is not None), None)
+        if op == "$or":
+            return any(values)
+        if op == "$size":
+            return len(values[0])
+        if op == "$gt":
+            return values[0] is not None and values[1] is not None and values[0] > values[1]
+        if op == "$lte":
+            return values[0] is not None and values[1] is not None and values[0] <= values[1]
+        if op == "$arrayElemAt":
+            return values[0][values[1]] if values[1] < len(values[0]) else None
+        raise NotImplementedError(op)
+    if isinstance(expression, list):
+        return [_evaluate(doc, value) for value in expression]
+    return expression
+
+
+def _project(doc: dict, projection: dict | None) -> dict:
+    if not projection:
+        return dict(doc)
+    projected = {"_id": doc["_id"]}
+    for field, spec in projection.items():
+        if spec == 1 or spec is True:
+            if field in doc:
+                projected[field] = doc[field]
+        elif spec == 0 or spec is False:
+            projected.pop(field, None)
+        else:
+            projected[field] = _evaluate(doc, spec)
+    return projected
+
+
+def _run_pipeline(docs: list[dict], stages: list[dict]) -> list[dict]:
+    for stage in stages:
+        (op, arg), = stage.items()
+        if op == "$match":
+            docs = [d for d in docs if _matches(d, arg)]
+        elif op == "$sort":
+            docs = FakeCursor(docs).sort(list(arg.items())).docs
+        elif op == "$skip":
+            docs = docs[arg:]
+        elif op == "$limit":
+            docs = docs[:arg]
+        elif op == "$project":
+            docs = [_project(d, arg) for d in docs]
+        elif op == "$count":
+            docs = [{arg: len(docs)}] if docs else []
+        elif op == "$lookup":
+            foreign = list(_collections[arg["from"]].docs.values())
+            docs = [
+                {
+                    **d,
+                    arg["as"]: _run_pipeline(
+                        [
+                            dict(f)
+                            for f in foreign
+                            # without localField the sub-pipeline sees every document
+                            if "localField" not in arg or f.get(arg["foreignField"]) == d.get(arg["localField"])
+                        ],
+                        arg.get("pipeline", []),
+                    ),
+                }
+                for d in docs
+            ]
+        elif op == "$addFields":
+            docs = [{**d, **{field: _evaluate(d, spec) for field, spec in arg.items()}} for d in docs]
+        elif op == "$facet":
+            docs = [{name: _run_pipeline(list(docs), sub) for name, sub in arg.items()}]
+        else:
+            raise NotImplementedError(op)
+    return docs
+
+
+class FakeChangeStream:
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class FakeCollection:
+    def __init__(self, docs: list[dict] | None = None, replica_set: bool = True, name: str | None = None):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs or []}
+        self.name = name or f"fake_{id(self)}"
+        _collections[self.name] = self
+        self.replica_set = replica_set
+        self.changes: asyncio.Queue = asyncio.Queue()
+        self.queries: list[tuple[str, dict]] = []
+
+    async def find_one(self, query: dict):
+        self.queries.append(("find_one", query))
+        return next((dict(d) for d in self.docs.values() if _matches(d, query)), None)
+
+    def find(self, query: dict, projection: dict | None = None):
+        self.queries.append(("find", query))
+        return FakeCursor([_project(d, projection) for d in self.docs.values() if _matches(d, query)])
+
+    def aggregate(self, pipeline: list[dict]):
+        self.queries.append(("aggregate", pipeline))
+        return FakeCursor(_run_pipeline([dict(d) for d in self.docs.values()], pipeline))
+
+    async def count_documents(self, query: dict):
+        self.queries.append(("count_documents", query))
+        return sum(1 for d in self.docs.values() if _matches(d, query))
+
+    async def insert_one(self, doc: dict):
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def insert_many(self, docs: list[dict], ordered: bool = True):
+        self.queries.append(("insert_many", {"count": len(docs)}))
+        for doc in docs:
+            self.docs[doc["_id"]] = dict(doc)
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        doc = await self.find_one(query)
+        upserted = doc is None
+        if upserted:
+            if not upsert:
+                return SimpleNamespace(upserted_id=None, modified_count=0)
+            doc = {"_id": ObjectId(), **query, **update.get("$setOnInsert", {})}
+        before = dict(doc)
+        doc.update(update.get("$set", {}))
+        for field, value in update.get("$max", {}).items():
+            if doc.get(field) is None or value > doc[field]:
+                doc[field] = value
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        self.docs[doc["_id"]] = doc
+        return SimpleNamespace(
+            upserted_id=doc["_id"] if upserted else None,
+            modified_count=int(not upserted and doc != before),
+        )
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        upserted = modified = 0
+        for operation in operations:
+            result = await self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+            upserted += result.upserted_id is not None
+            modified += result.modified_count
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+    def watch(self, *args, **kwargs):
+        if not self.replica_set:
+            raise OperationFailure(
+                "The $changeStream stage is only supported on replica sets", code=40573
+            )
+        return FakeChangeStream(self.changes)
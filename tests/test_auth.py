@@ -0,0 +1,151 @@
+import json
+import time
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from app.auth import auth, jwks
+from app.configs import config
+
+
+def make_token(expires_in: float | None = 3600, key=None, algorithm=None, kid=None, **claims) -> str:
+    payload = {"user_id": "u1", "role": "admin", "email": "u1@example.com", **claims}
+    if expires_in is not None:
+        payload["exp"] = int(time.time() + expires_in)
+    headers = {"kid": kid} if kid else None
+    return jwt.encode(
+        payload, key or auth.SECRET_KEY, algorithm=algorithm or auth.ALGORITHM, headers=headers
+    )
+
+
+def private_pem(key) -> bytes:
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def public_jwk(pem: bytes, algorithm: str, kid: str) -> dict:
+    return {**jwk.construct(pem, algorithm).public_key().to_dict(), "kid": kid, "use": "sig"}
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    auth._verified_tokens.clear()
+    calls = []
+    decode = auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+    return calls
+
+
+def test_repeat_token_is_verified_once(decodes):
+    token = make_token()
+
+    first = auth.decode_token(token)
+    assert auth.decode_token(token) is first
+    assert auth.verify_token(token) == "u1"
+    assert len(decodes) == 1
+
+
+def test_cache_never_outlives_exp(decodes):
+    token = make_token(expires_in=1)
+    auth.decode_token(token)
+
+    expires_at, _ = next(iter(auth._verified_tokens._data.values()))
+    assert expires_at - time.monotonic() <= 1
+
+
+def test_invalid_tokens_are_rejected_and_not_cached(decodes):
+    with pytest.raises(HTTPException, match="Token expired"):
+        auth.verify_token(make_token(expires_in=-10))
+    with pytest.raises(HTTPException, match="Invalid token"):
+        auth.verify_token(make_token() + "x")
+    with pytest.raises(HTTPException, match="Invalid token"):
+        auth.verify_token(make_token(user_id=None))
+
+    assert len(auth._verified_tokens._data) == 0
+
+
+@pytest.fixture
+def signing_keys(monkeypatch, decodes):
+    monkeypatch.setattr(jwks, "_keys", {})
+    monkeypatch.setattr(jwks, "generation", 0)
+    rsa_pem = private_pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    ec_pem = private_pem(ec.generate_private_key(ec.SECP256R1()))
+    document = {
+        "keys": [
+            public_jwk(rsa_pem, "RS256", "rsa-1"),
+            public_jwk(ec_pem, "ES256", "ec-1"),
+        ]
+    }
+    jwks.set_keys(document)
+    return {"rsa-1": rsa_pem, "ec-1": ec_pem, "document": document}
+
+
+def test_asymmetric_tokens_verify_against_jwks(signing_keys):
+    rs256 = make_token(key=signing_keys["rsa-1"], algorithm="RS256", kid="rsa-1", user_id="svc-a")
+    es256 = make_token(key=signing_keys["ec-1"], algorithm="ES256", kid="ec-1", user_id="svc-b")
+
+    assert auth.verify_token(rs256) == "svc-a"
+    assert auth.verify_token(es256) == "svc-b"
+    assert auth.verify_token(make_token()) == "u1"
+
+
+def test_unknown_or_mismatched_keys_are_rejected(signing_keys):
+    unknown = make_token(key=signing_keys["rsa-1"], algorithm="RS256", kid="rsa-2")
+    # ES256 token naming the RSA key
+    mismatched = make_token(key=signing_keys["ec-1"], algorithm="ES256", kid="rsa-1")
+
+    for token in (unknown, mismatched):
+        with pytest.raises(HTTPException, match="Invalid token"):
+            auth.verify_token(token)
+
+
+def test_rotation_invalidates_cached_tokens(signing_keys):
+    token = make_token(key=signing_keys["rsa-1"], algorithm="RS256", kid="rsa-1")
+    auth.verify_token(token)
+
+    # rsa-1 rotated out
+    jwks.set_keys({"keys": [signing_keys["document"]["keys"][1]]})
+
+    with pytest.raises(HTTPException, match="Invalid token"):
+        auth.verify_token(token)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def test_reload_from_file(anyio_backend, signing_keys, tmp_path, monkeypatch):
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": signing_keys["document"]["keys"][:1]}))
+    monkeypatch.setattr(config, "AUTH_JWKS_FILE", str(path))
+    generation = jwks.generation
+
+    await jwks.reload_keys()
+    assert list(jwks._keys) == ["rsa-1"] and jwks.generation == generation + 1
+
+    # an unchanged document keeps the generation, and so the cached tokens
+    await jwks.reload_keys()
+    assert jwks.generation == generation + 1
+
+
+async def test_stream_user_from_header_or_short_lived_query_token(anyio_backend, decodes):
+    long_lived = make_token(expires_in=3600)
+    short_lived = make_token(expires_in=60)
+
+    assert (await auth.get_stream_user(authorization=long_lived, access_token=None)).user_id == "u1"
+    assert (await auth.get_stream_user(authorization=None, access_token=short_lived)).user_id == "u1"
+    # query strings are logged: long-lived or non-expiring tokens stay in the header
+    for token in (long_lived, make_token(expires_in=None)):
+        with pytest.raises(HTTPException) as e:
+            await auth.get_stream_user(authorization=None, access_token=token)
+        assert e.value.status_code == 401
+    with pytest.raises(HTTPException):
+        await auth.get_stream_user(authorization=None, access_token=None)
@@ -0,0 +1,95 @@
+import gzip
+import json
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware, negotiate
+from app.schemas.base import AppBaseResponse
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    hourly = [{"time": f"2025-12-22 {h:02d}:00", "weather_type": "cloudy", "temp_c": 24.5} for h in range(40)]
+
+    @app.get("/hourly")
+    async def get_hourly():
+        return AppBaseResponse(hourly).to_json()
+
+    @app.get("/small")
+    async def get_small():
+        return AppBaseResponse({"ok": True}).to_json()
+
+    @app.get("/lines")
+    async def get_lines():
+        async def lines():
+            for item in hourly:
+                yield json.dumps(item) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test", headers={"Accept-Encoding": "gzip"})
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("*") == next(iter(compression.ENCODERS))
+    assert negotiate("") is None
+
+
+async def test_compresses_json_above_minimum_size(anyio_backend, client):
+    async with client:
+        response = await client.get("/hourly")
+        small = await client.get("/small")
+        identity = await client.get("/hourly", headers={"Accept-Encoding": "identity"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].startswith("W/")
+    assert int(response.headers["content-length"]) < len(identity.content) / 5
+    assert json.loads(response.content)["data"] == json.loads(identity.content)["data"]
+    assert "content-encoding" not in small.headers and small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in identity.headers
+
+
+async def test_streams_are_compressed_incrementally(anyio_backend, monkeypatch):
+    # every chunk goes through the worker thread path as well
+    monkeypatch.setattr(compression.config, "COMPRESSION_THREAD_THRESHOLD", 0)
+    lines = [
+        json.dumps({"group_id": f"store-{i}", "weather_type": "cloudy"}).encode() + b"\n" for i in range(40)
+    ]
+
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"application/x-ndjson")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for line in lines:
+            await send({"type": "http.response.body", "body": line, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app)(scope, None, send)
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    chunks = [message["body"] for message in sent[1:]]
+    assert len(chunks) == len(lines) + 1
+    # each chunk is sync-flushed: the lines so far decode without the rest
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decoder.decompress(chunks[0]) == lines[0]
+    assert decoder.decompress(chunks[1]) == lines[1]
+    assert gzip.decompress(b"".join(chunks)) == b"".join(lines)
@@ -0,0 +1,113 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+from app.cache import weather_cache
+from app.middleware import http_cache
+from app.middleware.http_cache import CachePolicy, HttpCacheMiddleware
+from app.schemas.base import AppBaseResponse
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(http_cache, "_etags", http_cache.TTLCache("test_etag", ttl=0, maxsize=100))
+    app = FastAPI()
+    app.add_middleware(
+        HttpCacheMiddleware,
+        base_url="/api",
+        policies={
+            "/weather/": CachePolicy(max_age=60, stale_while_revalidate=30),
+            "/notifications": CachePolicy(private=True),
+        },
+    )
+    state = {"calls": 0, "items": ["a"]}
+
+    @app.get("/api/weather/hourly")
+    async def hourly():
+        state["calls"] += 1
+        return AppBaseResponse({"temp_c": 24.5}).to_json()
+
+    @app.get("/api/notifications")
+    async def notifications():
+        state["calls"] += 1
+        return AppBaseResponse(state["items"]).to_json()
+
+    @app.get("/api/notifications/stream")
+    async def stream():
+        return StreamingResponse(iter([b"data: 1\n\n"]), media_type="text/event-stream")
+
+    state["client"] = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    return state
+
+
+async def test_revalidation_within_max_age_skips_route(anyio_backend, api):
+    async with api["client"] as client:
+        first = await client.get("/api/weather/hourly")
+        etag = first.headers["etag"]
+        again = await client.get("/api/weather/hourly", headers={"If-None-Match": etag})
+        other_user = await client.get(
+            "/api/weather/hourly", headers={"If-None-Match": etag, "Authorization": "Bearer other"}
+        )
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=60, stale-while-revalidate=30"
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    # a different credential runs the route (and its auth), then matches the body
+    assert other_user.status_code == 304
+    assert api["calls"] == 2
+
+
+async def test_skipped_weather_route_still_marks_location_requested(anyio_backend, api, monkeypatch):
+    requested = []
+    monkeypatch.setattr(weather_cache, "mark_requested", requested.append)
+    async with api["client"] as client:
+        first = await client.get("/api/weather/hourly", params={"group_id": "store-1"})
+        again = await client.get(
+            "/api/weather/hourly", params={"group_id": "store-1"}, headers={"If-None-Match": first.headers["etag"]}
+        )
+
+    assert again.status_code == 304 and api["calls"] == 1
+    # the test route does not mark, so this one comes from the 304
+    assert requested == ["store-1"]
+
+
+async def test_no_cache_route_revalidates_against_body(anyio_backend, api):
+    async with api["client"] as client:
+        first = await client.get("/api/notifications")
+        etag = first.headers["etag"]
+        unchanged = await client.get("/api/notifications", headers={"If-None-Match": etag.removeprefix("W/")})
+        api["items"].append("b")
+        changed = await client.get("/api/notifications", headers={"If-None-Match": etag})
+
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert first.headers["vary"] == "Authorization"
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["data"] == ["a", "b"]
+    assert api["calls"] == 3
+
+
+async def test_streams_and_errors_pass_through(anyio_backend, api):
+    async with api["client"] as client:
+        stream = await client.get("/api/notifications/stream")
+        missing = await client.get("/api/weather/missing")
+
+    assert stream.text == "data: 1\n\n" and "etag" not in stream.headers
+    assert missing.status_code == 404 and "etag" not in missing.headers
+
+
+def test_envelope_etag_ignores_timestamp():
+    first = AppBaseResponse({"temp_c": 24.5}).to_json()
+    second = AppBaseResponse({"temp_c": 24.5})
+    second.timestamp = "0"
+
+    assert first.headers["etag"].startswith('W/"')
+    assert second.to_json().headers["etag"] == first.headers["etag"]
+    assert AppBaseResponse({"temp_c": 25}).to_json().headers["etag"] != first.headers["etag"]
+    assert second.to_json().body.endswith(b',"timestamp":"0"}')
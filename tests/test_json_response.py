@@ -0,0 +1,51 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi.encoders import jsonable_encoder
+from app.models.notification_model import NotificationRes
+from app.models.weather_model import HourlyWeather, WeatherHourlyResponse
+from app.schemas.base import AppBasePagingRes, AppBaseResponse, AppBaseResponseError, dumps
+
+
+def test_matches_jsonable_encoder():
+    notification = NotificationRes(
+        _id=uuid.uuid4().bytes,
+        title="Zone overcrowded",
+        status="warning",
+        type="product_zone_overcrowded",
+        created_at=datetime(2025, 12, 22, 14, 30, 5, 123456),
+        is_read=False,
+    )
+    weather = WeatherHourlyResponse(
+        group_id="store-123",
+        forecast_date="2025-12-22",
+        hourly=[HourlyWeather(time="2025-12-22 14:00", weather_type="cloudy", temp_c=24.5)],
+    )
+    for data in (AppBasePagingRes(items=[notification], total=1).to_dict(), weather, {"id": uuid.uuid4()}):
+        response = AppBaseResponse(data)
+        assert json.loads(response.to_json().body) == jsonable_encoder(response.to_dict())
+
+
+def test_models_serialize_by_alias():
+    notification = NotificationRes(
+        _id="n1", status="info", type="info", created_at=datetime(2025, 1, 1), is_read=True
+    )
+    body = json.loads(AppBaseResponse(notification).to_json().body)
+
+    assert body["data"]["_id"] == "n1"
+    assert body["data"]["created_at"] == "2025-01-01T00:00:00"
+
+
+def test_aware_datetime_format():
+    # pinned: UTC is written as "Z" (jsonable_encoder wrote "+00:00"); both are ISO 8601
+    assert dumps({"at": datetime(2025, 1, 1, tzinfo=timezone.utc)}) == b'{"at":"2025-01-01T00:00:00Z"}'
+    ict = timezone(timedelta(hours=7))
+    assert dumps({"at": datetime(2025, 1, 1, 7, tzinfo=ict)}) == b'{"at":"2025-01-01T07:00:00+07:00"}'
+
+
+def test_error_keeps_status_code():
+    response = AppBaseResponseError("Invalid cursor", 400).to_json(400)
+
+    assert response.status_code == 400
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body)["message"] == "Invalid cursor"
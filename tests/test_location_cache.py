@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from pymongo.errors import OperationFailure
+from app.repositories import location_repo
+from tests.fake_mongo import FakeCollection
+
+STORE = {"_id": "store-1", "address": "Quận 3", "lat": 10.77, "long": 106.69}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeCollection([STORE])
+    monkeypatch.setattr(location_repo, "location_collection", fake)
+    monkeypatch.setattr(location_repo, "_location_cache", {})
+    return fake
+
+
+async def test_preloaded_locations_skip_the_database(anyio_backend, collection):
+    await location_repo.preload_locations()
+    collection.queries.clear()
+
+    location = await location_repo.get_by_group_id("store-1")
+    locations = await location_repo.get_by_group_ids(["store-1"])
+
+    assert location.lat == 10.77
+    assert list(locations) == ["store-1"]
+    assert collection.queries == []
+
+
+async def test_read_through_and_create(anyio_backend, collection):
+    assert (await location_repo.get_by_group_id("store-1")).group_id == "store-1"
+    assert await location_repo.get_by_group_id("store-2") is None
+
+    await location_repo.create_location("store-2", "Quận 1", 10.78, 106.70)
+    collection.queries.clear()
+
+    assert (await location_repo.get_by_group_id("store-2")).long == 106.70
+    assert collection.queries == []
+
+
+async def test_change_stream_updates_and_invalidates(anyio_backend, collection):
+    await location_repo.start_location_cache()
+    try:
+        moved = {**STORE, "lat": 10.80}
+        await collection.changes.put(
+            {"operationType": "update", "documentKey": {"_id": "store-1"}, "fullDocument": moved}
+        )
+        await collection.changes.put({"operationType": "delete", "documentKey": {"_id": "gone"}})
+        location_repo._location_cache["gone"] = location_repo._location_cache["store-1"]
+        await asyncio.sleep(0.01)
+
+        assert location_repo._location_cache["store-1"].lat == 10.80
+        assert "gone" not in location_repo._location_cache
+    finally:
+        await location_repo.stop_location_cache()
+
+
+async def test_periodic_resync_without_replica_set(anyio_backend, collection, monkeypatch):
+    collection.replica_set = False
+    monkeypatch.setattr(location_repo.config, "LOCATION_RESYNC_INTERVAL", 0.01)
+    await location_repo.start_location_cache()
+    try:
+        collection.docs["store-3"] = {"_id": "store-3", "address": "Quận 5", "lat": 10.75, "long": 106.66}
+        await asyncio.sleep(0.05)
+
+        assert "store-3" in location_repo._location_cache
+    finally:
+        await location_repo.stop_location_cache()
+
+
+async def test_other_stream_errors_retry_the_watch(anyio_backend, collection, monkeypatch):
+    monkeypatch.setattr(location_repo.config, "LOCATION_RESYNC_INTERVAL", 0.01)
+    watch, calls = collection.watch, []
+
+    def flaky_watch(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationFailure("not authorized", code=13)
+        return watch(*args, **kwargs)
+
+    monkeypatch.setattr(collection, "watch", flaky_watch)
+    await location_repo.start_location_cache()
+    try:
+        await asyncio.sleep(0.05)
+        await collection.changes.put(
+            {"operationType": "update", "documentKey": {"_id": "store-1"}, "fullDocument": {**STORE, "lat": 10.80}}
+        )
+        await asyncio.sleep(0.01)
+
+        # back on the change stream rather than stuck polling
+        assert len(calls) == 2
+        assert location_repo._location_cache["store-1"].lat == 10.80
+    finally:
+        await location_repo.stop_location_cache()
@@ -0,0 +1,195 @@
+import asyncio
+import unicodedata
+import httpx
+import pytest
+from app.clients import http_client
+from app.repositories import geocode_repo, location_repo
+from app.services import location_service
+from app.utils.utils import iter_lines, normalize_address
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def body_lines(body: bytes):
+    """The body as the route reads it: small chunks split into lines"""
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    return iter_lines(chunks())
+
+
+async def parse(body: bytes, content_type: str) -> list:
+    return [row async for row in location_service.parse_location_rows(body_lines(body), content_type)]
+
+
+@pytest.fixture
+def geocoder(monkeypatch):
+    """Answer Google Geocoding calls from a dict of address -> payload"""
+    payloads = {}
+    calls = []
+
+    def handler(request: httpx.Request):
+        address = request.url.params["address"]
+        calls.append(address)
+        return httpx.Response(200, json=payloads[address])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_client._clients, http_client.GOOGLE_MAPS, client)
+    monkeypatch.setattr(geocode_repo, "geocode_collection", FakeCollection())
+    location_service._geocode_cache.clear()
+    return payloads, calls
+
+
+async def test_geocode_address(anyio_backend, geocoder):
+    payloads, _ = geocoder
+    payloads["485B Nguyễn Đình Chiểu, Quận 3"] = {
+        "status": "OK",
+        "results": [{"geometry": {"location": {"lat": 10.77, "lng": 106.69}}}],
+    }
+
+    assert await location_service.geocode_address("485B Nguyễn Đình Chiểu, Quận 3") == (10.77, 106.69)
+
+
+async def test_geocode_address_without_results(anyio_backend, geocoder):
+    payloads, _ = geocoder
+    payloads["nowhere"] = {"status": "ZERO_RESULTS", "results": []}
+
+    with pytest.raises(Exception, match="No geocoding results"):
+        await location_service.geocode_address("nowhere")
+
+
+def test_normalize_address():
+    expected = "485b nguyễn đình chiểu, phường 2, quận 3, thành phố hồ chí minh"
+
+    assert normalize_address("485B Nguyễn Đình Chiểu, P.2, Q.3, TP.HCM") == expected
+    assert normalize_address("485B  Nguyễn Đình Chiểu ,Phường 02, Quận 3 , Thành phố Hồ Chí Minh") == expected
+    # decomposed (NFD) diacritics, as some spreadsheet exports produce
+    assert normalize_address(unicodedata.normalize("NFD", expected)) == expected
+
+
+async def test_repeat_geocode_uses_cache(anyio_backend, geocoder):
+    payloads, calls = geocoder
+    payloads["485B Nguyễn Đình Chiểu, Q.3"] = {
+        "status": "OK",
+        "results": [{"geometry": {"location": {"lat": 10.77, "lng": 106.69}}}],
+    }
+
+    await location_service.geocode_address("485B Nguyễn Đình Chiểu, Q.3")
+    assert await location_service.geocode_address("485b nguyễn đình chiểu, quận 3") == (10.77, 106.69)
+
+    # a fresh process still finds it in the geocode collection
+    location_service._geocode_cache.clear()
+    assert await location_service.geocode_address("485B Nguyễn Đình Chiểu,  Quận 3") == (10.77, 106.69)
+    assert len(calls) == 1
+
+
+async def test_import_locations(anyio_backend, geocoder, monkeypatch):
+    payloads, calls = geocoder
+    payloads["1 Lê Lợi, Q.1"] = {
+        "status": "OK",
+        "results": [{"geometry": {"location": {"lat": 10.77, "lng": 106.70}}}],
+    }
+    payloads["nowhere"] = {"status": "ZERO_RESULTS", "results": []}
+    locations = FakeCollection()
+    monkeypatch.setattr(location_repo, "location_collection", locations)
+    monkeypatch.setattr(location_repo, "_location_cache", {})
+
+    body = (
+        "group_id,address\n"
+        "store-1,\"1 Lê Lợi, Q.1\"\n"
+        "store-2,nowhere\n"
+        "store-3,\"1 Lê Lợi, Quận 1\"\n"
+    ).encode()
+    rows = location_service.parse_location_rows(body_lines(body), "text/csv")
+    results = {r["group_id"]: r async for r in location_service.import_locations(rows)}
+
+    assert results["store-1"]["success"] and results["store-3"]["success"]
+    # the same shape as POST /locations
+    assert results["store-1"]["data"] == {"_id": "store-1", "address": "1 Lê Lợi, Q.1", "lat": 10.77, "long": 106.70}
+    assert results["store-2"]["line"] == 3
+    assert "No geocoding results" in results["store-2"]["message"]
+    assert locations.docs["store-3"]["lat"] == 10.77
+    assert "store-2" not in locations.docs
+    # the two spellings of the same address share one Google call
+    assert len(calls) == 2
+
+
+async def test_parse_ndjson_rows(anyio_backend):
+    body = b'{"group_id": "a", "address": "x"}\n\nnot json\n'
+    rows = await parse(body, "application/x-ndjson")
+
+    assert rows[0] == (1, {"group_id": "a", "address": "x"})
+    assert rows[1][0] == 3 and rows[1][1].message.startswith("Invalid JSON")
+
+
+async def test_parse_rows_reports_bad_lines(anyio_backend):
+    body = b'[1, 2]\n3\n"hello"\n{"group_id": "\xff"}\n{"group_id": "b", "address": "y"}\n'
+    rows = await parse(body, "application/x-ndjson")
+
+    assert [line for line, _ in rows] == [1, 2, 3, 4, 5]
+    assert all(row == location_service.RowError("Invalid row: expected a JSON object") for _, row in rows[:3])
+    assert rows[3][1].message.startswith("Invalid UTF-8")
+    assert rows[4] == (5, {"group_id": "b", "address": "y"})
+
+    body = b"\xef\xbb\xbfgroup_id,address\nstore-1,\xff\nstore-2,x\n"
+    rows = await parse(body, "text/csv")
+
+    assert rows[0][0] == 2 and rows[0][1].message.startswith("Invalid UTF-8")
+    assert rows[1] == (3, {"group_id": "store-2", "address": "x"})
+
+
+async def test_import_reports_row_errors(anyio_backend, geocoder):
+    rows = location_service.parse_location_rows(body_lines(b'"hello"\n[1]\n'), "application/x-ndjson")
+    results = [r async for r in location_service.import_locations(rows)]
+
+    assert sorted(r["line"] for r in results) == [1, 2]
+    assert all(not r["success"] and r["group_id"] is None for r in results)
+    assert {r["message"] for r in results} == {"Invalid row: expected a JSON object"}
+
+
+async def test_parse_csv_multiline_field(anyio_backend):
+    body = b'group_id,address\r\nstore-1,"1 L\xc3\xaa L\xe1\xbb\xa3i,\r\nQ.1"\r\nstore-2,x\r\n'
+    rows = await parse(body, "text/csv")
+
+    assert rows == [
+        (3, {"group_id": "store-1", "address": "1 Lê Lợi,\r\nQ.1"}),
+        (4, {"group_id": "store-2", "address": "x"}),
+    ]
+
+
+async def test_import_bounds_in_flight_rows(anyio_backend, monkeypatch):
+    monkeypatch.setattr(location_service.config, "GEOCODE_CONCURRENCY", 2)
+    monkeypatch.setattr(location_service.config, "LOCATION_IMPORT_BATCH_SIZE", 1)
+    monkeypatch.setattr(location_repo, "location_collection", FakeCollection())
+    monkeypatch.setattr(location_repo, "_location_cache", {})
+    in_flight, peak, read = 0, 0, 0
+
+    async def geocode_address(address):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return 10.0, 106.0
+
+    async def rows():
+        nonlocal read
+        for line in range(1, 51):
+            read += 1
+            yield line, {"group_id": f"store-{line}", "address": "x"}
+
+    monkeypatch.setattr(location_service, "geocode_address", geocode_address)
+    results = location_service.import_locations(rows())
+    first = await results.__anext__()
+    # rows queued for, held by and waiting on two workers, not the whole body
+    assert read <= 8
+    rest = [r async for r in results]
+
+    assert peak == 2
+    assert len(rest) + 1 == 50 and first["success"]
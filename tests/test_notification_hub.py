@@ -0,0 +1,129 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from bson import Binary, UUID_SUBTYPE
+from app.configs import config
+from app.repositories import notification_repo
+from app.services import notification_hub, notification_service
+from app.services.notification_hub import NotificationHub
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def notification(**fields) -> dict:
+    return {
+        "_id": Binary(uuid.uuid4().bytes, UUID_SUBTYPE),
+        "title": "Smoke detected",
+        "status": "critical",
+        "type": "smoke_fire_etected",
+        "has_for_all": False,
+        "tenant_id": "t1",
+        "user_id": None,
+        "created_at": datetime.now(),
+        **fields,
+    }
+
+
+def test_routes_by_tenant_user_and_for_all():
+    hub = NotificationHub()
+    alice = hub.subscribe("t1", "alice")
+    bob = hub.subscribe("t1", "bob")
+    carol = hub.subscribe("t2", "carol")
+
+    hub.publish(notification(user_id="alice"))
+    hub.publish(notification())
+    hub.publish(notification(tenant_id="t2", has_for_all=True))
+
+    assert [alice.queue.qsize(), bob.queue.qsize(), carol.queue.qsize()] == [3, 2, 1]
+
+    hub.unsubscribe(alice)
+    hub.unsubscribe(bob)
+    hub.unsubscribe(carol)
+    assert not hub.has_subscribers()
+
+
+def test_listeners_count_only_while_active():
+    hub = NotificationHub()
+    received = []
+    counting = {"active": False}
+    hub.add_listener(received.append, lambda: counting["active"])
+
+    # an idle listener does not keep the hub polling
+    assert not hub.has_subscribers()
+    counting["active"] = True
+    assert hub.has_subscribers()
+
+    hub.publish(notification())
+    assert len(received) == 1
+
+
+def test_slow_subscriber_drops_oldest(monkeypatch):
+    monkeypatch.setattr(config, "NOTIFICATION_SUBSCRIBER_QUEUE_SIZE", 2)
+    hub = NotificationHub()
+    subscriber = hub.subscribe("t1", "alice")
+
+    for title in ["a", "b", "c"]:
+        hub.publish(notification(title=title))
+
+    assert [subscriber.queue.get_nowait()["title"] for _ in range(2)] == ["b", "c"]
+    assert hub.stats()["dropped"] == 1
+
+
+@pytest.mark.parametrize("replica_set", [True, False])
+async def test_stream_from_change_stream_or_polling(anyio_backend, monkeypatch, replica_set):
+    collection = FakeCollection(replica_set=replica_set)
+    monkeypatch.setattr(notification_repo, "notification_collection", collection)
+    monkeypatch.setattr(notification_hub, "hub", NotificationHub())
+    monkeypatch.setattr(notification_service, "hub", notification_hub.hub)
+    monkeypatch.setattr(config, "NOTIFICATION_POLL_INTERVAL", 0.01)
+
+    await notification_hub.start_notification_hub()
+    stream = notification_service.stream_notifications("t1", "alice", heartbeat=0.05)
+    try:
+        assert await anext(stream) is None  # heartbeat while nothing happens
+
+        doc = notification(user_id="alice")
+        if replica_set:
+            await collection.changes.put({"_id": {"token": 1}, "operationType": "insert", "fullDocument": doc})
+        else:
+            await collection.insert_one(doc)
+        await collection.insert_one(notification(user_id="bob"))
+
+        item = await asyncio.wait_for(anext(stream), timeout=1)
+        assert item["id"] == str(uuid.UUID(bytes=doc["_id"]))
+        assert item["title"] == "Smoke detected" and not item["is_read"]
+        # bob's notification never reaches alice
+        assert await anext(stream) is None
+    finally:
+        await stream.aclose()
+        await notification_hub.stop_notification_hub()
+    assert not notification_hub.hub.has_subscribers()
+
+
+async def test_polling_catches_late_inserts_once(anyio_backend, monkeypatch):
+    collection = FakeCollection(replica_set=False)
+    monkeypatch.setattr(notification_repo, "notification_collection", collection)
+    monkeypatch.setattr(notification_hub, "hub", NotificationHub())
+    monkeypatch.setattr(config, "NOTIFICATION_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(config, "NOTIFICATION_POLL_LOOKBACK", 5)
+
+    await notification_hub.start_notification_hub()
+    subscriber = notification_hub.hub.subscribe("t1", "alice")
+    try:
+        await collection.insert_one(notification(user_id="alice"))
+        await asyncio.sleep(0.05)
+        # created before the one already seen, written after it (e.g. queued by ingest)
+        late = notification(user_id="alice", created_at=datetime.now() - timedelta(seconds=2))
+        await collection.insert_one(late)
+        await asyncio.sleep(0.05)
+    finally:
+        notification_hub.hub.unsubscribe(subscriber)
+        await notification_hub.stop_notification_hub()
+
+    published = [subscriber.queue.get_nowait()["_id"] for _ in range(subscriber.queue.qsize())]
+    assert len(published) == 2 and published[1] == late["_id"]
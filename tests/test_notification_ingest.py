@@ -0,0 +1,148 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from app.repositories import notification_repo
+from app.routes import notification_router
+from app.services import notification_ingest
+from app.services.notification_ingest import DedupIndex, NotificationBuffer
+from tests.fake_mongo import FakeCollection
+from tests.test_auth import make_token
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeCollection()
+    monkeypatch.setattr(notification_repo, "notification_collection", fake)
+    return fake
+
+
+def event(**fields) -> bytes:
+    return json.dumps(
+        {
+            "type": "long_queue_detected",
+            "status": "warning",
+            "title": "Hàng đợi dài",
+            "tenant_id": "t1",
+            "data": {"cam_id": "cam-1", "zone_id": "zone-1", "people_count": 12},
+            **fields,
+        }
+    ).encode()
+
+
+async def lines(*items: bytes):
+    for item in items:
+        yield item
+
+
+async def test_ingest_validates_and_writes_in_batches(anyio_backend, collection, monkeypatch):
+    buffer = NotificationBuffer(maxsize=100, batch_size=3, flush_interval=0.05)
+    monkeypatch.setattr(notification_ingest, "buffer", buffer)
+    buffer.start()
+    try:
+        res = await notification_ingest.ingest(
+            lines(*[event() for _ in range(4)], b"", b"{not json", event(type="nope"), event(data={}))
+        )
+        await asyncio.sleep(0.1)
+    finally:
+        await buffer.stop()
+
+    assert res["accepted"] == 4
+    assert [r["line"] for r in res["rejected"]] == [6, 7, 8]
+    assert res["rejected"][2]["message"].startswith("data.cam_id")
+    # one full batch of 3, then the rest after flush_interval
+    assert [q for op, q in collection.queries if op == "insert_many"] == [{"count": 3}, {"count": 1}]
+    doc = next(iter(collection.docs.values()))
+    assert doc["has_for_all"] is False and doc["type"] == "long_queue_detected"
+    assert "đợi" in doc["title_tokens"] and doc["data"] == {"cam_id": "cam-1", "zone_id": "zone-1", "people_count": 12}
+
+
+async def test_full_buffer_applies_backpressure(anyio_backend, collection, monkeypatch):
+    buffer = NotificationBuffer(maxsize=2, batch_size=10, flush_interval=0.05)
+    monkeypatch.setattr(notification_ingest, "buffer", buffer)
+
+    task = asyncio.ensure_future(notification_ingest.ingest(lines(*[event() for _ in range(5)])))
+    await asyncio.sleep(0.05)
+    # nothing drains the buffer yet, so the request is held
+    assert not task.done() and buffer.queue.full()
+
+    buffer.start()
+    assert (await asyncio.wait_for(task, timeout=1))["accepted"] == 5
+    await buffer.stop()
+    assert len(collection.docs) == 5
+
+
+async def test_repeated_alerts_are_coalesced(anyio_backend, collection, monkeypatch):
+    buffer = NotificationBuffer(
+        maxsize=100, batch_size=100, flush_interval=0.02, dedup=DedupIndex(window=0.2, maxsize=10)
+    )
+    monkeypatch.setattr(notification_ingest, "buffer", buffer)
+    other_zone = event(data={"cam_id": "cam-1", "zone_id": "zone-2"})
+
+    # queued repeats are folded in memory
+    await notification_ingest.ingest(lines(event(), event(), other_zone, event()))
+    buffer.start()
+    await asyncio.sleep(0.05)
+    # the first one is written by now: repeats become updates
+    await notification_ingest.ingest(lines(event(), event()))
+    await asyncio.sleep(0.05)
+    # past the window a new notification starts
+    await asyncio.sleep(0.2)
+    await notification_ingest.ingest(lines(event()))
+    await buffer.stop()
+
+    counts = sorted((doc["data"]["zone_id"], doc["repeat_count"]) for doc in collection.docs.values())
+    assert counts == [("zone-1", 0), ("zone-1", 4), ("zone-2", 0)]
+    assert buffer.stats()["coalesced"] == 4
+
+
+async def test_ingest_requires_service_role(anyio_backend, collection, monkeypatch):
+    buffer = NotificationBuffer(maxsize=100, batch_size=10, flush_interval=0.01)
+    monkeypatch.setattr(notification_ingest, "buffer", buffer)
+    app = FastAPI()
+    app.include_router(notification_router.router)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        async def post(token: str | None):
+            headers = {"Authorization": token} if token else {}
+            return await client.post("/notifications/ingest", content=event(), headers=headers)
+
+        assert (await post(None)).status_code == 401
+        assert (await post(make_token(role="admin"))).status_code == 401
+        response = await post(make_token(role="service"))
+
+    assert response.status_code == 200 and response.json()["data"]["accepted"] == 1
+
+
+async def test_failed_flush_is_retried_then_dropped(anyio_backend, collection, monkeypatch):
+    insert_many = notification_repo.insert_many
+    failures = {"left": 2}
+
+    async def flaky_insert_many(docs):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise ConnectionError("mongod unreachable")
+        return await insert_many(docs)
+
+    monkeypatch.setattr(notification_repo, "insert_many", flaky_insert_many)
+    buffer = NotificationBuffer(maxsize=100, batch_size=10, flush_interval=0.01, retries=2, retry_delay=0)
+    monkeypatch.setattr(notification_ingest, "buffer", buffer)
+    buffer.start()
+    await notification_ingest.ingest(lines(event(), event()))
+    # stop lets the writer finish the retries instead of cancelling it
+    await buffer.stop()
+
+    assert len(collection.docs) == 2 and buffer.stats()["dropped"] == 0
+
+    failures["left"] = 3
+    buffer.start()
+    await notification_ingest.ingest(lines(event()))
+    await buffer.stop()
+
+    assert len(collection.docs) == 2 and buffer.stats()["dropped"] == 1
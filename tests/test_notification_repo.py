@@ -0,0 +1,226 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from bson import Binary, UUID_SUBTYPE
+from app.repositories import notification_repo, notification_state_repo
+from app.schemas.base import BasePagingReq
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def make_notification(created_at: datetime, **fields) -> dict:
+    return {
+        "_id": Binary(uuid.uuid4().bytes, UUID_SUBTYPE),
+        "title": "Checkout delay",
+        "description": None,
+        "data": {"cam_id": "cam-1", "zone_id": "zone-1"},
+        "status": "warning",
+        "type": "checkout_delay",
+        "users_read": [],
+        "users_delete": [],
+        "has_for_all": True,
+        "tenant_id": None,
+        "user_id": None,
+        "store_ids": [],
+        "created_at": created_at,
+        "updated_at": created_at,
+        **fields,
+    }
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    start = datetime(2025, 1, 1)
+    # pairs share a created_at so paging has to break ties on _id
+    docs = [
+        notification_repo.with_search_tokens(make_notification(start + timedelta(minutes=i // 2)))
+        for i in range(7)
+    ]
+    docs.append(make_notification(start, has_for_all=False, tenant_id="other", user_id="other"))
+    collection = FakeCollection(docs)
+    monkeypatch.setattr(notification_repo, "notification_collection", collection)
+    monkeypatch.setattr(notification_state_repo, "notification_collection", collection)
+    monkeypatch.setattr(notification_state_repo, "notification_user_state_collection", FakeCollection())
+    notification_repo._total_cache.clear()
+    return collection
+
+
+async def test_cursor_pages_cover_every_notification_once(anyio_backend, notifications):
+    seen = []
+    page = await notification_repo.get_by_filter(BasePagingReq(page_size=3), "u1", "u1")
+    seen += page["items"]
+    while page["next_cursor"]:
+        page = await notification_repo.get_by_filter(
+            BasePagingReq(page_size=3, cursor=page["next_cursor"]), "u1", "u1"
+        )
+        seen += page["items"]
+
+    assert len(seen) == 7
+    assert len({item["id"] for item in seen}) == 7
+    keys = [(item["created_at"], item["id"]) for item in seen]
+    assert page["is_full"] and page["total"] == 7
+    assert [k[0] for k in keys] == sorted((k[0] for k in keys), reverse=True)
+
+
+async def test_page_mode_still_works(anyio_backend, notifications):
+    page = await notification_repo.get_by_filter(BasePagingReq(page=3, page_size=3), "u1", "u1")
+
+    assert page["page"] == 3
+    assert len(page["items"]) == 1
+    assert page["is_full"] and page["next_cursor"] is None
+
+
+async def test_invalid_cursor(anyio_backend, notifications):
+    with pytest.raises(Exception, match="Invalid cursor"):
+        await notification_repo.get_by_filter(BasePagingReq(cursor="not-a-cursor"), "u1", "u1")
+
+
+async def test_total_alongside_page_then_cached(anyio_backend, notifications):
+    first = await notification_repo.get_by_filter(BasePagingReq(page_size=3), "u1", "u1")
+    second = await notification_repo.get_by_filter(
+        BasePagingReq(page_size=3, cursor=first["next_cursor"]), "u1", "u1"
+    )
+
+    assert first["total"] == second["total"] == 7
+    # the page and the count are sent together, then only the page
+    assert [op for op, _ in notifications.queries] == ["aggregate", "count_documents", "aggregate"]
+    assert "$facet" not in str(notifications.queries)
+
+
+async def test_without_total(anyio_backend, notifications):
+    page = await notification_repo.get_by_filter(
+        BasePagingReq(page_size=5, include_total=False), "u1", "u1"
+    )
+
+    assert page["total"] is None
+    assert len(page["items"]) == 5 and not page["is_full"]
+    assert [op for op, _ in notifications.queries] == ["aggregate"]
+
+
+async def test_keyword_matches_word_prefixes(anyio_backend, notifications):
+    notifications.docs.clear()
+    for title in ["Hàng đợi dài tại quầy 3", "Khói tại kho", "Checkout delay (.*)"]:
+        doc = notification_repo.with_search_tokens(make_notification(datetime(2025, 1, 1), title=title))
+        notifications.docs[doc["_id"]] = doc
+
+    async def titles(keyword):
+        page = await notification_repo.get_by_filter(BasePagingReq(keyword=keyword), "u1", "u1")
+        return sorted(item["title"] for item in page["items"])
+
+    assert await titles("hàng đ") == ["Hàng đợi dài tại quầy 3"]
+    assert await titles("hang doi") == ["Hàng đợi dài tại quầy 3"]
+    assert await titles("TẠI") == ["Hàng đợi dài tại quầy 3", "Khói tại kho"]
+    # regex syntax is just text now
+    assert await titles(".*") == await titles("")
+    assert await titles("delay (") == ["Checkout delay (.*)"]
+
+
+async def test_keyword_finds_titles_without_tokens(anyio_backend, notifications):
+    notifications.docs.clear()
+    # written by another producer, without with_search_tokens
+    for title in ["Hàng đợi dài tại quầy 3", "Khói tại kho"]:
+        doc = make_notification(datetime(2025, 1, 1), title=title)
+        notifications.docs[doc["_id"]] = doc
+
+    async def titles(keyword):
+        page = await notification_repo.get_by_filter(BasePagingReq(keyword=keyword), "u1", "u1")
+        return sorted(item["title"] for item in page["items"])
+
+    assert await titles("hàng đ") == ["Hàng đợi dài tại quầy 3"]
+    assert await titles("TẠI") == ["Hàng đợi dài tại quầy 3", "Khói tại kho"]
+    assert await titles("ại") == []
+    # the regex fallback does not fold diacritics; the backfill adds the tokens that do
+    assert await titles("hang") == []
+
+    assert await notification_repo.backfill_title_tokens() == 2
+    assert await titles("hang") == ["Hàng đợi dài tại quầy 3"]
+    assert await notification_repo.backfill_title_tokens() == 0
+
+
+async def test_is_read_computed_by_projection(anyio_backend, notifications):
+    read = next(iter(notifications.docs.values()))
+    read["users_read"] = ["u1"]
+    read_id = str(uuid.UUID(bytes=read["_id"]))
+
+    # first page is fetched alongside the total, the next one alone
+    for _ in range(2):
+        page = await notification_repo.get_by_filter(BasePagingReq(page_size=10), "u1", "u1")
+        assert [item["id"] for item in page["items"] if item["is_read"]] == [read_id]
+
+
+async def list_page(**params) -> dict:
+    return await notification_repo.get_by_filter(BasePagingReq(page_size=20, **params), "u1", "u1")
+
+
+async def test_mark_read_and_delete(anyio_backend, notifications):
+    first, second, third = [item["id"] for item in (await list_page())["items"][:3]]
+
+    await notification_state_repo.mark_read("u1", [notification_repo.to_bson_id(first)])
+    await notification_state_repo.mark_deleted("u1", [notification_repo.to_bson_id(second)])
+    # another user's state changes nothing for u1
+    await notification_state_repo.mark_deleted("u2", [notification_repo.to_bson_id(third)])
+
+    items = {item["id"]: item for item in (await list_page(include_total=False))["items"]}
+    assert items[first]["is_read"] and not items[third]["is_read"]
+    assert second not in items and len(items) == 6
+
+
+async def test_deleted_excluded_without_listing_their_ids(anyio_backend, notifications):
+    deleted = [notification_repo.to_bson_id(item["id"]) for item in (await list_page())["items"][:2]]
+    # ids the user cannot see, or that do not exist, change nothing
+    other = next(doc["_id"] for doc in notifications.docs.values() if doc["user_id"] == "other")
+    await notification_state_repo.mark_deleted("u1", [*deleted, other, Binary(bytes(16), UUID_SUBTYPE)])
+    notification_repo.invalidate_totals("u1")
+    notifications.queries.clear()
+
+    page = await list_page()
+    assert page["total"] == 5 and len(page["items"]) == 5
+    assert not {item["id"] for item in page["items"]} & {str(uuid.UUID(bytes=i)) for i in deleted}
+    assert "$nin" not in str(notifications.queries)
+
+
+async def test_page_is_one_aggregation_with_read_state(anyio_backend, notifications):
+    states = notification_state_repo.notification_user_state_collection
+    newest = max(notifications.docs.values(), key=lambda doc: (doc["created_at"], doc["_id"]))
+    await notification_state_repo.mark_read("u1", [newest["_id"]])
+    await notification_state_repo.mark_all_read("u1", datetime(2025, 1, 1))
+    notification_repo._total_cache.set(("u1", "u1", None), 7)
+    states.queries.clear()
+
+    page = await list_page()
+
+    assert [op for op, _ in notifications.queries] == ["aggregate"]
+    # read state is joined on the server, not fetched afterwards
+    assert states.queries == []
+    is_read = {item["id"]: item["is_read"] for item in page["items"]}
+    assert is_read[str(uuid.UUID(bytes=newest["_id"]))]
+    # the two notifications created at the watermark are read by it, the rest are not
+    assert sum(is_read.values()) == 3
+
+
+async def test_mark_all_read(anyio_backend, notifications):
+    newest = max(doc["created_at"] for doc in notifications.docs.values())
+    await notification_state_repo.mark_all_read("u1", newest - timedelta(minutes=1))
+    # an older watermark never moves it back
+    await notification_state_repo.mark_all_read("u1", newest - timedelta(minutes=2))
+
+    items = (await list_page())["items"]
+    assert [item["is_read"] for item in items] == [False] + [True] * 6
+
+
+async def test_migrate_from_arrays(anyio_backend, notifications):
+    read, deleted = list(notifications.docs.values())[:2]
+    read["users_read"] = ["u1", "u2"]
+    deleted["users_delete"] = ["u1"]
+
+    assert await notification_state_repo.migrate_from_arrays() == 2
+    assert await notification_state_repo.migrate_from_arrays() == 0
+    assert "users_read" not in notifications.docs[read["_id"]]
+
+    items = {item["id"]: item for item in (await list_page())["items"]}
+    assert items[str(uuid.UUID(bytes=read["_id"]))]["is_read"]
+    assert str(uuid.UUID(bytes=deleted["_id"])) not in items
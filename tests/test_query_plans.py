@@ -0,0 +1,238 @@
+"""
+Query-plan checks: run the repositories' queries through explain() against a real
+mongod with the declared INDEXES and fail on any COLLSCAN in the winning plan.
+Notification queries are captured from the repository functions themselves, so
+the pipelines explained are exactly the ones sent.
+
+Needs a reachable mongod (TEST_MONGO_URI, default mongodb://localhost:27017);
+skipped otherwise, unless REQUIRE_MONGO=1 (as in CI), where a missing mongod fails.
+mongomock has no query planner, so it cannot stand in here.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from bson import Binary, UUID_SUBTYPE
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from app.configs import config
+from app.repositories import location_repo, notification_repo, notification_state_repo
+from app.schemas.base import BasePagingReq
+from tests.fake_mongo import FakeCollection
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+REQUIRE_MONGO = os.getenv("REQUIRE_MONGO", "") == "1"
+
+
+@pytest.fixture(scope="module")
+def mongo_db():
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        if REQUIRE_MONGO:
+            pytest.fail(f"no mongod at {TEST_MONGO_URI} and REQUIRE_MONGO=1")
+        pytest.skip(f"no mongod at {TEST_MONGO_URI}")
+    name = f"test_query_plans_{uuid.uuid4().hex[:8]}"
+    yield client[name]
+    client.drop_database(name)
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def notifications(mongo_db):
+    collection = mongo_db["notification"]
+    collection.create_indexes(notification_repo.INDEXES)
+    start = datetime(2025, 1, 1)
+    collection.insert_many(
+        [
+            notification_repo.with_search_tokens({
+                "_id": Binary(uuid.uuid4().bytes, UUID_SUBTYPE),
+                "title": f"Checkout delay {i}",
+                "status": "warning",
+                "type": "checkout_delay",
+                "has_for_all": i % 3 == 0,
+                "tenant_id": f"tenant-{i % 5}",
+                "user_id": None if i % 2 else f"user-{i % 7}",
+                "users_read": [],
+                "users_delete": [],
+                "created_at": start + timedelta(seconds=i),
+            })
+            for i in range(500)
+        ]
+    )
+    return collection
+
+
+@pytest.fixture(scope="module")
+def locations(mongo_db):
+    collection = mongo_db["location"]
+    if location_repo.INDEXES:
+        collection.create_indexes(location_repo.INDEXES)
+    collection.insert_many(
+        [{"_id": f"store-{i}", "address": "x", "lat": 10.0, "long": 106.0} for i in range(100)]
+    )
+    return collection
+
+
+def collscans(explain: dict) -> list[dict]:
+    """COLLSCAN stages anywhere in an explain() result, rejected plans excluded"""
+    found = []
+    if isinstance(explain, dict):
+        if explain.get("stage") == "COLLSCAN":
+            found.append(explain)
+        for key, value in explain.items():
+            if key != "rejectedPlans":
+                found += collscans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            found += collscans(value)
+    return found
+
+
+def in_memory_sorts(explain) -> list:
+    """SORT plan stages and unabsorbed $sort pipeline stages, rejected plans excluded"""
+    found = []
+    if isinstance(explain, dict):
+        if explain.get("stage") == "SORT" or "$sort" in explain:
+            found.append(explain)
+        for key, value in explain.items():
+            # "command" echoes the pipeline as sent
+            if key not in ("rejectedPlans", "command"):
+                found += in_memory_sorts(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            found += in_memory_sorts(value)
+    return found
+
+
+@pytest.fixture(scope="module")
+def user_states(mongo_db, notifications):
+    collection = mongo_db[config.NOTIFICATION_USER_STATE_COLLECTION]
+    collection.create_indexes(notification_state_repo.INDEXES)
+    ids = [doc["_id"] for doc in notifications.find({}, {"_id": 1}).limit(50)]
+    collection.insert_many(
+        [
+            {"user_id": "user-1", "notification_id": bson_id, "read": i % 2 == 0, "deleted": i % 2 == 1}
+            for i, bson_id in enumerate(ids)
+        ]
+        + [{"user_id": "user-1", "notification_id": None, "read_all_before": datetime(2025, 1, 1, 0, 1)}]
+    )
+    return collection
+
+
+@pytest.fixture
+def captured(monkeypatch, notifications, user_states):
+    """
+    Run repository calls against in-memory copies named like the real collections and
+    return the commands they sent, so the exact pipelines are explained on mongod.
+    """
+    fakes = {
+        collection.name: FakeCollection(list(collection.find()), name=collection.name)
+        for collection in (notifications, user_states)
+    }
+    monkeypatch.setattr(notification_repo, "notification_collection", fakes[notifications.name])
+    monkeypatch.setattr(notification_state_repo, "notification_collection", fakes[notifications.name])
+    monkeypatch.setattr(notification_state_repo, "notification_user_state_collection", fakes[user_states.name])
+    notification_repo._total_cache.clear()
+
+    def run(call) -> list[tuple[Collection, dict]]:
+        for fake in fakes.values():
+            fake.queries.clear()
+        asyncio.run(call())
+        real = {notifications.name: notifications, user_states.name: user_states}
+        return [
+            (real[name], explain_command(real[name], op, arg))
+            for name, fake in fakes.items()
+            for op, arg in fake.queries
+        ]
+
+    return run
+
+
+def explain_command(collection: Collection, op: str, arg) -> dict:
+    if op == "aggregate":
+        pipeline = arg
+    elif op == "count_documents":
+        # what pymongo sends for count_documents
+        pipeline = [{"$match": arg}, {"$group": {"_id": 1, "n": {"$sum": 1}}}]
+    else:
+        return collection.find(arg).explain()
+    explain = collection.database.command(
+        "explain", {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}}
+    )
+    # the per-document query of each $lookup, as it runs on the joined collection
+    for stage in pipeline:
+        if "$lookup" in stage:
+            lookup = stage["$lookup"]
+            joined = collection.database[lookup["from"]]
+            inner = lookup["pipeline"]
+            if "localField" in lookup:
+                sample = joined.find_one({lookup["foreignField"]: {"$ne": None}}) or {}
+                inner = [{"$match": {lookup["foreignField"]: sample.get(lookup["foreignField"])}}, *inner]
+            explain.setdefault("lookups", []).append(
+                collection.database.command("explain", {"aggregate": joined.name, "pipeline": inner, "cursor": {}})
+            )
+    return explain
+
+
+def test_notification_pages_use_indexes(captured):
+    async def pages():
+        first = await notification_repo.get_by_filter(BasePagingReq(page_size=10), "tenant-1", "user-1")
+        # keyset page, total now cached
+        await notification_repo.get_by_filter(
+            BasePagingReq(page_size=10, cursor=first["next_cursor"]), "tenant-1", "user-1"
+        )
+        await notification_repo.get_by_filter(BasePagingReq(page=3, page_size=10), "tenant-1", "user-1")
+
+    explains = captured(pages)
+
+    assert len(explains) >= 5
+    for _, explain in explains:
+        assert collscans(explain) == []
+    # the page is read from the indexes in SORT_ORDER, never sorted in memory
+    for collection, explain in explains:
+        if collection.name == "notification":
+            assert in_memory_sorts(explain) == []
+
+
+def test_notification_keyword_search_uses_indexes(captured):
+    explains = captured(
+        lambda: notification_repo.get_by_filter(BasePagingReq(keyword="checkout del"), "tenant-1", "user-1")
+    )
+
+    for _, explain in explains:
+        assert collscans(explain) == []
+
+
+def test_notification_unread_count_uses_indexes(captured):
+    async def unread():
+        await notification_repo.count_unread("tenant-1", "user-1")
+        ids = [doc["_id"] for doc in notification_repo.notification_collection.docs.values()][:20]
+        await notification_repo.get_unread_ids("tenant-1", "user-1", ids)
+
+    explains = captured(unread)
+
+    assert len(explains) >= 4
+    for _, explain in explains:
+        assert collscans(explain) == []
+
+
+def test_notification_polling_uses_indexes(notifications):
+    explain = notifications.find(
+        {
+            "$or": [
+                {"created_at": {"$gt": datetime(2025, 1, 1, 0, 5)}},
+                {"created_at": datetime(2025, 1, 1, 0, 5), "_id": {"$gt": Binary(bytes(16), UUID_SUBTYPE)}},
+            ]
+        }
+    ).sort([("created_at", 1), ("_id", 1)]).limit(1000).explain()
+
+    assert collscans(explain) == []
+
+
+def test_location_lookups_use_indexes(locations):
+    assert collscans(locations.find({"_id": "store-1"}).explain()) == []
+    assert collscans(locations.find({"_id": {"$in": ["store-1", "store-2"]}}).explain()) == []
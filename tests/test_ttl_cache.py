@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from app.cache.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def test_concurrent_misses_call_loader_once(anyio_backend):
+    cache = TTLCache("test", ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"weather_type": "sunny"}
+
+    results = await asyncio.gather(
+        *[cache.get_or_load("store-1", loader) for _ in range(500)]
+    )
+
+    assert calls == 1
+    assert all(r == {"weather_type": "sunny"} for r in results)
+    assert cache.misses == 1
+    assert cache.coalesced == 499
+
+    await cache.get_or_load("store-1", loader)
+    assert cache.hits == 1
+    assert calls == 1
+
+
+async def test_loader_error_is_not_cached(anyio_backend):
+    cache = TTLCache("test", ttl=60)
+
+    async def failing():
+        raise Exception("upstream down")
+
+    with pytest.raises(Exception):
+        await cache.get_or_load("store-1", failing)
+
+    async def loader():
+        return "cloudy"
+
+    assert await cache.get_or_load("store-1", loader) == "cloudy"
+
+
+async def test_expired_and_evicted_entries(anyio_backend):
+    cache = TTLCache("test", ttl=60, maxsize=2)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+
+def test_remaining_ttl_does_not_touch_lru_order():
+    cache = TTLCache("test", ttl=60, maxsize=2)
+    cache.set("a", 1, ttl=30)
+    cache.set("b", 2)
+
+    assert 29 < cache.remaining_ttl("a") <= 30
+    assert cache.remaining_ttl("missing") is None
+    cache.set("c", 3)
+    # "a" stayed least recently used
+    assert cache.get("a") is None
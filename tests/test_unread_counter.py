@@ -0,0 +1,94 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from app.cache.ttl_cache import TTLCache
+from app.repositories import notification_repo, notification_state_repo
+from app.services import notification_service, unread_counter
+from tests.fake_mongo import FakeCollection
+from tests.test_notification_repo import make_notification
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    start = datetime(2025, 1, 1)
+    docs = [make_notification(start + timedelta(minutes=i)) for i in range(5)]
+    docs.append(make_notification(start, has_for_all=False, tenant_id="u1", user_id="u1"))
+    docs.append(make_notification(start, has_for_all=False, tenant_id="other", user_id=None))
+    collection = FakeCollection(docs)
+    monkeypatch.setattr(notification_repo, "notification_collection", collection)
+    monkeypatch.setattr(notification_state_repo, "notification_collection", collection)
+    monkeypatch.setattr(notification_state_repo, "notification_user_state_collection", FakeCollection())
+    monkeypatch.setattr(unread_counter, "_counts", TTLCache("notification_unread", ttl=60))
+    monkeypatch.setattr(unread_counter, "_users_by_tenant", {})
+    return collection
+
+
+def ids(collection: FakeCollection, count: int) -> list[str]:
+    return [str(uuid.UUID(bytes=doc["_id"])) for doc in list(collection.docs.values())[:count]]
+
+
+async def test_counts_once_then_serves_from_memory(anyio_backend, notifications):
+    # nothing to keep current yet, so the hub may stop polling
+    assert not unread_counter.has_counts()
+    assert await notification_service.get_unread_count("u1", "u1") == {"unread": 6}
+    assert unread_counter.has_counts()
+
+    notifications.queries.clear()
+    assert await notification_service.get_unread_count("u1", "u1") == {"unread": 6}
+    assert notifications.queries == []
+
+
+async def test_maintained_incrementally(anyio_backend, notifications):
+    await unread_counter.get_unread_count("u1", "u1")
+    await unread_counter.get_unread_count("u2", "u2")
+
+    unread_counter.on_notification(make_notification(datetime.now()))
+    unread_counter.on_notification(make_notification(datetime.now(), has_for_all=False, tenant_id="u1", user_id="u1"))
+    unread_counter.on_notification(make_notification(datetime.now(), has_for_all=False, tenant_id="u2", user_id="u3"))
+    assert await unread_counter.get_unread_count("u1", "u1") == 8
+    assert await unread_counter.get_unread_count("u2", "u2") == 6
+
+    await notification_service.mark_read(ids(notifications, 2), "u1", "u1")
+    await notification_service.delete(ids(notifications, 3)[2:], "u1", "u1")
+    assert await unread_counter.get_unread_count("u1", "u1") == 5
+
+    await notification_service.mark_all_read("u2", "u2")
+    assert await unread_counter.get_unread_count("u2", "u2") == 0
+
+
+async def test_reconciles_on_expiry(anyio_backend, notifications):
+    await unread_counter.get_unread_count("u1", "u1")
+    # already counted as read by the next exact count
+    await notification_service.mark_read(ids(notifications, 2), "u1", "u1")
+    await notification_service.mark_read(ids(notifications, 2), "u1", "u1")
+
+    unread_counter._counts.clear()
+    assert await unread_counter.get_unread_count("u1", "u1") == 4
+
+
+async def test_only_visible_unread_ids_are_decremented(anyio_backend, notifications):
+    assert await unread_counter.get_unread_count("u1", "u1") == 6
+    first, second, third = ids(notifications, 3)
+    hidden = next(str(uuid.UUID(bytes=d["_id"])) for d in notifications.docs.values() if d["tenant_id"] == "other")
+    missing = str(uuid.UUID(bytes=bytes(16)))
+
+    await notification_service.mark_read([first, first, hidden, missing], "u1", "u1")
+    assert await unread_counter.get_unread_count("u1", "u1") == 5
+    # read twice, or deleted once read: already out of the count
+    await notification_service.mark_read([first], "u1", "u1")
+    await notification_service.delete([first, second], "u1", "u1")
+    assert await unread_counter.get_unread_count("u1", "u1") == 4
+
+    # below the mark-all-read watermark nothing is unread any more
+    await notification_service.mark_all_read("u1", "u1")
+    unread_counter.on_notification(make_notification(datetime.now()))
+    await notification_service.delete([third], "u1", "u1")
+    assert await unread_counter.get_unread_count("u1", "u1") == 1
+
+    unread_counter._counts.clear()
+    assert await unread_counter.get_unread_count("u1", "u1") == 0
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.cache import weather_cache
+from app.cache.ttl_cache import TTLCache
+from app.cache.weather_cache import WeatherKind
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.providers import registry
+from app.repositories import location_repo, weather_repo
+from app.services import weather_prefetch
+from app.services.weather_prefetch import DailyBudget, ProviderPrefetcher
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def locations(*group_ids: str) -> list[Location]:
+    return [Location(group_id=group_id, address="Quận 1", lat=10.77, long=106.70) for group_id in group_ids]
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """Record prefetch calls instead of calling OpenWeather: (kind, group_id, time)"""
+    calls = []
+    failing = set()
+
+    async def refresh_weather(provider_name, kind, location):
+        calls.append((kind, location.group_id, time.monotonic()))
+        if location.group_id in failing:
+            raise Exception("upstream down")
+        weather_cache.get_cache(provider_name).set(weather_cache.cache_key(kind, location.group_id), "cloudy")
+
+    async def get_by_group_ids(group_ids):
+        return {location.group_id: location for location in locations(*group_ids) if location.group_id != "gone"}
+
+    monkeypatch.setattr(weather_prefetch.weather_repo, "refresh_weather", refresh_weather)
+    monkeypatch.setattr(location_repo, "get_by_group_ids", get_by_group_ids)
+    monkeypatch.setattr(weather_cache, "_requested", TTLCache("test_requested", ttl=3600, maxsize=100))
+    monkeypatch.setattr(weather_prefetch.config, "WEATHER_PREFETCH_INTERVAL", 300)
+    weather_cache.get_cache(WEATHER_PROVIDERS.OPENWEATHER).clear()
+    yield calls, failing
+    weather_cache.get_cache(WEATHER_PROVIDERS.OPENWEATHER).clear()
+
+
+def openweather(calls_per_minute: float = 6000, calls_per_day: int = 100000) -> ProviderPrefetcher:
+    return ProviderPrefetcher(registry.get_provider(WEATHER_PROVIDERS.OPENWEATHER), calls_per_minute, calls_per_day)
+
+
+async def test_walk_covers_recent_stores_first_and_skips_fresh_entries(anyio_backend, refreshes):
+    calls, _ = refreshes
+    cache = weather_cache.get_cache(WEATHER_PROVIDERS.OPENWEATHER)
+    # fresh past the next walk: no call; expiring before it: refreshed
+    cache.set(weather_cache.cache_key(WeatherKind.CURRENT, "store-a"), "sunny", ttl=600)
+    cache.set(weather_cache.cache_key(WeatherKind.HOURLY, "store-a"), "sunny", ttl=60)
+    for group_id in ("store-a", "gone", "store-b", "store-c"):
+        weather_cache.mark_requested(group_id)
+
+    prefetcher = openweather()
+    # store-d was never requested: not prefetched
+    assert [location.group_id for location in await weather_prefetch.recent_locations()] == [
+        "store-c", "store-b", "store-a"
+    ]
+    await prefetcher.walk(await weather_prefetch.recent_locations())
+
+    assert [(kind, group_id) for kind, group_id, _ in calls] == [
+        (WeatherKind.CURRENT, "store-c"),
+        (WeatherKind.HOURLY, "store-c"),
+        (WeatherKind.CURRENT, "store-b"),
+        (WeatherKind.HOURLY, "store-b"),
+        (WeatherKind.HOURLY, "store-a"),
+    ]
+    assert prefetcher.stats()["refreshed"] == 5 and prefetcher.stats()["fresh"] == 1
+
+
+def test_daily_budget_is_shared_over_the_rest_of_the_day():
+    budget = DailyBudget(576)
+    midnight = datetime(2025, 12, 22, tzinfo=timezone.utc)
+
+    # 288 walks of 300s per day
+    assert budget.per_walk(300, midnight) == 2
+    assert budget.per_walk(300, midnight.replace(hour=12)) == 4
+    budget.used = 576
+    assert budget.per_walk(300, midnight.replace(hour=23)) == 0
+    # a new day starts over
+    assert budget.per_walk(300, datetime(2025, 12, 23, tzinfo=timezone.utc)) == 2
+
+
+def test_small_daily_budget_carries_fractions_between_walks():
+    # 150 calls over 288 walks: an even share is about half a call per walk
+    budget = DailyBudget(150)
+    midnight = datetime(2025, 12, 22, tzinfo=timezone.utc)
+
+    allowances = []
+    for walk in range(288):
+        allowances.append(budget.per_walk(300, midnight + timedelta(seconds=300 * walk)))
+        budget.used += allowances[-1]
+
+    assert allowances[:2] == [0, 1]
+    assert sum(allowances) == 150
+
+
+async def test_walk_stops_at_its_share_of_the_daily_budget(anyio_backend, refreshes, monkeypatch):
+    calls, _ = refreshes
+    prefetcher = openweather(calls_per_day=1000)
+    monkeypatch.setattr(prefetcher.budget, "per_walk", lambda interval: 3)
+
+    await prefetcher.walk(locations("store-a", "store-b", "store-c"))
+
+    assert len(calls) == 3 and prefetcher.budget.used == 3
+    assert prefetcher.deferred == 3
+
+
+async def test_calls_are_spread_at_the_quota_rate(anyio_backend, refreshes):
+    calls, failing = refreshes
+    failing.add("store-a")
+    # 1200 calls/min: one call every 50ms, no burst
+    prefetcher = openweather(calls_per_minute=1200)
+
+    await prefetcher.walk(locations("store-a", "store-b"))
+
+    gaps = [later[2] - earlier[2] for earlier, later in zip(calls, calls[1:])]
+    assert len(calls) == 4
+    assert all(gap >= 0.04 for gap in gaps)
+    # a failing store does not stop the walk
+    assert prefetcher.failures == 2 and prefetcher.refreshed == 2
+
+
+async def test_only_served_locations_are_recorded(anyio_backend, refreshes, monkeypatch):
+    async def get_by_group_id(group_id):
+        return None
+
+    monkeypatch.setattr(location_repo, "get_by_group_id", get_by_group_id)
+
+    with pytest.raises(Exception, match="Location not found"):
+        await weather_repo.get_current_weather(WEATHER_PROVIDERS.OPENWEATHER, "no-such-store")
+    assert weather_cache.recently_requested() == []
+
+
+async def test_start_skips_providers_without_api_key(anyio_backend, refreshes, monkeypatch):
+    monkeypatch.setattr(weather_prefetch.config, "WEATHER_PREFETCH_PROVIDERS", ["openweather", "visualcrossing"])
+    monkeypatch.setattr(registry.get_provider("openweather").__class__, "api_key", property(lambda self: "key"))
+    monkeypatch.setattr(registry.get_provider("visualcrossing").__class__, "api_key", property(lambda self: None))
+    weather_cache.mark_requested("store-a")
+
+    await weather_prefetch.start_weather_prefetch()
+    try:
+        await asyncio.sleep(0.05)
+        stats = weather_prefetch.stats()
+        share = weather_prefetch.config.WEATHER_PREFETCH_QUOTA_SHARE
+        assert list(stats) == ["openweather"]
+        assert stats["openweather"]["calls_per_minute"] == pytest.approx(60 * share)
+        assert stats["openweather"]["daily_budget"] == int(1000 * share)
+    finally:
+        await weather_prefetch.stop_weather_prefetch()
+    assert weather_prefetch.stats() == {}
@@ -0,0 +1,176 @@
+import asyncio
+import httpx
+import pytest
+from app.cache import weather_cache
+from app.clients import http_client
+from app.configs import config
+from app.constants.enum import WEATHER_PROVIDERS
+from app.models.location_model import Location
+from app.models.weather_model import WeatherBatchReq, WeatherResponse
+from app.repositories import location_repo, weather_repo
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route provider calls to a mock transport and stub the location lookup"""
+    calls = []
+    responses = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        return responses.pop(0)
+
+    async def get_by_group_id(group_id: str):
+        return Location(group_id=group_id, address="Quận 3", lat=10.77, long=106.69)
+
+    monkeypatch.setattr(location_repo, "get_by_group_id", get_by_group_id)
+    monkeypatch.setattr(weather_repo.config, "WEATHER_RETRY_BACKOFF", 0)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_client._clients, WEATHER_PROVIDERS.WEATHERAPI, client)
+    weather_cache.get_cache(WEATHER_PROVIDERS.WEATHERAPI).clear()
+    yield calls, responses
+    weather_cache.get_cache(WEATHER_PROVIDERS.WEATHERAPI).clear()
+
+
+async def test_current_weather_is_mapped_and_cached(anyio_backend, upstream):
+    calls, responses = upstream
+    responses.append(httpx.Response(200, json={"current": {"condition": {"code": 1195}}}))
+
+    weather = await weather_repo.get_weather_by_group_id_weatherapi("store-1")
+    again = await weather_repo.get_weather_by_group_id_weatherapi("store-1")
+
+    assert weather.weather_type == "heavy rain"
+    assert weather.group_id == "store-1"
+    assert again == weather
+    assert len(calls) == 1
+
+
+async def test_hourly_weather_retries_server_errors(anyio_backend, upstream):
+    calls, responses = upstream
+    responses.append(httpx.Response(503))
+    responses.append(httpx.Response(200, json={
+        "forecast": {"forecastday": [{
+            "date": "2025-12-22",
+            "hour": [{"time": "2025-12-22 00:00", "temp_c": 27.5,
+                      "condition": {"code": 1000}, "chance_of_rain": 10}],
+        }]}
+    }))
+
+    weather = await weather_repo.get_weather_hourly_by_group_id("store-1")
+
+    assert len(calls) == 2
+    assert weather.forecast_date == "2025-12-22"
+    assert weather.hourly[0].weather_type == "sunny"
+    assert weather.hourly[0].temp_c == 27.5
+
+
+@pytest.fixture
+def race(monkeypatch):
+    """Fake provider loads: provider name -> (delay seconds, weather_type or None to fail)"""
+    plan = {}
+    cancelled = []
+
+    async def load_current(provider, group_id, location=None):
+        delay, weather_type = plan[provider.name]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(provider.name)
+            raise
+        if weather_type is None:
+            raise Exception(f"{provider.label} error: 503")
+        return WeatherResponse(weather_type=weather_type, group_id=group_id)
+
+    async def get_by_group_id(group_id: str):
+        return Location(group_id=group_id, address="Quận 3", lat=10.77, long=106.69)
+
+    monkeypatch.setattr(weather_repo, "_load_current", load_current)
+    monkeypatch.setattr(weather_repo.metrics, "_metrics", {})
+    monkeypatch.setattr(location_repo, "get_by_group_id", get_by_group_id)
+    monkeypatch.setattr(weather_repo.config, "WEATHER_HEDGE_PROVIDERS", ["weatherapi", "openweather"])
+    monkeypatch.setattr(weather_repo.config, "WEATHER_HEDGE_DELAY", 0.02)
+    monkeypatch.setattr(weather_repo.config, "WEATHER_API_KEY", "key")
+    monkeypatch.setattr(weather_repo.config, "OPENWEATHER_API_KEY", "key")
+    for name in ["weatherapi", "openweather", weather_cache.BEST]:
+        weather_cache.get_cache(name).clear()
+    yield plan, cancelled
+    for name in ["weatherapi", "openweather", weather_cache.BEST]:
+        weather_cache.get_cache(name).clear()
+
+
+async def test_best_weather_hedges_slow_provider(anyio_backend, race):
+    plan, cancelled = race
+    plan["weatherapi"] = (1.0, "sunny")
+    plan["openweather"] = (0.01, "cloudy")
+
+    weather = await weather_repo.get_best_current_weather("store-1")
+
+    assert weather.weather_type == "cloudy"
+    await asyncio.sleep(0)
+    assert cancelled == ["weatherapi"]
+
+
+async def test_best_weather_fails_over(anyio_backend, race):
+    plan, _ = race
+    plan["weatherapi"] = (0, None)
+    plan["openweather"] = (0, "light rain")
+
+    weather = await weather_repo.get_best_current_weather("store-1")
+
+    assert weather.weather_type == "light rain"
+
+
+async def test_batch_streams_cached_missing_and_fetched(anyio_backend, upstream, monkeypatch):
+    calls, responses = upstream
+    lookups = []
+
+    async def get_by_group_ids(group_ids):
+        lookups.append(group_ids)
+        return {
+            group_id: Location(group_id=group_id, address="Quận 3", lat=10.77, long=106.69)
+            for group_id in group_ids
+            if group_id != "unknown"
+        }
+
+    monkeypatch.setattr(location_repo, "get_by_group_ids", get_by_group_ids)
+    weather_cache.get_cache(WEATHER_PROVIDERS.WEATHERAPI).set(
+        weather_cache.cache_key("current", "cached"),
+        WeatherResponse(weather_type="sunny", group_id="cached"),
+    )
+    responses.append(httpx.Response(200, json={"current": {"condition": {"code": 1003}}}))
+
+    items = [
+        item
+        async for item in weather_repo.get_current_weather_batch(
+            WEATHER_PROVIDERS.WEATHERAPI, ["cached", "store-1", "unknown", "store-1"]
+        )
+    ]
+
+    assert lookups == [["store-1", "unknown"]]
+    assert len(calls) == 1
+    by_id = {item["group_id"]: item for item in items}
+    assert len(items) == 3
+    assert by_id["cached"]["data"]["weather_type"] == "sunny"
+    assert by_id["store-1"]["data"]["weather_type"] == "partly cloudy"
+    assert by_id["unknown"]["success"] is False
+
+
+def test_provider_lists_are_parsed_and_validated(monkeypatch):
+    monkeypatch.setenv("WEATHER_HEDGE_PROVIDERS", " weatherapi, ,openweather ,")
+    assert config._weather_providers("WEATHER_HEDGE_PROVIDERS", "google") == ["weatherapi", "openweather"]
+
+    monkeypatch.setenv("WEATHER_HEDGE_PROVIDERS", "")
+    assert config._weather_providers("WEATHER_HEDGE_PROVIDERS", "google") == []
+
+    monkeypatch.setenv("WEATHER_HEDGE_PROVIDERS", "weatherapi,open-weather")
+    with pytest.raises(ValueError, match="unknown weather provider open-weather"):
+        config._weather_providers("WEATHER_HEDGE_PROVIDERS", "google")
+
+    # the batch request rejects the same names with the same message
+    with pytest.raises(ValueError, match="unknown weather provider open-weather, expected one of google"):
+        WeatherBatchReq(group_ids=["store-1"], provider="open-weather")